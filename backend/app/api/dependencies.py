@@ -1,6 +1,6 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from app.services.auth_service import get_user_from_token
+from app.services.auth_service import get_user_from_token_async
 
 security = HTTPBearer()
 
@@ -14,7 +14,7 @@ async def get_current_user(
     Use as: user = Depends(get_current_user)
     """
     try:
-        user = get_user_from_token(credentials.credentials)
+        user = await get_user_from_token_async(credentials.credentials)
         return user
     except Exception:
         raise HTTPException(
@@ -16,7 +16,7 @@ class RefreshRequest(BaseModel):
 
 
 @router.post("/signup")
-async def signup(req: AuthRequest):
+def signup(req: AuthRequest):
     """Register a new user. Email confirmation is required before login."""
     try:
         result = sign_up(req.email, req.password)
@@ -30,7 +30,7 @@ async def signup(req: AuthRequest):
 
 
 @router.post("/login")
-async def login(req: AuthRequest):
+def login(req: AuthRequest):
     """Login with email and password."""
     try:
         result = sign_in(req.email, req.password)
@@ -40,7 +40,7 @@ async def login(req: AuthRequest):
 
 
 @router.post("/refresh")
-async def refresh(req: RefreshRequest):
+def refresh(req: RefreshRequest):
     """Refresh an expired access token."""
     try:
         result = refresh_session(req.refresh_token)
@@ -1,25 +1,113 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Query
-from fastapi.responses import PlainTextResponse
+import asyncio
+import json
+import os
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse, JSONResponse, Response
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
+import structlog
+
 from app.api.dependencies import get_current_user
-from app.models.schemas import InvoiceData
-from app.services.pipeline import process_invoice
-from app.services.output_service import generate_output
-from app.services.storage_service import upload_pdf, delete_pdf
-from app.database.crud import (
-    create_invoice_record,
+from app.config import get_settings
+from app.services.pipeline import cancel_ocr, join_segments, process_invoice, process_ocr_result
+from app.services.output_service import (
+    get_cached_output,
+    invalidate_cached_outputs,
+    invoice_data_from_record,
+    BULK_EXPORT_FORMATS,
+    iter_record_export,
+)
+from app.services.async_storage_service import delete_pdf
+from app.services.ingest_service import ingest_archive, ingest_batch, ingest_file
+from app.services.zip_ingest_service import is_pdf_member, list_zip_members, spool_zip
+from app.services.summary_service import summarize_rollups
+from app.services.similarity_service import remember_signature, unindex_invoice
+from app.services.export_service import create_export_job, get_export_job, run_export_job
+from app.services.upload_session_service import (
+    UploadOffsetMismatch,
+    abort_upload_session,
+    append_chunk,
+    complete_upload_session,
+    create_upload_session,
+    get_upload_session,
+)
+from app.services.event_service import (
+    subscribe,
+    unsubscribe,
+    publish,
+    format_sse,
+    set_stage,
+    get_stage,
+    add_waiter,
+    remove_waiter,
+    notify_done,
+    wait_until_done,
+    HEARTBEAT_SECONDS,
+    TERMINAL_STATUSES,
+)
+from app.database.crud import iter_invoices
+from app.database.async_crud import (
     update_invoice_status,
     save_invoice_data,
     save_invoice_error,
+    mark_invoice_duplicate,
+    mark_invoice_split,
+    create_child_invoices,
     get_invoice as db_get_invoice,
+    get_invoice_statuses,
+    get_gst_rollups,
     list_invoices as db_list_invoices,
     delete_invoice as db_delete_invoice,
     check_invoice_quota,
 )
-from app.utils.helpers import validate_pdf_upload
+from app.models.schemas import ProcessingResult, UploadSession
+from app.utils.helpers import compute_etag, etag_matches
+from app.utils.spool import SpooledPdf, spool_upload
 
 router = APIRouter(prefix="/api/invoices", tags=["invoices"])
+logger = structlog.get_logger()
+
+# Processing started outside BackgroundTasks (zip uploads). Bounded, so a large
+# archive doesn't send hundreds of OCR requests at once.
+_processing_tasks: set[asyncio.Task] = set()
+_processing_slots: asyncio.Semaphore | None = None
+
+
+class InvoiceStatusRequest(BaseModel):
+    invoice_ids: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class ExportJobRequest(BaseModel):
+    format: str = "csv"
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+
+
+class UploadSessionRequest(BaseModel):
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    buyer_gstin: Optional[str] = None
+
+
+def _conditional_response(
+    request: Request, build_content, etag: str, cache_control: str = "private, no-cache"
+) -> Response:
+    """Return 304 if the client already has this ETag, else build and send the body."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=build_content(), headers=headers)
+
+
+async def _require_quota(user_id: str):
+    """Raise 402 if the user can't upload another invoice this month."""
+    quota = await check_invoice_quota(user_id)
+    if not quota["allowed"]:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Monthly invoice limit reached ({quota['used']}/{quota['limit']}). Upgrade to Pro for unlimited invoices.",
+        )
 
 
 @router.post("/upload")
@@ -30,37 +118,22 @@ async def upload_invoice(
     user: dict = Depends(get_current_user),
 ):
     """Upload a PDF invoice for processing."""
-    file_bytes = await file.read()
     user_id = user["user_id"]
 
     # Check quota
-    quota = check_invoice_quota(user_id)
-    if not quota["allowed"]:
-        raise HTTPException(
-            status_code=402,
-            detail=f"Monthly invoice limit reached ({quota['used']}/{quota['limit']}). Upgrade to Pro for unlimited invoices.",
-        )
+    await _require_quota(user_id)
 
-    # Validate PDF
-    is_valid, error_msg = validate_pdf_upload(file.filename, file_bytes)
-    if not is_valid:
+    # Stream to a temp file, validating and hashing on the way
+    pdf, error_msg = await spool_upload(file)
+    if error_msg:
         raise HTTPException(status_code=400, detail=error_msg)
 
-    # Upload to Supabase Storage
-    storage_path = upload_pdf(user_id, file.filename, file_bytes)
-
-    # Create DB record
-    record = create_invoice_record(
-        user_id=user_id,
-        original_filename=file.filename,
-        file_path=storage_path,
-        buyer_gstin=buyer_gstin,
-    )
-    invoice_id = record["id"]
+    # Start OCR, then store the PDF and create the DB record concurrently
+    invoice_id, ocr_task = await ingest_file(user_id, file.filename, pdf, buyer_gstin)
 
-    # Process in background
+    # Finish processing in background
     background_tasks.add_task(
-        _process_in_background, invoice_id, file_bytes, buyer_gstin
+        _process_in_background, invoice_id, user_id, pdf, buyer_gstin, ocr_task
     )
 
     return {
@@ -86,7 +159,7 @@ async def upload_batch(
     user_id = user["user_id"]
 
     # Check quota for total files
-    quota = check_invoice_quota(user_id)
+    quota = await check_invoice_quota(user_id)
     remaining = quota["limit"] - quota["used"]
     if not quota["allowed"]:
         raise HTTPException(
@@ -99,45 +172,15 @@ async def upload_batch(
             detail=f"Not enough quota. {remaining} invoice(s) remaining this month, but {len(files)} files uploaded.",
         )
 
-    results = []
-    for f in files:
-        file_bytes = await f.read()
-
-        # Validate each PDF individually
-        is_valid, error_msg = validate_pdf_upload(f.filename, file_bytes)
-        if not is_valid:
-            results.append({
-                "filename": f.filename,
-                "success": False,
-                "error": error_msg,
-                "invoice_id": None,
-            })
-            continue
-
-        # Upload to Supabase Storage
-        storage_path = upload_pdf(user_id, f.filename, file_bytes)
-
-        # Create DB record
-        record = create_invoice_record(
-            user_id=user_id,
-            original_filename=f.filename,
-            file_path=storage_path,
-            buyer_gstin=buyer_gstin,
-        )
-        invoice_id = record["id"]
-
-        # Process in background
+    # Validate and store files concurrently, then create all records in one insert
+    results, stored = await ingest_batch(
+        user_id, files, buyer_gstin, get_settings().upload_batch_concurrency
+    )
+    for invoice_id, pdf, ocr_task in stored:
         background_tasks.add_task(
-            _process_in_background, invoice_id, file_bytes, buyer_gstin
+            _process_in_background, invoice_id, user_id, pdf, buyer_gstin, ocr_task
         )
 
-        results.append({
-            "filename": f.filename,
-            "success": True,
-            "error": None,
-            "invoice_id": invoice_id,
-        })
-
     accepted = sum(1 for r in results if r["success"])
     return {
         "success": accepted > 0,
@@ -147,22 +190,360 @@ async def upload_batch(
     }
 
 
+@router.post("/upload-zip")
+async def upload_zip(
+    file: UploadFile = File(...),
+    buyer_gstin: Optional[str] = Form(default=None),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Upload a zip of PDF invoices (e.g. a month-end batch). Quota is checked
+    once for all PDFs in it; members are then unpacked, stored and queued for
+    processing one at a time. Streams one NDJSON result line per member,
+    then a summary line.
+    """
+    user_id = user["user_id"]
+    try:
+        archive_path = await spool_zip(file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        members = await asyncio.to_thread(list_zip_members, archive_path)
+        pdf_count = sum(1 for m in members if is_pdf_member(m))
+        if pdf_count == 0:
+            raise HTTPException(status_code=400, detail="No PDF files in archive")
+        quota = await check_invoice_quota(user_id)
+        remaining = quota["limit"] - quota["used"]
+        if pdf_count > remaining:
+            raise HTTPException(
+                status_code=402,
+                detail=f"Not enough quota. {remaining} invoice(s) remaining this month, but the archive has {pdf_count} PDFs.",
+            )
+    except ValueError as e:
+        os.remove(archive_path)
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        os.remove(archive_path)
+        raise
+
+    def on_stored(invoice_id: str, pdf: SpooledPdf):
+        _queue_processing(invoice_id, user_id, pdf, buyer_gstin)
+
+    async def results():
+        accepted = 0
+        try:
+            async for result in ingest_archive(user_id, archive_path, members, buyer_gstin, on_stored):
+                accepted += result["success"]
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, "total": len(members), "accepted": accepted}) + "\n"
+        finally:
+            os.remove(archive_path)
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+def _get_upload_session_or_404(upload_id: str, user_id: str) -> UploadSession:
+    session = get_upload_session(upload_id, user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+def _offset_conflict(e: UploadOffsetMismatch) -> JSONResponse:
+    return JSONResponse(status_code=409, content={"detail": str(e), "offset": e.offset})
+
+
+@router.post("/uploads", status_code=201)
+async def start_resumable_upload(req: UploadSessionRequest, user: dict = Depends(get_current_user)):
+    """
+    Start a resumable upload (large scans, flaky connections). Send the bytes
+    with PUT /uploads/{id}?offset=N in any number of chunks, then POST
+    /uploads/{id}/complete to process the invoice.
+    """
+    await _require_quota(user["user_id"])
+    try:
+        session = create_upload_session(user["user_id"], req.filename, req.size, req.buyer_gstin)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "upload": session.model_dump(exclude={"user_id"})}
+
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: str, user: dict = Depends(get_current_user)):
+    """Upload progress; `offset` is where the next chunk must start."""
+    session = _get_upload_session_or_404(upload_id, user["user_id"])
+    return {"success": True, "upload": session.model_dump(exclude={"user_id"})}
+
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    user: dict = Depends(get_current_user),
+):
+    """
+    Append the raw request body at `offset`. Returns 409 with the current
+    offset if it doesn't match, e.g. after an interrupted chunk.
+    """
+    session = _get_upload_session_or_404(upload_id, user["user_id"])
+    try:
+        new_offset = await append_chunk(session, offset, request.stream())
+    except UploadOffsetMismatch as e:
+        return _offset_conflict(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "offset": new_offset, "size": session.size}
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+):
+    """Finish a resumable upload once every byte has arrived and start processing it."""
+    user_id = user["user_id"]
+    session = _get_upload_session_or_404(upload_id, user_id)
+    await _require_quota(user_id)
+    try:
+        pdf = complete_upload_session(session)
+    except UploadOffsetMismatch as e:
+        return _offset_conflict(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    invoice_id, ocr_task = await ingest_file(user_id, session.filename, pdf, session.buyer_gstin)
+    background_tasks.add_task(
+        _process_in_background, invoice_id, user_id, pdf, session.buyer_gstin, ocr_task
+    )
+    return {
+        "success": True,
+        "invoice_id": invoice_id,
+        "status": "processing",
+    }
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: str, user: dict = Depends(get_current_user)):
+    """Cancel a resumable upload and discard the bytes received so far."""
+    abort_upload_session(_get_upload_session_or_404(upload_id, user["user_id"]))
+    return {"success": True}
+
+
+def _queue_processing(invoice_id: str, user_id: str, pdf: SpooledPdf, buyer_gstin: Optional[str]):
+    """Process an invoice as soon as a slot is free, independent of the request that stored it."""
+    global _processing_slots
+    if _processing_slots is None:
+        _processing_slots = asyncio.Semaphore(get_settings().zip_processing_concurrency)
+
+    async def run():
+        async with _processing_slots:
+            await _process_in_background(invoice_id, user_id, pdf, buyer_gstin)
+
+    task = asyncio.create_task(run())
+    _processing_tasks.add(task)
+    task.add_done_callback(_processing_tasks.discard)
+
+
 async def _process_in_background(
-    invoice_id: str, pdf_bytes: bytes, buyer_gstin: Optional[str]
+    invoice_id: str,
+    user_id: str,
+    pdf: SpooledPdf,
+    buyer_gstin: Optional[str],
+    ocr_task: Optional[asyncio.Task] = None,
 ):
-    """Background task: OCR → LLM → Validation → save to DB."""
-    update_invoice_status(invoice_id, "processing")
+    """
+    Background task: OCR → LLM → Validation → save to DB. Removes the spooled PDF.
+    Any error, cancellation included, marks the invoice failed instead of leaving it processing.
+    """
+    try:
+        try:
+            await update_invoice_status(invoice_id, "processing")
+            publish(user_id, {"invoice_id": invoice_id, "status": "processing"})
+            result = await process_invoice(
+                pdf,
+                buyer_gstin,
+                invoice_id,
+                on_stage=_stage_reporter(invoice_id, user_id),
+                user_id=user_id,
+                ocr_task=ocr_task,
+            )
+        finally:
+            if ocr_task:
+                cancel_ocr(ocr_task)  # no-op once process_invoice has awaited it
+            pdf.discard()
+        set_stage(invoice_id, None)
+
+        if result.status == "split" and result.segments:
+            await _process_split(invoice_id, user_id, result, buyer_gstin)
+        else:
+            await _save_result(invoice_id, user_id, result)
+    except (Exception, asyncio.CancelledError) as e:
+        await _fail_invoice(invoice_id, user_id, e)
+        if isinstance(e, asyncio.CancelledError):
+            raise
+    finally:
+        notify_done(invoice_id)
+
+
+def _stage_reporter(invoice_id: str, user_id: str):
+    def on_stage(stage: str):
+        set_stage(invoice_id, stage)
+        publish(user_id, {"invoice_id": invoice_id, "status": "processing", "stage": stage})
+
+    return on_stage
+
+
+async def _process_split(
+    invoice_id: str, user_id: str, result: ProcessingResult, buyer_gstin: Optional[str]
+):
+    """
+    Extract each invoice of a multi-invoice PDF concurrently and store them as
+    child invoices. If none of them extracts cleanly the cut was likely wrong,
+    and the PDF is extracted as a single invoice instead.
+    """
+    segments = result.segments
+    quota = await check_invoice_quota(user_id)
+    # Once split, the parent stops counting towards the quota and its children count instead
+    room = quota["limit"] - quota["used"] + 1
+    if room < len(segments):
+        await _save_result(invoice_id, user_id, ProcessingResult(
+            invoice_id=invoice_id,
+            status="failed",
+            error={
+                "code": "QUOTA_EXCEEDED",
+                "message": (
+                    f"This PDF holds {len(segments)} invoices but only {room} fit in this month's "
+                    f"limit ({quota['used']}/{quota['limit']}). Upgrade to Pro for unlimited invoices."
+                ),
+                "details": {"stage": "split", "invoices": len(segments), "used": quota["used"], "limit": quota["limit"]},
+            },
+            processing_time_ms=result.processing_time_ms,
+        ))
+        return
+
+    _stage_reporter(invoice_id, user_id)("extraction")
+    slots = asyncio.Semaphore(get_settings().split_concurrency)
+
+    async def extract(segment):
+        async with slots:
+            return await process_ocr_result(segment.ocr_result, buyer_gstin, invoice_id, user_id=user_id)
+
+    outcomes = await asyncio.gather(*(extract(segment) for segment in segments), return_exceptions=True)
+    results = [r if isinstance(r, ProcessingResult) else _error_result(r) for r in outcomes]
+    if not any(_extracted_cleanly(r) for r in results):
+        whole = await process_ocr_result(
+            join_segments(segments),
+            buyer_gstin,
+            invoice_id,
+            on_stage=_stage_reporter(invoice_id, user_id),
+            user_id=user_id,
+        )
+        set_stage(invoice_id, None)
+        await _save_result(invoice_id, user_id, whole)
+        return
+    set_stage(invoice_id, None)
+
+    children = await create_child_invoices(
+        invoice_id, user_id, [(s.page_start, s.page_end) for s in segments]
+    )
+    result_by_start = {s.page_start: r for s, r in zip(segments, results)}
+    await mark_invoice_split(invoice_id, result.processing_time_ms or 0)
+    publish(user_id, {
+        "invoice_id": invoice_id,
+        "status": "split",
+        "children": [child["id"] for child in children],
+        "processing_time_ms": result.processing_time_ms,
+    })
+    notify_done(invoice_id)
+
+    async def save_child(child: dict):
+        child_id = child["id"]
+        try:
+            child_result = result_by_start[child["page_start"]]
+            child_result.invoice_id = child_id
+            await _save_result(child_id, user_id, child_result)
+        except (Exception, asyncio.CancelledError) as e:
+            await _fail_invoice(child_id, user_id, e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            notify_done(child_id)
+
+    await asyncio.gather(*(save_child(child) for child in children), return_exceptions=True)
+
+
+def _error_result(error: BaseException) -> ProcessingResult:
+    return ProcessingResult(
+        status="failed",
+        error={
+            "code": "PROCESSING_ERROR",
+            "message": str(error) or type(error).__name__,
+            "details": {"stage": "background", "type": type(error).__name__},
+        },
+    )
 
-    result = await process_invoice(pdf_bytes, buyer_gstin, invoice_id)
 
-    if result.status == "completed" and result.invoice_data:
-        save_invoice_data(invoice_id, result.invoice_data, result.processing_time_ms or 0)
+async def _fail_invoice(invoice_id: str, user_id: str, error: BaseException):
+    """Mark an invoice failed after an unexpected error so it doesn't stay 'processing'."""
+    logger.error(
+        "invoice_background_failed", invoice_id=invoice_id, error=str(error), error_type=type(error).__name__
+    )
+    set_stage(invoice_id, None)
+    failure = _error_result(error).error
+    try:
+        await save_invoice_error(invoice_id, failure, 0)
+    except Exception as e:
+        logger.error("invoice_error_not_saved", invoice_id=invoice_id, error=str(e))
+    publish(user_id, {"invoice_id": invoice_id, "status": "failed", "error": failure["message"]})
+
+
+def _extracted_cleanly(result: ProcessingResult) -> bool:
+    if result.status == "duplicate":
+        return True
+    return result.status == "completed" and bool(result.invoice_data and result.invoice_data.validation_passed)
+
+
+async def _save_result(invoice_id: str, user_id: str, result: ProcessingResult):
+    """Store a processing result on its invoice and notify listeners."""
+    if result.status == "duplicate" and result.duplicate_of:
+        await mark_invoice_duplicate(invoice_id, result.duplicate_of, result.processing_time_ms or 0)
+        publish(user_id, {
+            "invoice_id": invoice_id,
+            "status": "duplicate",
+            "duplicate_of": result.duplicate_of,
+            "processing_time_ms": result.processing_time_ms,
+        })
+    elif result.status == "completed" and result.invoice_data:
+        saved = await save_invoice_data(
+            invoice_id, result.invoice_data, result.processing_time_ms or 0, user_id=user_id
+        )
+        invalidate_cached_outputs(invoice_id)
+        if saved.get("status") == "completed" and result.minhash_signature:
+            await remember_signature(user_id, invoice_id, result.minhash_signature)
+        publish(user_id, {
+            "invoice_id": invoice_id,
+            "status": saved.get("status", "completed"),
+            "duplicate_of": saved.get("duplicate_of"),
+            "validation_passed": result.invoice_data.validation_passed,
+            "processing_time_ms": result.processing_time_ms,
+        })
     else:
-        save_invoice_error(invoice_id, result.error or {}, result.processing_time_ms or 0)
+        await save_invoice_error(invoice_id, result.error or {}, result.processing_time_ms or 0)
+        publish(user_id, {
+            "invoice_id": invoice_id,
+            "status": "failed",
+            "error": (result.error or {}).get("message", "Unknown error"),
+            "processing_time_ms": result.processing_time_ms,
+        })
+    notify_done(invoice_id)
 
 
 @router.get("")
 async def list_invoices(
+    request: Request,
     page: int = Query(default=1, ge=1),
     limit: int = Query(default=20, ge=1, le=100),
     status: Optional[str] = Query(default=None),
@@ -171,7 +552,7 @@ async def list_invoices(
     user: dict = Depends(get_current_user),
 ):
     """List invoices with pagination and filters."""
-    result = db_list_invoices(
+    result = await db_list_invoices(
         user_id=user["user_id"],
         page=page,
         limit=limit,
@@ -179,18 +560,170 @@ async def list_invoices(
         from_date=from_date,
         to_date=to_date,
     )
-    return {"success": True, **result}
+    etag = compute_etag(
+        page, limit, status, from_date, to_date, result["total"],
+        *((row["id"], row["status"], row["updated_at"]) for row in result["invoices"]),
+    )
+    return _conditional_response(request, lambda: {"success": True, **result}, etag)
+
+
+@router.get("/export")
+async def export_invoices(
+    from_date: Optional[str] = Query(default=None),
+    to_date: Optional[str] = Query(default=None),
+    format: str = Query(default="csv"),
+    user: dict = Depends(get_current_user),
+):
+    """Stream all completed invoices in a bill-date range as CSV, JSON Lines or one Tally envelope."""
+    if format not in BULK_EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Format must be csv, jsonl, or xml")
+    media_type, extension = BULK_EXPORT_FORMATS[format]
+
+    # Rendered in chunks in the CPU stage pool; Starlette iterates it in a worker thread
+    rows = iter_invoices(user["user_id"], from_date=from_date, to_date=to_date)
+
+    filename = f"invoices_{from_date or 'start'}_{to_date or 'end'}.{extension}"
+    return StreamingResponse(
+        iter_record_export(rows, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/export-jobs", status_code=202)
+async def start_export_job(
+    req: ExportJobRequest,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user),
+):
+    """Start a background export for large ranges. Reuses an identical job that is still running."""
+    try:
+        job, created = create_export_job(user["user_id"], req.format, req.from_date, req.to_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Format must be csv, jsonl, xml, or parquet")
+
+    if created:
+        background_tasks.add_task(run_export_job, job.id)
+
+    return {"success": True, "reused": not created, "job": job.model_dump(exclude={"user_id"})}
+
+
+@router.get("/export-jobs/{job_id}")
+async def get_export_job_status(job_id: str, user: dict = Depends(get_current_user)):
+    """Export job status and progress; includes a signed download URL once completed."""
+    job = get_export_job(job_id, user["user_id"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return {"success": True, "job": job.model_dump(exclude={"user_id"})}
+
+
+@router.get("/events")
+async def invoice_events(request: Request, user: dict = Depends(get_current_user)):
+    """Server-Sent Events stream of status changes for the user's invoices."""
+    user_id = user["user_id"]
+    queue = subscribe(user_id)
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/status")
+async def get_invoice_status_bulk(
+    req: InvoiceStatusRequest,
+    request: Request,
+    user: dict = Depends(get_current_user),
+):
+    """Compact status for many invoices in one call. Honors If-None-Match."""
+    invoice_ids = list(dict.fromkeys(req.invoice_ids))
+    rows = await get_invoice_statuses(invoice_ids, user["user_id"])
+
+    position = {invoice_id: i for i, invoice_id in enumerate(invoice_ids)}
+    statuses = []
+    for row in sorted(rows, key=lambda r: position[r["id"]]):
+        stage = get_stage(row["id"]) if row["status"] == "processing" else None
+        statuses.append({**row, "stage": stage or row["status"]})
+
+    found = {row["id"] for row in statuses}
+    missing = [invoice_id for invoice_id in invoice_ids if invoice_id not in found]
+
+    etag = compute_etag(*(
+        (row["id"], row["status"], row["stage"], row["updated_at"]) for row in statuses
+    ), *missing)
+    return _conditional_response(
+        request, lambda: {"success": True, "invoices": statuses, "missing": missing}, etag
+    )
+
+
+@router.get("/summary")
+async def get_gst_summary(
+    from_month: Optional[str] = Query(default=None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    to_month: Optional[str] = Query(default=None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$"),
+    user: dict = Depends(get_current_user),
+):
+    """GST totals for a month range (YYYY-MM), served from precomputed rollups."""
+    invoice_rollups, rate_rollups = await get_gst_rollups(
+        user["user_id"],
+        from_month=f"{from_month}-01" if from_month else None,
+        to_month=f"{to_month}-01" if to_month else None,
+    )
+    summary = summarize_rollups(invoice_rollups, rate_rollups)
+    return {"success": True, "from_month": from_month, "to_month": to_month, **summary}
 
 
 @router.get("/{invoice_id}")
-async def get_invoice(invoice_id: str, user: dict = Depends(get_current_user)):
-    """Get invoice details and extracted data."""
-    record = db_get_invoice(invoice_id, user["user_id"])
+async def get_invoice(
+    invoice_id: str, request: Request, user: dict = Depends(get_current_user)
+):
+    """Get invoice details and extracted data. Honors If-None-Match."""
+    record = await db_get_invoice(invoice_id, user["user_id"])
     if not record:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
+    # Completed invoices still change (re-validation, deletes), so clients
+    # revalidate every time and get a cheap 304 while the ETag holds
+    etag = compute_etag(record["id"], record["status"], record["updated_at"])
+    return _conditional_response(request, lambda: {"success": True, "invoice": record}, etag)
+
+
+@router.get("/{invoice_id}/wait")
+async def wait_for_invoice(
+    invoice_id: str,
+    timeout: float = Query(default=30, ge=0, le=60),
+    user: dict = Depends(get_current_user),
+):
+    """Long-poll until the invoice is completed, failed or a duplicate, or the timeout elapses."""
+    waiter = add_waiter(invoice_id)
+    try:
+        record = await db_get_invoice(invoice_id, user["user_id"])
+        if not record:
+            raise HTTPException(status_code=404, detail="Invoice not found")
+
+        if record["status"] not in TERMINAL_STATUSES:
+            # Re-read even on timeout: another worker may have finished it
+            await wait_until_done(waiter, timeout)
+            record = await db_get_invoice(invoice_id, user["user_id"]) or record
+    finally:
+        remove_waiter(invoice_id, waiter)
+
     return {
         "success": True,
+        "done": record["status"] in TERMINAL_STATUSES,
         "invoice": record,
     }
 
@@ -202,7 +735,7 @@ async def download_invoice(
     user: dict = Depends(get_current_user),
 ):
     """Download extracted data in specified format (json, xml, csv)."""
-    record = db_get_invoice(invoice_id, user["user_id"])
+    record = await db_get_invoice(invoice_id, user["user_id"])
     if not record:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
@@ -212,24 +745,6 @@ async def download_invoice(
             detail=f"Invoice not ready. Status: {record['status']}",
         )
 
-    # Reconstruct InvoiceData from DB record
-    invoice_data = InvoiceData(
-        seller_name=record["seller_name"],
-        seller_gstin=record["seller_gstin"],
-        buyer_gstin=record.get("buyer_gstin"),
-        bill_no=record["bill_no"],
-        bill_date=record["bill_date"],
-        tax_breakup=record.get("tax_breakup", []),
-        total_taxable_value=record["total_taxable_value"],
-        total_cgst=record["total_cgst"],
-        total_sgst=record["total_sgst"],
-        total_igst=record["total_igst"],
-        total_quantity=record.get("total_quantity", 0),
-        total_amount=record["total_amount"],
-        validation_passed=record.get("validation_passed", False),
-        validation_errors=record.get("validation_errors", []),
-    )
-
     content_types = {
         "json": "application/json",
         "xml": "application/xml",
@@ -238,7 +753,12 @@ async def download_invoice(
     if format not in content_types:
         raise HTTPException(status_code=400, detail="Format must be json, xml, or csv")
 
-    output = generate_output(invoice_data, format)
+    output = get_cached_output(
+        invoice_id,
+        record.get("updated_at"),
+        format,
+        lambda: invoice_data_from_record(record),
+    )
     return PlainTextResponse(
         content=output,
         media_type=content_types[format],
@@ -250,18 +770,20 @@ async def download_invoice(
 
 @router.delete("/{invoice_id}")
 async def remove_invoice(invoice_id: str, user: dict = Depends(get_current_user)):
-    """Delete an invoice and its stored PDF."""
-    record = db_get_invoice(invoice_id, user["user_id"])
+    """Delete an invoice and its stored PDF (for a split PDF, also the invoices found in it)."""
+    record = await db_get_invoice(invoice_id, user["user_id"])
     if not record:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
-    # Delete PDF from storage
-    if record.get("file_path"):
+    # Delete PDF from storage (a child of a split PDF shares its parent's file)
+    if record.get("file_path") and not record.get("parent_invoice_id"):
         try:
-            delete_pdf(record["file_path"])
+            await delete_pdf(record["file_path"])
         except Exception:
             pass  # Storage deletion is best-effort
 
     # Delete DB record
-    db_delete_invoice(invoice_id, user["user_id"])
+    await db_delete_invoice(invoice_id, user["user_id"])
+    invalidate_cached_outputs(invoice_id)
+    unindex_invoice(user["user_id"], invoice_id)
     return {"success": True, "message": "Invoice deleted"}
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends
 from app.api.dependencies import get_current_user
-from app.database.crud import get_user_subscription, check_invoice_quota
+from app.database.async_crud import get_user_subscription, check_invoice_quota
 
 router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 
@@ -9,8 +9,8 @@ router = APIRouter(prefix="/api/subscriptions", tags=["subscriptions"])
 async def get_my_subscription(user: dict = Depends(get_current_user)):
     """Get current user's subscription plan and usage info."""
     user_id = user["user_id"]
-    subscription = get_user_subscription(user_id)
-    quota = check_invoice_quota(user_id)
+    subscription = await get_user_subscription(user_id)
+    quota = await check_invoice_quota(user_id)
 
     return {
         "success": True,
@@ -22,12 +22,56 @@ class Settings(BaseSettings):
     supabase_key: str = ""
     supabase_service_key: str = ""
 
+    # Shared HTTP connection pool for all Supabase clients
+    supabase_http2: bool = True
+    supabase_max_connections: int = 20
+    supabase_max_keepalive_connections: int = 10
+    supabase_keepalive_expiry_seconds: float = 60
+    supabase_connect_timeout_seconds: float = 5
+    supabase_timeout_seconds: float = 60
+    supabase_connect_retries: int = 2
+
     # Application
     secret_key: str = "dev-secret-key"
     environment: str = "development"
     allowed_origins: str = "http://localhost:3000"
     max_file_size_mb: int = 10
+    upload_batch_concurrency: int = 4  # files validated and stored at once per batch upload
+    upload_spool_dir: str = ""  # where uploads wait for processing; system temp dir if empty
+    max_resumable_upload_mb: int = 20  # Document AI's limit for inline documents
+    upload_session_ttl_hours: int = 24  # idle resumable uploads are discarded after this
+    max_upload_sessions_per_user: int = 10  # open resumable uploads per user
+    max_zip_upload_mb: int = 500
+    max_zip_members: int = 1000
+    zip_processing_concurrency: int = 4  # invoices from zip uploads processed at once
+    split_min_pages: int = 0  # PDFs with at least this many pages are checked for several invoices; 0 = off
+    split_concurrency: int = 4  # invoices of one multi-invoice PDF extracted at once
+    pdf_optimize_enabled: bool = True  # downsample images and drop blank pages before OCR
+    ocr_target_dpi: int = 300  # scan images above this are downsampled to it
+    blank_page_ink_ratio: float = 0.005  # pages with less dark-pixel coverage than this are dropped
+    ocr_routing: str = "document_ai"  # document_ai, or hybrid (text layer / Tesseract / Document AI per page; opt-in)
+    tesseract_cmd: str = ""  # tesseract binary; found on PATH if empty
+    tesseract_lang: str = "eng"
+    tesseract_min_dpi: int = 200  # scans below this go to Document AI
+    tesseract_min_confidence: float = 0.8  # mean word confidence below which Document AI re-reads the pages
+    # Only what flatten_document reads; tokens, symbols, page images etc. are left out. Empty = full Document
+    document_ai_field_mask: str = "text,pages.page_number,pages.layout,pages.blocks,pages.tables,pages.form_fields"
+    document_ai_first_pages: int = 0  # with _last_pages, read only these pages of long PDFs (not of those split detection checks); 0 = no limit
+    document_ai_last_pages: int = 0
+    document_ai_native_pdf_parsing: bool = False  # use a PDF's embedded text instead of OCRing it
+    document_ai_language_hints: str = ""  # comma-separated, e.g. "en"; empty = let Document AI detect
+    document_ai_imageless_mode: bool = False  # higher page limit; not every processor supports it
+    document_ai_slow_ms: int = 15000  # median latency above which Tesseract takes over for a while
+    cpu_stage_executor: str = "thread"  # where light CPU stages run: process, thread or inline
+    heavy_stage_executor: str = "process"  # PDF optimization, page analysis, Tesseract, export rendering
+    cpu_stage_workers: int = 0  # size of each stage pool; 0 = one per core
     cache_ttl_seconds: int = 3600
+    export_cache_max_entries: int = 1000
+    export_url_expires_seconds: int = 3600
+    export_job_retention_hours: int = 24
+    near_duplicate_threshold: float = 0.85  # estimated Jaccard similarity of OCR text
+    near_duplicate_index_max_users: int = 256  # per-user LSH indexes kept in memory per worker
+    near_duplicate_index_ttl_seconds: int = 300  # rebuilt from stored signatures after this
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,438 @@
+"""
+Database access for route handlers and the background pipeline, built on the
+async Supabase client so a slow query never blocks the event loop. Row building
+and other pure helpers live in crud.py, next to the few sync queries threaded
+callers (export jobs, maintenance scripts) still need.
+"""
+from datetime import datetime
+from typing import AsyncIterator
+from postgrest.exceptions import APIError
+from app.database.supabase_client import get_supabase_admin_async
+from app.database.crud import (
+    INVOICE_STATUS_FIELDS,
+    UNIQUE_VIOLATION,
+    default_free_subscription,
+    invoice_data_update,
+    invoice_quota,
+    month_start_iso,
+)
+from app.models.schemas import InvoiceData
+
+
+# ─── Invoice CRUD ────────────────────────────────────────────────────────────
+
+
+async def create_invoice_record(
+    user_id: str,
+    original_filename: str,
+    file_path: str | None = None,
+    buyer_gstin: str | None = None,
+) -> dict:
+    """Create a new invoice record with status='pending'."""
+    db = await get_supabase_admin_async()
+    data = {
+        "user_id": user_id,
+        "original_filename": original_filename,
+        "file_path": file_path,
+        "buyer_gstin": buyer_gstin,
+        "status": "pending",
+    }
+    result = await db.table("invoices").insert(data).execute()
+    return result.data[0]
+
+
+async def create_invoice_records(
+    user_id: str, files: list[dict], buyer_gstin: str | None = None
+) -> list[dict]:
+    """
+    Create pending invoice records for many stored files in one insert.
+    Each entry of files has original_filename and file_path.
+    """
+    db = await get_supabase_admin_async()
+    rows = [
+        {
+            "user_id": user_id,
+            "original_filename": f["original_filename"],
+            "file_path": f["file_path"],
+            "buyer_gstin": buyer_gstin,
+            "status": "pending",
+        }
+        for f in files
+    ]
+    result = await db.table("invoices").insert(rows).execute()
+    return result.data
+
+
+async def create_child_invoices(
+    parent_id: str, user_id: str, page_ranges: list[tuple[int, int]]
+) -> list[dict]:
+    """
+    Create one pending child record per invoice found in a split PDF, in one
+    insert. Children share the parent's file; page_ranges are 1-based, inclusive.
+    """
+    db = await get_supabase_admin_async()
+    parent = await get_invoice(parent_id, user_id)
+    if not parent:
+        return []
+    rows = [
+        {
+            "user_id": user_id,
+            "parent_invoice_id": parent_id,
+            "original_filename": f"{parent['original_filename']} (pages {start}-{end})",
+            "file_path": parent["file_path"],
+            "buyer_gstin": parent["buyer_gstin"],
+            "page_start": start,
+            "page_end": end,
+            "status": "pending",
+        }
+        for start, end in page_ranges
+    ]
+    result = await db.table("invoices").insert(rows).execute()
+    return result.data
+
+
+async def mark_invoice_split(invoice_id: str, processing_time_ms: int) -> dict:
+    """Mark a PDF that held several invoices; its children carry the extracted data."""
+    db = await get_supabase_admin_async()
+    update = {
+        "status": "split",
+        "processing_time_ms": processing_time_ms,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    result = await db.table("invoices").update(update).eq("id", invoice_id).execute()
+    return result.data[0] if result.data else {}
+
+
+async def delete_invoice_record(invoice_id: str):
+    """Hard-delete a pending record whose upload was abandoned before processing."""
+    db = await get_supabase_admin_async()
+    await db.table("invoices").delete().eq("id", invoice_id).eq("status", "pending").execute()
+
+
+async def update_invoice_status(invoice_id: str, status: str) -> dict:
+    """Update invoice processing status."""
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("invoices")
+        .update({"status": status, "updated_at": datetime.utcnow().isoformat()})
+        .eq("id", invoice_id)
+        .execute()
+    )
+    return result.data[0] if result.data else {}
+
+
+async def _update_live_invoice(db, invoice_id: str, update: dict):
+    """Update an invoice unless it was soft-deleted while it was processing."""
+    return await (
+        db.table("invoices")
+        .update(update)
+        .eq("id", invoice_id)
+        .is_("deleted_at", "null")
+        .execute()
+    )
+
+
+async def save_invoice_data(
+    invoice_id: str, data: InvoiceData, processing_time_ms: int, user_id: str | None = None
+) -> dict:
+    """
+    Save extracted invoice data after successful processing.
+    If another live invoice of the user already has the same seller GSTIN,
+    bill number and bill date, the row is saved as a duplicate of it instead.
+    """
+    db = await get_supabase_admin_async()
+    update = invoice_data_update(data, processing_time_ms)
+    try:
+        result = await _update_live_invoice(db, invoice_id, update)
+    except APIError as e:
+        if e.code != UNIQUE_VIOLATION or not user_id:
+            raise
+        # The pre-extraction scan missed it; the unique index caught it
+        original = await find_duplicate_invoice(user_id, [update["dedupe_key"]])
+        update.update(
+            status="duplicate", dedupe_key=None, duplicate_of=original["id"] if original else None
+        )
+        result = await _update_live_invoice(db, invoice_id, update)
+    # The invoices_gst_rollup trigger adds a completed row to the GST rollups
+    return result.data[0] if result.data else {}
+
+
+async def find_duplicate_invoice(user_id: str, dedupe_keys: list[str]) -> dict | None:
+    """Return the live completed invoice matching any of the dedupe keys, if one exists."""
+    if not dedupe_keys:
+        return None
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("invoices")
+        .select("id, seller_gstin, bill_no, bill_date, dedupe_key")
+        .eq("user_id", user_id)
+        .in_("dedupe_key", dedupe_keys)
+        .is_("deleted_at", "null")
+        .limit(1)
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+
+async def mark_invoice_duplicate(invoice_id: str, duplicate_of: str, processing_time_ms: int) -> dict:
+    """Link an invoice to the original it duplicates; it is not processed further."""
+    db = await get_supabase_admin_async()
+    update = {
+        "status": "duplicate",
+        "duplicate_of": duplicate_of,
+        "processing_time_ms": processing_time_ms,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    result = await db.table("invoices").update(update).eq("id", invoice_id).execute()
+    return result.data[0] if result.data else {}
+
+
+async def save_invoice_error(invoice_id: str, error: dict, processing_time_ms: int) -> dict:
+    """Save error details when processing fails."""
+    db = await get_supabase_admin_async()
+    update = {
+        "status": "failed",
+        "validation_errors": [error.get("message", "Unknown error")],
+        "processing_time_ms": processing_time_ms,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+    result = await db.table("invoices").update(update).eq("id", invoice_id).execute()
+    return result.data[0] if result.data else {}
+
+
+async def get_invoice(invoice_id: str, user_id: str) -> dict | None:
+    """Fetch a single invoice by ID (scoped to user, excludes soft-deleted)."""
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("invoices")
+        .select("*")
+        .eq("id", invoice_id)
+        .eq("user_id", user_id)
+        .is_("deleted_at", "null")
+        .execute()
+    )
+    return result.data[0] if result.data else None
+
+
+async def get_invoice_statuses(invoice_ids: list[str], user_id: str) -> list[dict]:
+    """Fetch compact status rows for many invoices in one query (scoped to user)."""
+    return await get_invoices_by_ids(invoice_ids, user_id, columns=INVOICE_STATUS_FIELDS)
+
+
+async def get_invoices_by_ids(
+    invoice_ids: list[str], user_id: str, columns: str = "id, status, seller_gstin, bill_no, bill_date"
+) -> list[dict]:
+    """Fetch selected columns of many live invoices in one query (scoped to user)."""
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("invoices")
+        .select(columns)
+        .in_("id", invoice_ids)
+        .eq("user_id", user_id)
+        .is_("deleted_at", "null")
+        .execute()
+    )
+    return result.data
+
+
+async def list_invoices(
+    user_id: str,
+    page: int = 1,
+    limit: int = 20,
+    status: str | None = None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+) -> dict:
+    """List invoices with pagination and filters."""
+    db = await get_supabase_admin_async()
+    offset = (page - 1) * limit
+
+    query = db.table("invoices").select("*", count="exact").eq("user_id", user_id).is_("deleted_at", "null")
+
+    if status:
+        query = query.eq("status", status)
+    if from_date:
+        query = query.gte("bill_date", from_date)
+    if to_date:
+        query = query.lte("bill_date", to_date)
+
+    result = await query.order("created_at", desc=True).range(offset, offset + limit - 1).execute()
+
+    return {
+        "invoices": result.data,
+        "total": result.count,
+        "page": page,
+        "limit": limit,
+    }
+
+
+async def delete_invoice(invoice_id: str, user_id: str) -> bool:
+    """
+    Soft-delete an invoice (scoped to user), and with a split PDF also the
+    invoices found in it. Returns True if updated.
+    """
+    db = await get_supabase_admin_async()
+    update = {"deleted_at": datetime.utcnow().isoformat()}
+    deleted = []
+    # Plain eq() filters: invoice_id comes from the URL and is never spliced into filter syntax
+    for column in ("id", "parent_invoice_id"):
+        result = await (
+            db.table("invoices")
+            .update(update)
+            .eq(column, invoice_id)
+            .eq("user_id", user_id)
+            .is_("deleted_at", "null")
+            .execute()
+        )
+        deleted.extend(result.data)
+        if not deleted:
+            return False  # not the user's invoice (or already deleted); leave its children alone
+    deleted_ids = [row["id"] for row in deleted]
+    await db.table("invoice_signatures").delete().in_("invoice_id", deleted_ids).execute()
+    return True
+
+
+# ─── Invoice Signatures ──────────────────────────────────────────────────────
+
+
+async def save_invoice_signature(invoice_id: str, user_id: str, signature: list[int]) -> None:
+    """Store the MinHash signature of a completed invoice's OCR text."""
+    db = await get_supabase_admin_async()
+    await db.table("invoice_signatures").upsert(
+        {"invoice_id": invoice_id, "user_id": user_id, "minhash": signature},
+        on_conflict="invoice_id",
+    ).execute()
+
+
+async def iter_invoice_signatures(user_id: str, page_size: int = 1000) -> AsyncIterator[dict]:
+    """Yield every stored signature of a user, paged by invoice_id (keyset)."""
+    db = await get_supabase_admin_async()
+    last_id = None
+    while True:
+        query = db.table("invoice_signatures").select("invoice_id, minhash").eq("user_id", user_id)
+        if last_id:
+            query = query.gt("invoice_id", last_id)
+        rows = (await query.order("invoice_id").limit(page_size).execute()).data
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["invoice_id"]
+
+
+# ─── GST Rollups ─────────────────────────────────────────────────────────────
+
+
+async def get_gst_rollups(
+    user_id: str, from_month: str | None = None, to_month: str | None = None
+) -> tuple[list[dict], list[dict]]:
+    """
+    Fetch invoice-level and rate-level rollup rows for a user.
+    Months are YYYY-MM-01 dates, inclusive. Returns (invoice_rollups, rate_rollups).
+    """
+    db = await get_supabase_admin_async()
+    page_size = 1000  # PostgREST's default max rows per response
+    tables = []
+    for table in ("gst_invoice_rollups", "gst_rate_rollups"):
+        rows: list[dict] = []
+        while True:
+            query = db.table(table).select("*").eq("user_id", user_id)
+            if from_month:
+                query = query.gte("period_month", from_month)
+            if to_month:
+                query = query.lte("period_month", to_month)
+            page = (
+                await query.order("period_month").range(len(rows), len(rows) + page_size - 1).execute()
+            ).data
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+        tables.append(rows)
+    return tables[0], tables[1]
+
+
+# ─── Buyer GSTIN CRUD ────────────────────────────────────────────────────────
+
+
+async def create_buyer(
+    user_id: str, gstin: str, buyer_name: str | None = None, is_default: bool = False
+) -> dict:
+    """Save a buyer GSTIN for the user."""
+    db = await get_supabase_admin_async()
+    data = {
+        "user_id": user_id,
+        "gstin": gstin.strip().upper(),
+        "buyer_name": buyer_name,
+        "is_default": is_default,
+    }
+    result = await db.table("buyer_gstins").insert(data).execute()
+    return result.data[0]
+
+
+async def list_buyers(user_id: str) -> list[dict]:
+    """List all saved buyer GSTINs for a user."""
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("buyer_gstins")
+        .select("*")
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .execute()
+    )
+    return result.data
+
+
+async def delete_buyer(buyer_id: str, user_id: str) -> bool:
+    """Delete a buyer GSTIN."""
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("buyer_gstins")
+        .delete()
+        .eq("id", buyer_id)
+        .eq("user_id", user_id)
+        .execute()
+    )
+    return len(result.data) > 0
+
+
+# ─── Subscription CRUD ──────────────────────────────────────────────────────
+
+
+async def get_user_subscription(user_id: str) -> dict:
+    """Fetch the user's subscription. Returns free defaults if none exists or table is missing."""
+    try:
+        db = await get_supabase_admin_async()
+        result = await (
+            db.table("user_subscriptions")
+            .select("*")
+            .eq("user_id", user_id)
+            .limit(1)
+            .execute()
+        )
+        if result.data:
+            return result.data[0]
+    except Exception:
+        pass
+    return default_free_subscription(user_id)
+
+
+async def get_monthly_invoice_count(user_id: str) -> int:
+    """
+    Count invoices created by the user in the current calendar month. A split
+    PDF counts once per invoice found in it, not for the PDF itself.
+    """
+    db = await get_supabase_admin_async()
+    result = await (
+        db.table("invoices")
+        .select("id", count="exact")
+        .eq("user_id", user_id)
+        .neq("status", "split")
+        .gte("created_at", month_start_iso())
+        .execute()
+    )
+    return result.count or 0
+
+
+async def check_invoice_quota(user_id: str) -> dict:
+    """Check if the user can upload more invoices this month."""
+    return invoice_quota(await get_user_subscription(user_id), await get_monthly_invoice_count(user_id))
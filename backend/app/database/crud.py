@@ -1,47 +1,26 @@
+"""
+Shared row builders and constants for async_crud, plus the few synchronous
+queries used by threaded callers (export jobs, batch re-validation, load
+tests). Route handlers and the pipeline use async_crud, which is the only
+implementation of the invoice, buyer and subscription writes.
+"""
 from datetime import datetime
-from typing import Optional
+from typing import Iterator
 from app.database.supabase_client import get_supabase_admin
 from app.models.schemas import InvoiceData
+from app.services.dedupe_service import make_dedupe_key
 
 
 # ─── Invoice CRUD ────────────────────────────────────────────────────────────
 
 
-def create_invoice_record(
-    user_id: str,
-    original_filename: str,
-    file_path: str | None = None,
-    buyer_gstin: str | None = None,
-) -> dict:
-    """Create a new invoice record with status='pending'."""
-    db = get_supabase_admin()
-    data = {
-        "user_id": user_id,
-        "original_filename": original_filename,
-        "file_path": file_path,
-        "buyer_gstin": buyer_gstin,
-        "status": "pending",
-    }
-    result = db.table("invoices").insert(data).execute()
-    return result.data[0]
-
-
-def update_invoice_status(invoice_id: str, status: str) -> dict:
-    """Update invoice processing status."""
-    db = get_supabase_admin()
-    result = (
-        db.table("invoices")
-        .update({"status": status, "updated_at": datetime.utcnow().isoformat()})
-        .eq("id", invoice_id)
-        .execute()
-    )
-    return result.data[0] if result.data else {}
+# Postgres SQLSTATE for unique_violation
+UNIQUE_VIOLATION = "23505"
 
 
-def save_invoice_data(invoice_id: str, data: InvoiceData, processing_time_ms: int) -> dict:
-    """Save extracted invoice data after successful processing."""
-    db = get_supabase_admin()
-    update = {
+def invoice_data_update(data: InvoiceData, processing_time_ms: int) -> dict:
+    """Column values written when an invoice completes (shared with async_crud)."""
+    return {
         "seller_name": data.seller_name,
         "seller_gstin": data.seller_gstin,
         "buyer_gstin": data.buyer_gstin,
@@ -58,100 +37,107 @@ def save_invoice_data(invoice_id: str, data: InvoiceData, processing_time_ms: in
         "validation_errors": data.validation_errors,
         "processing_time_ms": processing_time_ms,
         "status": "completed",
+        "dedupe_key": make_dedupe_key(data.seller_gstin, data.bill_no, data.bill_date),
         "updated_at": datetime.utcnow().isoformat(),
     }
-    result = db.table("invoices").update(update).eq("id", invoice_id).execute()
-    return result.data[0] if result.data else {}
 
 
-def save_invoice_error(invoice_id: str, error: dict, processing_time_ms: int) -> dict:
-    """Save error details when processing fails."""
-    db = get_supabase_admin()
-    update = {
-        "status": "failed",
-        "validation_errors": [error.get("message", "Unknown error")],
-        "processing_time_ms": processing_time_ms,
-        "updated_at": datetime.utcnow().isoformat(),
-    }
-    result = db.table("invoices").update(update).eq("id", invoice_id).execute()
-    return result.data[0] if result.data else {}
-
-
-def get_invoice(invoice_id: str, user_id: str) -> dict | None:
-    """Fetch a single invoice by ID (scoped to user, excludes soft-deleted)."""
-    db = get_supabase_admin()
-    result = (
-        db.table("invoices")
-        .select("*")
-        .eq("id", invoice_id)
-        .eq("user_id", user_id)
-        .is_("deleted_at", "null")
-        .execute()
-    )
-    return result.data[0] if result.data else None
+INVOICE_STATUS_FIELDS = (
+    "id, status, original_filename, seller_name, bill_no, bill_date, "
+    "total_amount, validation_passed, processing_time_ms, updated_at"
+)
 
 
-def list_invoices(
+def count_invoices(
     user_id: str,
-    page: int = 1,
-    limit: int = 20,
-    status: str | None = None,
     from_date: str | None = None,
     to_date: str | None = None,
-) -> dict:
-    """List invoices with pagination and filters."""
+    status: str | None = "completed",
+) -> int:
+    """Count invoices matching the same filters as iter_invoices."""
     db = get_supabase_admin()
-    offset = (page - 1) * limit
-
-    query = db.table("invoices").select("*", count="exact").eq("user_id", user_id).is_("deleted_at", "null")
-
+    query = db.table("invoices").select("id", count="exact").eq("user_id", user_id).is_("deleted_at", "null")
     if status:
         query = query.eq("status", status)
     if from_date:
         query = query.gte("bill_date", from_date)
     if to_date:
         query = query.lte("bill_date", to_date)
+    return query.limit(1).execute().count or 0
 
-    result = query.order("created_at", desc=True).range(offset, offset + limit - 1).execute()
 
-    return {
-        "invoices": result.data,
-        "total": result.count,
-        "page": page,
-        "limit": limit,
-    }
-
-
-def delete_invoice(invoice_id: str, user_id: str) -> bool:
-    """Soft-delete an invoice (scoped to user). Returns True if updated."""
+def iter_invoice_pages(
+    user_id: str | None,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    status: str | None = "completed",
+    page_size: int = 500,
+) -> Iterator[list[dict]]:
+    """
+    Yield matching invoice rows a page at a time.
+    Pages by id (keyset), so each page costs the same however deep the scan goes.
+    user_id=None scans every user (maintenance jobs only, never from a route).
+    """
     db = get_supabase_admin()
-    result = (
-        db.table("invoices")
-        .update({"deleted_at": datetime.utcnow().isoformat()})
-        .eq("id", invoice_id)
-        .eq("user_id", user_id)
-        .is_("deleted_at", "null")
-        .execute()
-    )
-    return len(result.data) > 0
+    last_id = None
+    while True:
+        query = db.table("invoices").select("*").is_("deleted_at", "null")
+        if user_id:
+            query = query.eq("user_id", user_id)
+        if status:
+            query = query.eq("status", status)
+        if from_date:
+            query = query.gte("bill_date", from_date)
+        if to_date:
+            query = query.lte("bill_date", to_date)
+        if last_id:
+            query = query.gt("id", last_id)
+
+        rows = query.order("id").limit(page_size).execute().data
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def iter_invoices(
+    user_id: str,
+    from_date: str | None = None,
+    to_date: str | None = None,
+    status: str | None = "completed",
+    page_size: int = 500,
+) -> Iterator[dict]:
+    """Yield every matching invoice row of a user, fetched page by page."""
+    for page in iter_invoice_pages(user_id, from_date, to_date, status, page_size):
+        yield from page
+
+
+def bulk_update_validation(results: list[dict]) -> int:
+    """
+    Write back validation_passed / validation_errors for many invoices in one call.
+    Each item needs id, validation_passed and validation_errors. Runs as an
+    UPDATE through the update_invoice_validation RPC, so unknown or deleted
+    ids are skipped rather than inserted. Returns the number of rows updated.
+    """
+    if not results:
+        return 0
+    db = get_supabase_admin()
+    rows = [
+        {
+            "id": item["id"],
+            "validation_passed": item["validation_passed"],
+            "validation_errors": item["validation_errors"],
+        }
+        for item in results
+    ]
+    result = db.rpc("update_invoice_validation", {"p_rows": rows}).execute()
+    return result.data or 0
 
 
 # ─── Buyer GSTIN CRUD ────────────────────────────────────────────────────────
 
 
-def create_buyer(user_id: str, gstin: str, buyer_name: str | None = None, is_default: bool = False) -> dict:
-    """Save a buyer GSTIN for the user."""
-    db = get_supabase_admin()
-    data = {
-        "user_id": user_id,
-        "gstin": gstin.strip().upper(),
-        "buyer_name": buyer_name,
-        "is_default": is_default,
-    }
-    result = db.table("buyer_gstins").insert(data).execute()
-    return result.data[0]
-
-
 def list_buyers(user_id: str) -> list[dict]:
     """List all saved buyer GSTINs for a user."""
     db = get_supabase_admin()
@@ -165,33 +151,6 @@ def list_buyers(user_id: str) -> list[dict]:
     return result.data
 
 
-def get_default_buyer(user_id: str) -> dict | None:
-    """Get the default buyer GSTIN for a user."""
-    db = get_supabase_admin()
-    result = (
-        db.table("buyer_gstins")
-        .select("*")
-        .eq("user_id", user_id)
-        .eq("is_default", True)
-        .limit(1)
-        .execute()
-    )
-    return result.data[0] if result.data else None
-
-
-def delete_buyer(buyer_id: str, user_id: str) -> bool:
-    """Delete a buyer GSTIN."""
-    db = get_supabase_admin()
-    result = (
-        db.table("buyer_gstins")
-        .delete()
-        .eq("id", buyer_id)
-        .eq("user_id", user_id)
-        .execute()
-    )
-    return len(result.data) > 0
-
-
 # ─── Subscription CRUD ──────────────────────────────────────────────────────
 
 PLAN_LIMITS = {
@@ -200,7 +159,7 @@ PLAN_LIMITS = {
 }
 
 
-def _default_free_subscription(user_id: str) -> dict:
+def default_free_subscription(user_id: str) -> dict:
     return {
         "user_id": user_id,
         "plan": "free",
@@ -210,48 +169,19 @@ def _default_free_subscription(user_id: str) -> dict:
     }
 
 
-def get_user_subscription(user_id: str) -> dict:
-    """Fetch the user's subscription. Returns free defaults if none exists or table is missing."""
-    try:
-        db = get_supabase_admin()
-        result = (
-            db.table("user_subscriptions")
-            .select("*")
-            .eq("user_id", user_id)
-            .limit(1)
-            .execute()
-        )
-        if result.data:
-            return result.data[0]
-    except Exception:
-        pass
-    return _default_free_subscription(user_id)
-
-
-def get_monthly_invoice_count(user_id: str) -> int:
-    """Count invoices created by the user in the current calendar month."""
-    db = get_supabase_admin()
-    now = datetime.utcnow()
-    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
-    result = (
-        db.table("invoices")
-        .select("id", count="exact")
-        .eq("user_id", user_id)
-        .gte("created_at", month_start)
-        .execute()
-    )
-    return result.count or 0
-
-
-def check_invoice_quota(user_id: str) -> dict:
-    """Check if the user can upload more invoices this month."""
-    sub = get_user_subscription(user_id)
-    plan = sub.get("plan", "free")
+def invoice_quota(subscription: dict, used: int) -> dict:
+    """Quota status for a subscription row and this month's invoice count."""
+    plan = subscription.get("plan", "free")
     limit = PLAN_LIMITS.get(plan, PLAN_LIMITS["free"])
-    used = get_monthly_invoice_count(user_id)
     return {
         "allowed": used < limit,
         "used": used,
         "limit": limit,
         "plan": plan,
     }
+
+
+def month_start_iso() -> str:
+    """Start of the current calendar month (UTC), for monthly usage counts."""
+    now = datetime.utcnow()
+    return now.replace(day=1, hour=0, minute=0, second=0, microsecond=0).isoformat()
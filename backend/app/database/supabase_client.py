@@ -1,8 +1,262 @@
-from supabase import create_client, Client
+import threading
+
+import httpx
+import structlog
+from gotrue.http_clients import SyncClient as AuthHTTPClient
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestHTTPClient
+from storage3 import AsyncStorageClient, SyncStorageClient
+from storage3.utils import SyncClient as StorageHTTPClient
+from supabase import AsyncClient, Client
+from supabase._async.auth_client import AsyncSupabaseAuthClient
+from supabase._sync.auth_client import SyncSupabaseAuthClient
 from app.config import get_settings
 
+logger = structlog.get_logger()
+
 _client: Client | None = None
 _admin_client: Client | None = None
+_async_client: AsyncClient | None = None
+_async_admin_client: AsyncClient | None = None
+_transport: "InstrumentedTransport | None" = None
+_async_transport: "InstrumentedAsyncTransport | None" = None
+_transport_lock = threading.Lock()
+
+
+# ─── Shared HTTP transport ───────────────────────────────────────────────────
+
+
+class _PoolStats:
+    """
+    Counts requests and newly opened connections via httpcore's trace hook,
+    so the reuse rate of a shared pool can be observed.
+    """
+
+    def _init_stats(self):
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.http2_connections = 0
+
+    def _count_request(self):
+        with self._stats_lock:
+            self.requests += 1
+
+    def _record(self, event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            with self._stats_lock:
+                self.connections_opened += 1
+        elif event_name == "http2.send_connection_init.complete":
+            with self._stats_lock:
+                self.http2_connections += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            requests, opened, http2 = self.requests, self.connections_opened, self.http2_connections
+        return {
+            "requests": requests,
+            "connections_opened": opened,
+            "http2_connections": http2,
+            "open_connections": len(self._pool.connections),
+            "reuse_rate": round(1 - opened / requests, 4) if requests else None,
+        }
+
+
+class InstrumentedTransport(_PoolStats, httpx.HTTPTransport):
+    """Shared sync transport with reuse metrics."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._init_stats()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._count_request()
+        outer_trace = request.extensions.get("trace")
+
+        def trace(event_name: str, info: dict):
+            self._record(event_name)
+            if outer_trace:
+                outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        return super().handle_request(request)
+
+    def close(self):
+        # Shared by every client: closing one httpx.Client must not close the pool
+        pass
+
+    def shutdown(self):
+        """Close the pool's connections (application shutdown only)."""
+        super().close()
+
+
+class InstrumentedAsyncTransport(_PoolStats, httpx.AsyncHTTPTransport):
+    """Shared async transport with reuse metrics."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._init_stats()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._count_request()
+        outer_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict):
+            self._record(event_name)
+            if outer_trace:
+                await outer_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+    async def aclose(self):
+        # Shared by every client: closing one httpx.AsyncClient must not close the pool
+        pass
+
+    async def shutdown(self):
+        """Close the pool's connections (application shutdown only)."""
+        await super().aclose()
+
+
+def _transport_options() -> dict:
+    settings = get_settings()
+    return {
+        "http2": settings.supabase_http2,
+        "limits": httpx.Limits(
+            max_connections=settings.supabase_max_connections,
+            max_keepalive_connections=settings.supabase_max_keepalive_connections,
+            keepalive_expiry=settings.supabase_keepalive_expiry_seconds,
+        ),
+        "retries": settings.supabase_connect_retries,
+    }
+
+
+def get_http_transport() -> InstrumentedTransport:
+    """
+    The one connection pool shared by every Supabase client (PostgREST, storage, auth).
+    All three talk to the same origin, so with HTTP/2 they multiplex over a few
+    long-lived connections instead of each opening their own.
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = InstrumentedTransport(**_transport_options())
+    return _transport
+
+
+def get_async_http_transport() -> InstrumentedAsyncTransport:
+    """Async counterpart of get_http_transport(), used by the async clients on the event loop."""
+    global _async_transport
+    if _async_transport is None:
+        _async_transport = InstrumentedAsyncTransport(**_transport_options())
+    return _async_transport
+
+
+def _http_timeout() -> httpx.Timeout:
+    settings = get_settings()
+    return httpx.Timeout(
+        settings.supabase_timeout_seconds, connect=settings.supabase_connect_timeout_seconds
+    )
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return PostgrestHTTPClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=_http_timeout(),
+            follow_redirects=True,
+            transport=get_http_transport(),
+        )
+
+
+class _PooledStorageClient(SyncStorageClient):
+    def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return StorageHTTPClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=_http_timeout(),
+            follow_redirects=True,
+            transport=get_http_transport(),
+        )
+
+
+class PooledClient(Client):
+    """Supabase client whose sub-clients all send requests through get_http_transport()."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema)
+
+    @staticmethod
+    def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True, proxy=None):
+        return _PooledStorageClient(storage_url, headers)
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url, client_options, verify=True, proxy=None):
+        return SyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=AuthHTTPClient(
+                timeout=_http_timeout(), follow_redirects=True, transport=get_http_transport()
+            ),
+        )
+
+
+class _PooledAsyncPostgrestClient(AsyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=_http_timeout(),
+            follow_redirects=True,
+            transport=get_async_http_transport(),
+        )
+
+
+class _PooledAsyncStorageClient(AsyncStorageClient):
+    def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=_http_timeout(),
+            follow_redirects=True,
+            transport=get_async_http_transport(),
+        )
+
+
+class PooledAsyncClient(AsyncClient):
+    """Async Supabase client whose sub-clients all use get_async_http_transport()."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+        return _PooledAsyncPostgrestClient(rest_url, headers=headers, schema=schema)
+
+    @staticmethod
+    def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True, proxy=None):
+        return _PooledAsyncStorageClient(storage_url, headers)
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url, client_options, verify=True, proxy=None):
+        return AsyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=httpx.AsyncClient(
+                timeout=_http_timeout(), follow_redirects=True, transport=get_async_http_transport()
+            ),
+        )
+
+
+# ─── Clients ─────────────────────────────────────────────────────────────────
 
 
 def get_supabase() -> Client:
@@ -10,7 +264,7 @@ def get_supabase() -> Client:
     global _client
     if _client is None:
         settings = get_settings()
-        _client = create_client(settings.supabase_url, settings.supabase_key)
+        _client = PooledClient.create(settings.supabase_url, settings.supabase_key)
     return _client
 
 
@@ -19,5 +273,79 @@ def get_supabase_admin() -> Client:
     global _admin_client
     if _admin_client is None:
         settings = get_settings()
-        _admin_client = create_client(settings.supabase_url, settings.supabase_service_key)
+        _admin_client = PooledClient.create(settings.supabase_url, settings.supabase_service_key)
     return _admin_client
+
+
+async def get_supabase_async() -> AsyncClient:
+    """Async client with anon key (respects RLS), for use on the event loop."""
+    global _async_client
+    if _async_client is None:
+        settings = get_settings()
+        _async_client = await PooledAsyncClient.create(settings.supabase_url, settings.supabase_key)
+    return _async_client
+
+
+async def get_supabase_admin_async() -> AsyncClient:
+    """Async client with service_role key (bypasses RLS), for use on the event loop."""
+    global _async_admin_client
+    if _async_admin_client is None:
+        settings = get_settings()
+        _async_admin_client = await PooledAsyncClient.create(
+            settings.supabase_url, settings.supabase_service_key
+        )
+    return _async_admin_client
+
+
+def warm_up_pool():
+    """
+    Open the sync pool's connection before the first request, so that request
+    doesn't pay for DNS, TCP, TLS and HTTP/2 setup. Best-effort.
+    """
+    settings = get_settings()
+    if not (settings.supabase_url and settings.supabase_service_key):
+        return
+    try:
+        get_supabase_admin().table("invoices").select("id").limit(1).execute()
+        get_supabase()
+        logger.info("supabase_pool_warmed", **get_http_transport().stats())
+    except Exception as e:
+        logger.warning("supabase_pool_warm_up_failed", error=str(e))
+
+
+async def warm_up_async_pool():
+    """Same as warm_up_pool() for the async pool that route handlers use."""
+    settings = get_settings()
+    if not (settings.supabase_url and settings.supabase_service_key):
+        return
+    try:
+        db = await get_supabase_admin_async()
+        await db.table("invoices").select("id").limit(1).execute()
+        await get_supabase_async()
+        logger.info("supabase_async_pool_warmed", **get_async_http_transport().stats())
+    except Exception as e:
+        logger.warning("supabase_async_pool_warm_up_failed", error=str(e))
+
+
+def get_pool_stats() -> dict:
+    """Connection reuse metrics of the shared Supabase pools."""
+    return {
+        "sync": get_http_transport().stats(),
+        "async": get_async_http_transport().stats(),
+    }
+
+
+def close_pool():
+    """Close the sync pool's connections on application shutdown."""
+    global _transport, _client, _admin_client
+    if _transport is not None:
+        _transport.shutdown()
+    _transport = _client = _admin_client = None
+
+
+async def close_async_pool():
+    """Close the async pool's connections on application shutdown."""
+    global _async_transport, _async_client, _async_admin_client
+    if _async_transport is not None:
+        await _async_transport.shutdown()
+    _async_transport = _async_client = _async_admin_client = None
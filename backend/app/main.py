@@ -1,6 +1,17 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
+from app.database.supabase_client import (
+    warm_up_pool,
+    warm_up_async_pool,
+    get_pool_stats,
+    close_pool,
+    close_async_pool,
+)
+from app.services.ocr_service import get_engine_stats
+from app.services.stage_runner import shutdown_stage_pool
 from app.api.routes.invoices import router as invoices_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.buyers import router as buyers_router
@@ -8,10 +19,21 @@ from app.api.routes.subscriptions import router as subscriptions_router
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.gather(asyncio.to_thread(warm_up_pool), warm_up_async_pool())
+    yield
+    shutdown_stage_pool()
+    await close_async_pool()
+    close_pool()
+
+
 app = FastAPI(
     title="Creative Invoice - GST Invoice Extractor",
     description="Extract structured data from Indian GST invoices using OCR + AI",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -31,3 +53,15 @@ app.include_router(subscriptions_router)
 @app.get("/health")
 async def health_check():
     return {"status": "ok", "environment": settings.environment}
+
+
+@app.get("/health/connections")
+async def connection_stats():
+    """Reuse metrics of the shared Supabase connection pool."""
+    return {"status": "ok", "supabase": get_pool_stats()}
+
+
+@app.get("/health/ocr")
+async def ocr_stats():
+    """Per-engine OCR latency, confidence and validation pass rate, and provider health."""
+    return {"status": "ok", **get_engine_stats()}
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, computed_field, field_validator
 from typing import Optional
-from datetime import date
+from datetime import date, datetime, timezone
 import re
 
 
@@ -59,16 +59,90 @@ class OCRResult(BaseModel):
     tables: list[dict] = Field(default_factory=list)
     key_value_pairs: list[dict] = Field(default_factory=list)
     confidence: float = 0.0
+    pages: list[str] = Field(default_factory=list)  # OCR text of each page
+    page_numbers: list[int] = Field(default_factory=list)  # original page of each entry in pages, when blank pages were dropped
+    engine: str = "document_ai"  # OCR engine(s) that read the pages, e.g. "document_ai+text_layer"
+
+
+class InvoiceSegment(BaseModel):
+    page_start: int  # 1-based, inclusive
+    page_end: int
+    ocr_result: OCRResult
 
 
 class ProcessingResult(BaseModel):
     invoice_id: Optional[str] = None
-    status: str = "pending"  # pending, processing, completed, failed
+    status: str = "pending"  # pending, processing, completed, failed, duplicate, split
     invoice_data: Optional[InvoiceData] = None
+    duplicate_of: Optional[str] = None
+    minhash_signature: Optional[list[int]] = None
+    segments: Optional[list[InvoiceSegment]] = None  # for status="split": one per invoice found
     error: Optional[dict] = None
     processing_time_ms: Optional[int] = None
 
 
+class ExportJob(BaseModel):
+    id: str
+    user_id: str
+    format: str
+    from_date: Optional[str] = None
+    to_date: Optional[str] = None
+    status: str = "pending"  # pending, running, completed, failed
+    total: Optional[int] = None
+    processed: int = 0
+    storage_path: Optional[str] = None
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        if self.status == "completed":
+            return 1.0
+        if not self.total:
+            return 0.0
+        return round(min(self.processed / self.total, 1.0), 4)
+
+
+class OCREngineStats(BaseModel):
+    documents: int = 0
+    pages: int = 0
+    failures: int = 0
+    latency_ms_total: int = 0
+    confidence_total: float = 0.0
+    validated: int = 0  # extracted invoices read by this engine
+    validation_passed: int = 0
+
+    @computed_field
+    @property
+    def avg_latency_ms(self) -> float:
+        return round(self.latency_ms_total / self.documents, 1) if self.documents else 0.0
+
+    @computed_field
+    @property
+    def avg_confidence(self) -> float:
+        return round(self.confidence_total / self.documents, 4) if self.documents else 0.0
+
+    @computed_field
+    @property
+    def validation_pass_rate(self) -> float:
+        return round(self.validation_passed / self.validated, 4) if self.validated else 0.0
+
+
+class UploadSession(BaseModel):
+    id: str
+    user_id: str
+    filename: str
+    size: int
+    buyer_gstin: Optional[str] = None
+    offset: int = 0  # bytes received so far; the next chunk must start here
+    chunk_size: int
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
 class InvoiceUploadRequest(BaseModel):
     buyer_gstin: Optional[str] = None
 
@@ -0,0 +1,153 @@
+import os
+import zipfile
+from datetime import date, datetime
+from typing import Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Rows per Parquet record batch; matches the DB page size so each page
+# read from Supabase becomes one batch.
+BATCH_SIZE = 500
+
+INVOICES_SCHEMA = pa.schema([
+    ("invoice_id", pa.string()),
+    ("original_filename", pa.string()),
+    ("seller_name", pa.string()),
+    ("seller_gstin", pa.string()),
+    ("buyer_gstin", pa.string()),
+    ("bill_no", pa.string()),
+    ("bill_date", pa.date32()),
+    ("total_taxable_value", pa.float64()),
+    ("total_cgst", pa.float64()),
+    ("total_sgst", pa.float64()),
+    ("total_igst", pa.float64()),
+    ("total_quantity", pa.float64()),
+    ("total_amount", pa.float64()),
+    ("validation_passed", pa.bool_()),
+    ("created_at", pa.timestamp("us", tz="UTC")),
+])
+
+TAX_BREAKUP_SCHEMA = pa.schema([
+    ("invoice_id", pa.string()),
+    ("seller_gstin", pa.string()),
+    ("bill_date", pa.date32()),
+    ("rate", pa.float64()),
+    ("taxable_value", pa.float64()),
+    ("cgst_amount", pa.float64()),
+    ("sgst_amount", pa.float64()),
+    ("igst_amount", pa.float64()),
+    ("total_with_tax", pa.float64()),
+])
+
+
+def _to_date(value) -> date | None:
+    if not value:
+        return None
+    return date.fromisoformat(str(value)[:10])
+
+
+def _to_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _to_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+class _ColumnBuffer:
+    """Accumulates column lists for one schema and flushes them as record batches."""
+
+    def __init__(self, writer: pq.ParquetWriter, schema: pa.Schema):
+        self.writer = writer
+        self.schema = schema
+        self.columns = {name: [] for name in schema.names}
+        self.rows = 0
+
+    def append(self, values: dict):
+        for name, column in self.columns.items():
+            column.append(values.get(name))
+        self.rows += 1
+        if self.rows >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        batch = pa.record_batch(
+            [pa.array(self.columns[name], type=field.type) for name, field in zip(self.schema.names, self.schema)],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch)
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+
+def write_parquet_tables(rows: Iterable[dict], invoices_path: str, tax_breakup_path: str) -> tuple[int, int]:
+    """
+    Write invoice rows as two Parquet files: one row per invoice, and one
+    exploded row per tax_breakup rate. Rows are consumed lazily and written in
+    record batches, so memory is bounded by BATCH_SIZE.
+    Returns (invoice_count, tax_breakup_count).
+    """
+    invoice_count = 0
+    breakup_count = 0
+    with pq.ParquetWriter(invoices_path, INVOICES_SCHEMA, compression="zstd") as invoices_writer, \
+            pq.ParquetWriter(tax_breakup_path, TAX_BREAKUP_SCHEMA, compression="zstd") as breakup_writer:
+        invoices = _ColumnBuffer(invoices_writer, INVOICES_SCHEMA)
+        breakups = _ColumnBuffer(breakup_writer, TAX_BREAKUP_SCHEMA)
+
+        for row in rows:
+            bill_date = _to_date(row.get("bill_date"))
+            invoices.append({
+                "invoice_id": row["id"],
+                "original_filename": row.get("original_filename"),
+                "seller_name": row.get("seller_name"),
+                "seller_gstin": row.get("seller_gstin"),
+                "buyer_gstin": row.get("buyer_gstin"),
+                "bill_no": row.get("bill_no"),
+                "bill_date": bill_date,
+                "total_taxable_value": _to_float(row.get("total_taxable_value")),
+                "total_cgst": _to_float(row.get("total_cgst")),
+                "total_sgst": _to_float(row.get("total_sgst")),
+                "total_igst": _to_float(row.get("total_igst")),
+                "total_quantity": _to_float(row.get("total_quantity")),
+                "total_amount": _to_float(row.get("total_amount")),
+                "validation_passed": row.get("validation_passed"),
+                "created_at": _to_timestamp(row.get("created_at")),
+            })
+            invoice_count += 1
+
+            for item in row.get("tax_breakup") or []:
+                breakups.append({
+                    "invoice_id": row["id"],
+                    "seller_gstin": row.get("seller_gstin"),
+                    "bill_date": bill_date,
+                    "rate": _to_float(item.get("rate")),
+                    "taxable_value": _to_float(item.get("taxable_value")),
+                    "cgst_amount": _to_float(item.get("cgst_amount")),
+                    "sgst_amount": _to_float(item.get("sgst_amount")),
+                    "igst_amount": _to_float(item.get("igst_amount")),
+                    "total_with_tax": _to_float(item.get("total_with_tax")),
+                })
+                breakup_count += 1
+
+        invoices.flush()
+        breakups.flush()
+
+    return invoice_count, breakup_count
+
+
+def write_parquet_archive(rows: Iterable[dict], archive_path: str, work_dir: str) -> tuple[int, int]:
+    """Write both tables and bundle them as invoices.parquet + tax_breakup.parquet in a zip."""
+    invoices_path = os.path.join(work_dir, "invoices.parquet")
+    tax_breakup_path = os.path.join(work_dir, "tax_breakup.parquet")
+    counts = write_parquet_tables(rows, invoices_path, tax_breakup_path)
+
+    # Parquet pages are already compressed; store them as-is
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_STORED) as archive:
+        archive.write(invoices_path, "invoices.parquet")
+        archive.write(tax_breakup_path, "tax_breakup.parquet")
+    return counts
@@ -0,0 +1,50 @@
+"""Async counterparts of storage_service for route handlers (async Supabase client)."""
+import uuid
+from app.database.supabase_client import get_supabase_admin_async
+from app.services.storage_service import BUCKET_NAME
+from app.utils.spool import SpooledPdf
+
+
+def new_pdf_path(user_id: str) -> str:
+    """Storage path for a new upload: {user_id}/{unique_id}.pdf"""
+    return f"{user_id}/{uuid.uuid4()}.pdf"
+
+
+async def upload_pdf(
+    user_id: str, filename: str, pdf: bytes | SpooledPdf, storage_path: str | None = None
+) -> str:
+    """
+    Upload PDF to Supabase Storage. A spooled PDF is streamed from disk.
+    Stores under storage_path, or a new invoices/{user_id}/{unique_id}.pdf.
+    Returns the storage path.
+    """
+    sb = await get_supabase_admin_async()
+    storage_path = storage_path or new_pdf_path(user_id)
+    file_options = {"content-type": "application/pdf"}
+
+    if isinstance(pdf, SpooledPdf):
+        with pdf.open() as f:
+            await sb.storage.from_(BUCKET_NAME).upload(path=storage_path, file=f, file_options=file_options)
+    else:
+        await sb.storage.from_(BUCKET_NAME).upload(path=storage_path, file=pdf, file_options=file_options)
+
+    return storage_path
+
+
+async def download_pdf(storage_path: str) -> bytes:
+    """Download PDF bytes from Supabase Storage."""
+    sb = await get_supabase_admin_async()
+    return await sb.storage.from_(BUCKET_NAME).download(storage_path)
+
+
+async def delete_pdf(storage_path: str):
+    """Delete a PDF from Supabase Storage."""
+    sb = await get_supabase_admin_async()
+    await sb.storage.from_(BUCKET_NAME).remove([storage_path])
+
+
+async def get_signed_url(storage_path: str, expires_in: int = 3600) -> str:
+    """Get a temporary signed URL for PDF download."""
+    sb = await get_supabase_admin_async()
+    result = await sb.storage.from_(BUCKET_NAME).create_signed_url(storage_path, expires_in)
+    return result["signedURL"]
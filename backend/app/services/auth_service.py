@@ -1,4 +1,4 @@
-from app.database.supabase_client import get_supabase
+from app.database.supabase_client import get_supabase, get_supabase_async
 
 
 def sign_up(email: str, password: str) -> dict:
@@ -58,6 +58,20 @@ def get_user_from_token(access_token: str) -> dict:
     }
 
 
+async def get_user_from_token_async(access_token: str) -> dict:
+    """Async get_user_from_token() for the per-request auth dependency."""
+    sb = await get_supabase_async()
+    result = await sb.auth.get_user(access_token)
+
+    if result.user is None:
+        raise ValueError("Invalid or expired token.")
+
+    return {
+        "user_id": result.user.id,
+        "email": result.user.email,
+    }
+
+
 def sign_out(access_token: str):
     """Sign out user and invalidate their session."""
     sb = get_supabase()
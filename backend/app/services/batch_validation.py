@@ -0,0 +1,156 @@
+import re
+
+import numpy as np
+import structlog
+
+from app.database.crud import bulk_update_validation, iter_invoice_pages
+from app.models.schemas import InvoiceData
+from app.services.output_service import invoice_data_from_record
+from app.services.validation_service import TOLERANCE, validate_gstin, validate_invoice_data
+
+logger = structlog.get_logger()
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Breakup sums are computed with a different summation order than Python's sum(),
+# so they can differ by a few ULPs. Anything this close to TOLERANCE is re-checked
+# with the scalar validator instead of being trusted.
+_SUM_MARGIN = 1e-6
+
+
+def _text_rules_mask(invoices: list[InvoiceData]) -> np.ndarray:
+    """
+    Non-numeric checks of validate_invoice_data (required fields, GSTIN and date
+    formats). Sellers and dates repeat heavily across a backlog, so each distinct
+    value is pattern-matched once.
+    """
+    gstin_ok = {None: True}
+    date_ok = {}
+    mask = np.empty(len(invoices), dtype=bool)
+    for idx, d in enumerate(invoices):
+        for gstin in (d.seller_gstin, d.buyer_gstin):
+            if gstin not in gstin_ok:
+                gstin_ok[gstin] = validate_gstin(gstin)
+        if d.bill_date not in date_ok:
+            date_ok[d.bill_date] = bool(d.bill_date and DATE_PATTERN.match(d.bill_date))
+        mask[idx] = bool(
+            d.seller_name
+            and d.seller_gstin
+            and d.bill_no
+            and gstin_ok[d.seller_gstin]
+            and gstin_ok[d.buyer_gstin]
+            and date_ok[d.bill_date]
+        )
+    return mask
+
+
+def screen_invoices(invoices: list[InvoiceData]) -> np.ndarray:
+    """
+    Vectorized pass over a chunk of invoices. Returns a boolean mask of invoices
+    that definitely pass every rule of validate_invoice_data. False means
+    "needs the scalar validator", not necessarily "invalid".
+    """
+    n = len(invoices)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    totals = np.array(
+        [
+            (d.total_taxable_value, d.total_cgst, d.total_sgst, d.total_igst, d.total_amount)
+            for d in invoices
+        ],
+        dtype=np.float64,
+    )
+    taxable, cgst, sgst, igst, amount = totals.T
+    text_ok = _text_rules_mask(invoices)
+
+    has_cgst_sgst = (cgst > 0) | (sgst > 0)
+    has_igst = igst > 0
+
+    ok = text_ok & (amount > 0)
+
+    # IGST is exclusive with CGST/SGST
+    ok &= ~(has_cgst_sgst & has_igst)
+
+    # Intra-state: CGST == SGST
+    ok &= ~(has_cgst_sgst & ~has_igst & (np.abs(cgst - sgst) > 0.01))
+
+    # Totals (same operand order as the scalar rule, so results are bit-identical)
+    calculated = np.where(has_igst, taxable + igst, taxable + cgst + sgst)
+    ok &= ~(np.abs(calculated - amount) > TOLERANCE)
+
+    # Tax breakup: flatten every row, remembering which invoice it belongs to
+    counts = np.fromiter((len(d.tax_breakup) for d in invoices), dtype=np.int64, count=n)
+    if counts.sum():
+        owner = np.repeat(np.arange(n), counts)
+        breakup = np.array(
+            [
+                (i.taxable_value, i.cgst_amount, i.sgst_amount, i.igst_amount, i.total_with_tax)
+                for d in invoices
+                for i in d.tax_breakup
+            ],
+            dtype=np.float64,
+        )
+        b_taxable, b_cgst, b_sgst, b_igst, b_total = breakup.T
+
+        has_breakup = counts > 0
+        for column, total in (
+            (b_taxable, taxable),
+            (b_cgst, cgst),
+            (b_sgst, sgst),
+            (b_igst, igst),
+        ):
+            sums = np.bincount(owner, weights=column, minlength=n)
+            ok &= ~(has_breakup & (np.abs(sums - total) > TOLERANCE - _SUM_MARGIN))
+
+        # Each breakup row's own math (elementwise, bit-identical to the scalar rule)
+        row_bad = np.abs(b_taxable + b_cgst + b_sgst + b_igst - b_total) > TOLERANCE
+        ok &= np.bincount(owner, weights=row_bad, minlength=n) == 0
+
+    return ok
+
+
+def validate_invoices_batch(invoices: list[InvoiceData]) -> list[tuple[bool, list[str]]]:
+    """
+    Batch equivalent of validate_invoice_data: same (is_valid, errors) per invoice.
+    Invoices cleared by the vectorized screen skip the scalar path; the rest go
+    through validate_invoice_data so error messages match exactly.
+    """
+    clean = screen_invoices(invoices)
+    return [
+        (True, []) if passed else validate_invoice_data(data)
+        for data, passed in zip(invoices, clean.tolist())
+    ]
+
+
+def revalidate_invoices(
+    user_id: str | None = None, chunk_size: int = 1000, dry_run: bool = False
+) -> dict:
+    """
+    Re-check every completed invoice (optionally one user's) against the current
+    rules, chunk by chunk, and bulk-write results that changed.
+    Returns counts of checked, changed and now-failing invoices.
+    """
+    stats = {"checked": 0, "changed": 0, "failing": 0}
+    for rows in iter_invoice_pages(user_id, page_size=chunk_size):
+        invoices = [invoice_data_from_record(row) for row in rows]
+        results = validate_invoices_batch(invoices)
+
+        changed = []
+        for row, (is_valid, errors) in zip(rows, results):
+            if not is_valid:
+                stats["failing"] += 1
+            if row.get("validation_passed") != is_valid or (row.get("validation_errors") or []) != errors:
+                changed.append({
+                    "id": row["id"],
+                    "validation_passed": is_valid,
+                    "validation_errors": errors,
+                })
+
+        if changed and not dry_run:
+            bulk_update_validation(changed)
+        stats["checked"] += len(rows)
+        stats["changed"] += len(changed)
+        logger.info("revalidation_chunk", dry_run=dry_run, **stats)
+
+    return stats
@@ -0,0 +1,77 @@
+import re
+from datetime import datetime
+
+from app.services.validation_service import validate_gstin
+
+# GSTIN anywhere in OCR text (validate_gstin() does the strict check)
+GSTIN_IN_TEXT = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d]\b")
+
+# Value following an invoice/bill number label, e.g. "Invoice No.: EBW/25-26/6189"
+BILL_NO_IN_TEXT = re.compile(
+    r"\b(?:invoice|inv|bill)\s*(?:no|number|num|#)\b\.?\s*[:#\-]?\s*([A-Z0-9][A-Z0-9/\-]{2,29})",
+    re.IGNORECASE,
+)
+
+# Day-first dates as printed on Indian invoices, plus ISO dates
+DATE_IN_TEXT = re.compile(
+    r"\b(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{1,2}[\s\-/.][A-Za-z]{3,9}[\s\-/.,]+\d{2,4}|\d{4}-\d{2}-\d{2})\b"
+)
+DATE_FORMATS = (
+    "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y", "%d.%m.%y",
+    "%d-%b-%Y", "%d-%b-%y", "%d %b %Y", "%d %b %y", "%d-%B-%Y", "%d %B %Y",
+    "%Y-%m-%d",
+)
+
+def normalize_bill_no(bill_no: str | None) -> str:
+    """Uppercase and drop separators, so "EBW/25-26/0061" and "ebw 2526 0061" match."""
+    return re.sub(r"[^A-Z0-9]", "", (bill_no or "").upper())
+
+
+def make_dedupe_key(seller_gstin: str | None, bill_no: str | None, bill_date: str | None) -> str | None:
+    """
+    Normalized (seller_gstin, bill_no, bill_date) key stored on completed invoices.
+    Returns None when any part is missing, so incomplete invoices never collide.
+    """
+    gstin = (seller_gstin or "").strip().upper()
+    number = normalize_bill_no(bill_no)
+    date = (bill_date or "").strip()[:10]
+    if not (gstin and number and date):
+        return None
+    return f"{gstin}|{number}|{date}"
+
+
+def _parse_date(text: str) -> str | None:
+    cleaned = re.sub(r"[\s,]+", " ", text.strip())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cleaned, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def _only(values) -> str | None:
+    """The single distinct non-empty value, or None when there are none or several."""
+    distinct = {value for value in values if value}
+    return distinct.pop() if len(distinct) == 1 else None
+
+
+def scan_dedupe_key(ocr_text: str, buyer_gstin_hint: str | None = None) -> str | None:
+    """
+    Rule-based scan of raw OCR text for the dedupe key, without the LLM.
+    Seller GSTINs exclude the buyer's. Returns a key only when the text holds
+    exactly one GSTIN, one bill number and one date; anything else (a credit
+    note quoting the invoice it adjusts, a due date next to the bill date) is
+    ambiguous, so the caller should extract and use the extracted key instead.
+    """
+    buyer = (buyer_gstin_hint or "").upper()
+    gstin = _only(
+        g for g in GSTIN_IN_TEXT.findall(ocr_text.upper()) if g != buyer and validate_gstin(g)
+    )
+    bill_no = _only(
+        number
+        for number in map(normalize_bill_no, BILL_NO_IN_TEXT.findall(ocr_text))
+        if any(c.isdigit() for c in number)
+    )
+    date = _only(_parse_date(m) for m in DATE_IN_TEXT.findall(ocr_text))
+    return make_dedupe_key(gstin, bill_no, date)
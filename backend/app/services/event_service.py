@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+# Per-subscriber buffer. A slow client drops its oldest events rather than
+# growing without bound; every event carries the full status so nothing is lost.
+QUEUE_MAXSIZE = 100
+
+# Seconds between SSE keep-alive comments (keeps proxies from closing idle streams)
+HEARTBEAT_SECONDS = 15
+
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+
+# Statuses after which an invoice never changes again
+TERMINAL_STATUSES = {"completed", "failed", "duplicate", "split"}
+
+# Long-poll waiters per invoice, woken by notify_done()
+_waiters: dict[str, set[asyncio.Event]] = {}
+
+# Last pipeline stage reported for invoices currently being processed
+_stages: dict[str, str] = {}
+
+
+def subscribe(user_id: str) -> asyncio.Queue:
+    """Register a new listener for a user's invoice events."""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_MAXSIZE)
+    _subscribers.setdefault(user_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe(user_id: str, queue: asyncio.Queue):
+    """Remove a listener registered with subscribe()."""
+    queues = _subscribers.get(user_id)
+    if not queues:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[user_id]
+
+
+def publish(user_id: str, event: dict) -> int:
+    """
+    Push an event to every listener of a user.
+    Must be called from the event loop thread. Returns the number of listeners reached.
+    """
+    queues = _subscribers.get(user_id, set())
+    for queue in list(queues):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+    return len(queues)
+
+
+def set_stage(invoice_id: str, stage: str | None):
+    """Record the pipeline stage an invoice is in. None clears it."""
+    if stage is None:
+        _stages.pop(invoice_id, None)
+    else:
+        _stages[invoice_id] = stage
+
+
+def get_stage(invoice_id: str) -> str | None:
+    """Return the last recorded pipeline stage, if this process is handling the invoice."""
+    return _stages.get(invoice_id)
+
+
+def add_waiter(invoice_id: str) -> asyncio.Event:
+    """Register interest in an invoice finishing. Register before reading its status."""
+    event = asyncio.Event()
+    _waiters.setdefault(invoice_id, set()).add(event)
+    return event
+
+
+def remove_waiter(invoice_id: str, event: asyncio.Event):
+    """Remove a waiter registered with add_waiter()."""
+    events = _waiters.get(invoice_id)
+    if not events:
+        return
+    events.discard(event)
+    if not events:
+        del _waiters[invoice_id]
+
+
+def notify_done(invoice_id: str) -> int:
+    """Wake every long-poll waiter of an invoice that reached a terminal status."""
+    events = _waiters.get(invoice_id, set())
+    for event in events:
+        event.set()
+    return len(events)
+
+
+async def wait_until_done(event: asyncio.Event, timeout: float) -> bool:
+    """Wait on a waiter from add_waiter(). Returns False on timeout."""
+    try:
+        await asyncio.wait_for(event.wait(), timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+def format_sse(event: dict, event_name: str = "status") -> str:
+    """Serialize an event as a Server-Sent Events frame."""
+    return f"event: {event_name}\ndata: {json.dumps(event, default=str)}\n\n"
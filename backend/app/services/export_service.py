@@ -0,0 +1,157 @@
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+import structlog
+
+from app.config import get_settings
+from app.database.crud import count_invoices, iter_invoices
+from app.models.schemas import ExportJob
+from app.services.analytics_export import write_parquet_archive
+from app.services.output_service import BULK_EXPORT_FORMATS, iter_record_export
+from app.services.storage_service import upload_export, delete_export, get_signed_url
+
+logger = structlog.get_logger()
+
+ACTIVE_STATUSES = {"pending", "running"}
+
+# format: (media type, file extension)
+EXPORT_FORMATS = {
+    **BULK_EXPORT_FORMATS,
+    # Columnar analytics export: invoices.parquet + tax_breakup.parquet in one zip
+    "parquet": ("application/zip", "zip"),
+}
+
+# In-process job registry. Jobs are short-lived and their output lives in storage,
+# so losing this on restart only loses progress reporting for in-flight jobs.
+_jobs: dict[str, ExportJob] = {}
+_active_by_key: dict[tuple, str] = {}
+_lock = threading.Lock()
+
+
+def _job_key(user_id: str, format: str, from_date: str | None, to_date: str | None) -> tuple:
+    return (user_id, format, from_date, to_date)
+
+
+def _prune_finished_jobs() -> list[str]:
+    """Drop expired jobs from the registry. Returns their storage paths (caller holds _lock)."""
+    cutoff = datetime.utcnow() - timedelta(hours=get_settings().export_job_retention_hours)
+    expired_paths = []
+    for job_id, job in list(_jobs.items()):
+        if job.finished_at and job.finished_at < cutoff:
+            del _jobs[job_id]
+            if job.storage_path:
+                expired_paths.append(job.storage_path)
+    for key, job_id in list(_active_by_key.items()):
+        if job_id not in _jobs:
+            del _active_by_key[key]
+    return expired_paths
+
+
+def _delete_expired_exports(storage_paths: list[str]):
+    """Remove pruned export files from storage. Best-effort: a failure only leaves the file behind."""
+    for storage_path in storage_paths:
+        try:
+            delete_export(storage_path)
+        except Exception as e:
+            logger.warning("export_cleanup_failed", storage_path=storage_path, error=str(e))
+
+
+def create_export_job(
+    user_id: str, format: str, from_date: str | None = None, to_date: str | None = None
+) -> tuple[ExportJob, bool]:
+    """
+    Register an export job, or return the one already running for the same request.
+    Returns (job, created). Raises ValueError for an unknown format.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {format}")
+
+    key = _job_key(user_id, format, from_date, to_date)
+    with _lock:
+        expired_paths = _prune_finished_jobs()
+        existing_id = _active_by_key.get(key)
+        if existing_id and _jobs[existing_id].status in ACTIVE_STATUSES:
+            job, created = _jobs[existing_id], False
+        else:
+            job = ExportJob(
+                id=str(uuid.uuid4()),
+                user_id=user_id,
+                format=format,
+                from_date=from_date,
+                to_date=to_date,
+            )
+            _jobs[job.id] = job
+            _active_by_key[key] = job.id
+            created = True
+
+    # Storage calls are network round-trips, so keep them out of the registry lock
+    _delete_expired_exports(expired_paths)
+    return job, created
+
+
+def get_export_job(job_id: str, user_id: str) -> ExportJob | None:
+    """Fetch a job (scoped to user)."""
+    job = _jobs.get(job_id)
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+def _tracked(job: ExportJob, rows: Iterable[dict]) -> Iterator[dict]:
+    for row in rows:
+        yield row
+        job.processed += 1
+
+
+def run_export_job(job_id: str):
+    """
+    Build the export file in the background: page through invoices, write each
+    chunk to a temp file, upload it to storage and attach a signed URL.
+    Blocking; run it in a worker thread.
+    """
+    job = _jobs[job_id]
+    settings = get_settings()
+    media_type, extension = EXPORT_FORMATS[job.format]
+    job.status = "running"
+
+    local_path = None
+    try:
+        job.total = count_invoices(job.user_id, from_date=job.from_date, to_date=job.to_date)
+
+        rows = _tracked(job, iter_invoices(job.user_id, from_date=job.from_date, to_date=job.to_date))
+        fd, local_path = tempfile.mkstemp(suffix=f".{extension}", prefix="export-")
+        if job.format == "parquet":
+            os.close(fd)
+            with tempfile.TemporaryDirectory(prefix="export-") as work_dir:
+                write_parquet_archive(rows, local_path, work_dir)
+        else:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+                for chunk in iter_record_export(rows, job.format):
+                    f.write(chunk)
+
+        job.storage_path = upload_export(job.user_id, job.id, local_path, extension, media_type)
+        job.download_url = get_signed_url(job.storage_path, settings.export_url_expires_seconds)
+        job.status = "completed"
+        logger.info(
+            "export_job_completed",
+            job_id=job.id,
+            format=job.format,
+            invoices=job.processed,
+            size_bytes=os.path.getsize(local_path),
+        )
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        logger.error("export_job_failed", job_id=job.id, error=str(e), error_type=type(e).__name__)
+    finally:
+        job.finished_at = datetime.utcnow()
+        with _lock:
+            key = _job_key(job.user_id, job.format, job.from_date, job.to_date)
+            if _active_by_key.get(key) == job.id:
+                del _active_by_key[key]
+        if local_path and os.path.exists(local_path):
+            os.remove(local_path)
@@ -1,5 +1,5 @@
 import json
-from groq import Groq
+from groq import AsyncGroq
 from app.config import get_settings
 from app.models.schemas import InvoiceData, OCRResult
 
@@ -84,14 +84,14 @@ async def extract_invoice_data(
     """
     settings = get_settings()
 
-    client = Groq(api_key=settings.groq_api_key)
+    client = AsyncGroq(api_key=settings.groq_api_key)
 
     prompt = EXTRACTION_PROMPT.format(
         ocr_full_text=ocr_output.full_text,
         buyer_gstin_hint=buyer_gstin_hint or "Not provided",
     )
 
-    chat_completion = client.chat.completions.create(
+    chat_completion = await client.chat.completions.create(
         messages=[
             {
                 "role": "system",
@@ -110,6 +110,11 @@ async def extract_invoice_data(
 
     response_text = chat_completion.choices[0].message.content
 
+    return parse_invoice_json(response_text)
+
+
+def parse_invoice_json(response_text: str) -> InvoiceData:
+    """Parse and validate the LLM's JSON into InvoiceData."""
     raw_data = json.loads(response_text)
 
     invoice = InvoiceData(**raw_data)
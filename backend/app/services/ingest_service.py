@@ -0,0 +1,147 @@
+import asyncio
+import zipfile
+from typing import AsyncIterator, Callable
+
+import structlog
+from fastapi import UploadFile
+
+from app.database.async_crud import create_invoice_record, create_invoice_records, delete_invoice_record
+from app.services.async_storage_service import delete_pdf, new_pdf_path, upload_pdf
+from app.services.pipeline import cancel_ocr, start_ocr
+from app.services.zip_ingest_service import iter_zip_pdfs
+from app.utils.spool import SpooledPdf, spool_upload
+
+logger = structlog.get_logger()
+
+
+async def ingest_file(
+    user_id: str, filename: str, pdf: SpooledPdf, buyer_gstin: str | None, speculative_ocr: bool = True
+) -> tuple[str, asyncio.Task | None]:
+    """
+    Store one validated upload with OCR already under way: OCR starts first,
+    then the storage upload and the record insert run concurrently.
+    With speculative_ocr=False (queued uploads) OCR is left to processing.
+
+    Returns (invoice_id, ocr_task). If either write fails, the OCR task is
+    cancelled, whichever write succeeded is undone, the spooled PDF is removed
+    and the error is raised.
+    """
+    ocr_task = start_ocr(pdf) if speculative_ocr else None
+    storage_path = new_pdf_path(user_id)
+    stored, record = await asyncio.gather(
+        upload_pdf(user_id, filename, pdf, storage_path=storage_path),
+        create_invoice_record(
+            user_id=user_id, original_filename=filename, file_path=storage_path, buyer_gstin=buyer_gstin
+        ),
+        return_exceptions=True,
+    )
+    failed = [r for r in (stored, record) if isinstance(r, BaseException)]
+    if failed:
+        if ocr_task:
+            cancel_ocr(ocr_task)
+        undo = []
+        if not isinstance(stored, BaseException):
+            undo.append(delete_pdf(storage_path))
+        if not isinstance(record, BaseException):
+            undo.append(delete_invoice_record(record["id"]))
+        await asyncio.gather(*undo, return_exceptions=True)
+        pdf.discard()
+        raise failed[0]
+    return record["id"], ocr_task
+
+
+async def _stage_file(user_id: str, upload: UploadFile, semaphore: asyncio.Semaphore) -> dict:
+    """
+    Spool, validate and store one file, starting its OCR as soon as it is valid.
+    Returns its result entry plus spooled PDF, OCR task and path when stored.
+    """
+    async with semaphore:
+        pdf, error_msg = await spool_upload(upload)
+        if error_msg:
+            return {"filename": upload.filename, "error": error_msg}
+        ocr_task = start_ocr(pdf)
+        try:
+            storage_path = await upload_pdf(user_id, upload.filename, pdf)
+        except Exception as e:
+            cancel_ocr(ocr_task)
+            pdf.discard()
+            logger.warning("batch_upload_failed", filename=upload.filename, error=str(e))
+            return {"filename": upload.filename, "error": "Failed to store file"}
+    return {
+        "filename": upload.filename,
+        "error": None,
+        "pdf": pdf,
+        "ocr_task": ocr_task,
+        "file_path": storage_path,
+    }
+
+
+async def ingest_batch(
+    user_id: str, files: list[UploadFile], buyer_gstin: str | None, concurrency: int
+) -> tuple[list[dict], list[tuple[str, SpooledPdf, asyncio.Task]]]:
+    """
+    Validate and upload up to `concurrency` files at a time, then create the
+    invoice records of every stored file in one insert. Each file's OCR
+    starts as soon as it is valid.
+
+    Returns (results, stored): one result per file in upload order, and the
+    (invoice_id, spooled_pdf, ocr_task) entries ready to be processed. If the
+    insert fails, the OCR tasks are cancelled, the stored and spooled PDFs are
+    removed again and the error is raised.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    staged = await asyncio.gather(*(_stage_file(user_id, f, semaphore) for f in files))
+    ok = [s for s in staged if not s["error"]]
+
+    ids_by_path: dict[str, str] = {}
+    if ok:
+        try:
+            records = await create_invoice_records(
+                user_id,
+                [{"original_filename": s["filename"], "file_path": s["file_path"]} for s in ok],
+                buyer_gstin=buyer_gstin,
+            )
+        except Exception:
+            await asyncio.gather(*(delete_pdf(s["file_path"]) for s in ok), return_exceptions=True)
+            for s in ok:
+                cancel_ocr(s["ocr_task"])
+                s["pdf"].discard()
+            raise
+        ids_by_path = {r["file_path"]: r["id"] for r in records}
+
+    results = [
+        {
+            "filename": s["filename"],
+            "success": not s["error"],
+            "error": s["error"],
+            "invoice_id": ids_by_path.get(s.get("file_path")),
+        }
+        for s in staged
+    ]
+    stored = [(ids_by_path[s["file_path"]], s["pdf"], s["ocr_task"]) for s in ok]
+    return results, stored
+
+
+async def ingest_archive(
+    user_id: str,
+    path: str,
+    members: list[zipfile.ZipInfo],
+    buyer_gstin: str | None,
+    on_stored: Callable[[str, SpooledPdf], None],
+) -> AsyncIterator[dict]:
+    """
+    Unpack, validate and store archive members one at a time, calling
+    on_stored(invoice_id, spooled_pdf) for each so processing can be queued
+    right away. Yields one result per member, in archive order.
+    """
+    async for filename, pdf, error in iter_zip_pdfs(path, members):
+        invoice_id = None
+        if pdf:
+            try:
+                invoice_id, _ = await ingest_file(user_id, filename, pdf, buyer_gstin, speculative_ocr=False)
+            except Exception as e:
+                logger.warning("archive_member_upload_failed", filename=filename, error=str(e))
+                error = "Failed to store file"
+            else:
+                on_stored(invoice_id, pdf)
+        yield {"filename": filename, "success": error is None, "error": error, "invoice_id": invoice_id}
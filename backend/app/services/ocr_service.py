@@ -1,35 +1,148 @@
+import asyncio
+import importlib.util
+import io
+import math
+import shutil
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Awaitable, Callable
+import structlog
 from google.cloud import documentai_v1 as documentai
+from google.protobuf import field_mask_pb2
 from app.config import get_settings
-from app.models.schemas import OCRResult
+from app.models.schemas import OCREngineStats, OCRResult
+from app.services.split_service import split_detection_applies
+from app.services.stage_runner import run_cpu_stage
 
+logger = structlog.get_logger()
 
-async def extract_text_with_document_ai(pdf_bytes: bytes) -> OCRResult:
+# A page with at least this much extractable text is read from its text layer
+_TEXT_LAYER_MIN_CHARS = 50
+# Grayscale standard deviation below this means a faint or muddy scan
+_MIN_CONTRAST = 40
+# Image quality is judged on a thumbnail, not the full scan
+_SAMPLE_SIZE = (512, 512)
+
+# Document AI is skipped for _HEALTH_COOLDOWN_SECONDS after this many failures in a row,
+# or after the median of its last _LATENCY_WINDOW calls exceeds DOCUMENT_AI_SLOW_MS
+_FAILURE_THRESHOLD = 3
+_HEALTH_COOLDOWN_SECONDS = 60
+_LATENCY_WINDOW = 10
+
+
+def count_pdf_pages(pdf_bytes: bytes) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def select_document_ai_pages(page_count: int, first: int, last: int) -> list[int] | None:
+    """1-based pages to send: the first `first` and last `last`. None means all of them."""
+    if not (first or last) or first + last >= page_count:
+        return None
+    return sorted(set(range(1, first + 1)) | set(range(page_count - last + 1, page_count + 1)))
+
+
+def _field_mask() -> field_mask_pb2.FieldMask | None:
+    paths = [path.strip() for path in get_settings().document_ai_field_mask.split(",") if path.strip()]
+    return field_mask_pb2.FieldMask(paths=paths) if paths else None
+
+
+def build_process_request(pdf_bytes: bytes, pages: list[int] | None = None, shaped: bool = True) -> documentai.ProcessRequest:
+    """
+    The Document AI request for a PDF. Shaped requests carry the field mask,
+    OCR options and page selection from settings; unshaped ones ask for the
+    full Document, as before (used to measure what shaping saves).
+    """
+    settings = get_settings()
+    request = documentai.ProcessRequest(
+        name=documentai.DocumentProcessorServiceClient.processor_path(
+            settings.google_project_id,
+            settings.google_location,
+            settings.google_processor_id,
+        ),
+        raw_document=documentai.RawDocument(content=pdf_bytes, mime_type="application/pdf"),
+    )
+    if not shaped:
+        return request
+
+    ocr_config = documentai.OcrConfig(enable_native_pdf_parsing=settings.document_ai_native_pdf_parsing)
+    hints = [hint.strip() for hint in settings.document_ai_language_hints.split(",") if hint.strip()]
+    if hints:
+        ocr_config.hints = documentai.OcrConfig.Hints(language_hints=hints)
+    request.process_options = documentai.ProcessOptions(ocr_config=ocr_config)
+    if pages:
+        request.process_options.individual_page_selector = documentai.ProcessOptions.IndividualPageSelector(pages=pages)
+    mask = _field_mask()
+    if mask:
+        request.field_mask = mask
+    request.imageless_mode = settings.document_ai_imageless_mode
+    return request
+
+
+async def extract_text_with_document_ai(
+    pdf_bytes: bytes, page_count: int | None = None, page_selection: bool = True
+) -> OCRResult:
     """
     Send PDF to Google Document AI for OCR + structure analysis.
     Returns structured OCR output with full text, tables, and key-value pairs.
+    The blocking API call runs in a worker thread and flattening the response
+    runs as a CPU stage, both off the event loop.
+
+    The request is shaped by settings: DOCUMENT_AI_FIELD_MASK limits the
+    response to what flatten_document reads, and with DOCUMENT_AI_FIRST_PAGES /
+    DOCUMENT_AI_LAST_PAGES only those pages of a long PDF are read (the others
+    come back as empty entries in .pages). PDFs long enough for split detection
+    (SPLIT_MIN_PAGES) are always read whole, as it needs the middle pages.
+    page_count saves counting pages again; page_selection=False reads every
+    page regardless.
     """
     settings = get_settings()
 
+    pages = None
+    if page_selection and (settings.document_ai_first_pages or settings.document_ai_last_pages):
+        if page_count is None:
+            try:
+                page_count = await run_cpu_stage(count_pdf_pages, pdf_bytes)
+            except Exception:
+                page_count = 0  # let Document AI report the broken PDF
+        if page_count and not split_detection_applies(page_count):
+            pages = select_document_ai_pages(
+                page_count, settings.document_ai_first_pages, settings.document_ai_last_pages
+            )
+
     client = documentai.DocumentProcessorServiceClient()
+    request = build_process_request(pdf_bytes, pages)
 
-    resource_name = client.processor_path(
-        settings.google_project_id,
-        settings.google_location,
-        settings.google_processor_id,
+    started = time.time()
+    result = await asyncio.to_thread(client.process_document, request=request)
+    # The proto-plus message isn't picklable; its wire bytes are, and parse fast in the worker
+    document_bytes = documentai.Document.serialize(result.document)
+    logger.info(
+        "document_ai_response",
+        response_bytes=len(document_bytes),
+        pages_sent=len(pages) if pages else page_count,
+        field_mask=bool(request.field_mask.paths),
+        latency_ms=int((time.time() - started) * 1000),
     )
 
-    raw_document = documentai.RawDocument(
-        content=pdf_bytes,
-        mime_type="application/pdf",
-    )
+    ocr_result = await run_cpu_stage(flatten_document, document_bytes)
+    numbers, ocr_result.page_numbers = ocr_result.page_numbers, []
+    if pages:
+        # One entry per page of the PDF, so page indices keep meaning the same thing.
+        # Keyed on the page number Document AI reports (unless masked out), not on position
+        by_page = dict(zip(numbers if all(numbers) else pages, ocr_result.pages))
+        ocr_result.pages = [by_page.get(number, "") for number in range(1, page_count + 1)]
+    return ocr_result
 
-    request = documentai.ProcessRequest(
-        name=resource_name,
-        raw_document=raw_document,
-    )
 
-    result = client.process_document(request=request)
-    document = result.document
+def flatten_document(document_bytes: bytes) -> OCRResult:
+    """Walk a serialized Document AI document into an OCRResult."""
+    document = documentai.Document.deserialize(document_bytes)
 
     # Extract full text
     full_text = document.text
@@ -72,15 +185,18 @@ async def extract_text_with_document_ai(pdf_bytes: bytes) -> OCRResult:
     # Extract key-value pairs (form fields)
     key_value_pairs = []
     for page in document.pages:
-        for field in page.form_fields:
-            field_name = _get_text_from_layout(field.field_name, document.text)
-            field_value = _get_text_from_layout(field.field_value, document.text)
+        for form_field in page.form_fields:
+            field_name = _get_text_from_layout(form_field.field_name, document.text)
+            field_value = _get_text_from_layout(form_field.field_value, document.text)
             key_value_pairs.append({
                 "key": field_name.strip(),
                 "value": field_value.strip(),
-                "confidence": field.field_name.confidence,
+                "confidence": form_field.field_name.confidence,
             })
 
+    # Text of each page, for finding invoice boundaries in multi-invoice PDFs
+    pages = [_get_text_from_layout(page.layout, document.text) for page in document.pages]
+
     # Average confidence across pages
     avg_confidence = 0.0
     if document.pages:
@@ -98,6 +214,8 @@ async def extract_text_with_document_ai(pdf_bytes: bytes) -> OCRResult:
         tables=tables,
         key_value_pairs=key_value_pairs,
         confidence=avg_confidence,
+        pages=pages,
+        page_numbers=[page.page_number for page in document.pages],
     )
 
 
@@ -111,3 +229,316 @@ def _get_text_from_layout(layout, full_text: str) -> str:
         end = int(segment.end_index)
         text += full_text[start:end]
     return text
+
+
+# ─── Engine routing ──────────────────────────────────────────────────────────
+
+
+@dataclass
+class PageProfile:
+    text: str = ""  # text layer, if the PDF has one
+    dpi: float = 0.0  # resolution of the page's largest image; 0 without images
+    contrast: float = 0.0  # grayscale standard deviation of that image
+
+    @property
+    def has_text_layer(self) -> bool:
+        return len(self.text.strip()) >= _TEXT_LAYER_MIN_CHARS
+
+
+@dataclass
+class _ProviderHealth:
+    consecutive_failures: int = 0
+    last_failure: float = 0.0
+    slow_until: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+_health = _ProviderHealth()
+_stats: dict[str, OCREngineStats] = {}
+_stats_lock = threading.Lock()
+
+
+def _largest_image(page):
+    try:
+        images = [image_file.image for image_file in page.images]
+    except Exception:
+        return None  # image encodings Pillow can't decode (JBIG2, ...)
+    return max(images, key=lambda image: image.width * image.height, default=None)
+
+
+def _page_area_sq_in(page) -> float:
+    return float(page.mediabox.width) * float(page.mediabox.height) / (72 * 72)
+
+
+def analyze_pages(pdf_bytes: bytes) -> list[PageProfile]:
+    """Text layer and scan quality of every page, for route_pages(). Runs as a CPU stage."""
+    from PIL import ImageStat
+    from pypdf import PdfReader
+
+    profiles = []
+    for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+        profile = PageProfile(text=page.extract_text() or "")
+        if not profile.has_text_layer:
+            image = _largest_image(page)
+            area = _page_area_sq_in(page)
+            if image is not None and area > 0:
+                profile.dpi = math.sqrt(image.width * image.height / area)
+                gray = image.convert("L")
+                gray.thumbnail(_SAMPLE_SIZE)
+                profile.contrast = ImageStat.Stat(gray).stddev[0]
+        profiles.append(profile)
+    return profiles
+
+
+def select_pages(pdf_bytes: bytes, indices: list[int]) -> bytes:
+    """A PDF of just the given pages, for sending part of a document to Document AI."""
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    writer = PdfWriter()
+    for i in indices:
+        writer.add_page(reader.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def tesseract_pages(pdf_bytes: bytes, indices: list[int], tesseract_cmd: str, lang: str) -> OCRResult:
+    """OCR the scan image of the given pages with Tesseract. Runs as a CPU stage."""
+    import pytesseract
+    from pypdf import PdfReader
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    pages, blocks, confidences = [], [], []
+    for i in indices:
+        data = pytesseract.image_to_data(
+            _largest_image(reader.pages[i]), lang=lang, output_type=pytesseract.Output.DICT
+        )
+        lines: dict[tuple, list[str]] = {}
+        block_confidences: dict[int, list[float]] = {}
+        for word, conf, block, par, line in zip(
+            data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]
+        ):
+            if not word.strip() or float(conf) < 0:
+                continue
+            lines.setdefault((block, par, line), []).append(word)
+            block_confidences.setdefault(block, []).append(float(conf) / 100)
+
+        for block, scores in block_confidences.items():
+            text = "\n".join(" ".join(words) for key, words in lines.items() if key[0] == block)
+            blocks.append({"text": text, "confidence": sum(scores) / len(scores)})
+            confidences.extend(scores)
+        pages.append("\n".join(" ".join(words) for words in lines.values()))
+
+    return OCRResult(
+        full_text="\n".join(pages),
+        blocks=blocks,
+        confidence=sum(confidences) / len(confidences) if confidences else 0.0,
+        pages=pages,
+        engine="tesseract",
+    )
+
+
+async def _document_ai_engine(pdf_bytes: bytes, indices: list[int], profiles: list[PageProfile]) -> OCRResult:
+    if indices and len(indices) < len(profiles):
+        pdf_bytes = await run_cpu_stage(select_pages, pdf_bytes, indices)
+    started = time.time()
+    try:
+        # A routed sub-PDF holds exactly the pages that need reading, so nothing is skipped
+        result = await extract_text_with_document_ai(pdf_bytes, page_selection=not indices)
+    except Exception:
+        _health.consecutive_failures += 1
+        _health.last_failure = time.time()
+        raise
+    _record_latency(int((time.time() - started) * 1000))
+    return result
+
+
+async def _tesseract_engine(pdf_bytes: bytes, indices: list[int], profiles: list[PageProfile]) -> OCRResult:
+    settings = get_settings()
+    return await run_cpu_stage(
+        tesseract_pages, pdf_bytes, indices, settings.tesseract_cmd, settings.tesseract_lang, heavy=True
+    )
+
+
+async def _text_layer_engine(pdf_bytes: bytes, indices: list[int], profiles: list[PageProfile]) -> OCRResult:
+    pages = [profiles[i].text for i in indices]
+    return OCRResult(
+        full_text="\n".join(pages),
+        blocks=[{"text": text, "confidence": 1.0} for text in pages],
+        confidence=1.0,
+        pages=pages,
+        engine="text_layer",
+    )
+
+
+# name: engine(pdf_bytes, page indices, page profiles) -> OCRResult with one entry in .pages per index.
+# Document AI also takes no indices, meaning the whole document.
+ENGINES: dict[str, Callable[[bytes, list[int], list[PageProfile]], Awaitable[OCRResult]]] = {
+    "text_layer": _text_layer_engine,
+    "tesseract": _tesseract_engine,
+    "document_ai": _document_ai_engine,
+}
+
+
+@lru_cache
+def tesseract_available() -> bool:
+    return (
+        importlib.util.find_spec("pytesseract") is not None
+        and shutil.which(get_settings().tesseract_cmd or "tesseract") is not None
+    )
+
+
+def _record_latency(latency_ms: int):
+    _health.consecutive_failures = 0
+    _health.latencies.append(latency_ms)
+    if len(_health.latencies) == _LATENCY_WINDOW and statistics.median(_health.latencies) > get_settings().document_ai_slow_ms:
+        _health.slow_until = time.time() + _HEALTH_COOLDOWN_SECONDS
+        _health.latencies.clear()
+
+
+def document_ai_healthy() -> bool:
+    """False while Document AI is failing or slow; it is tried again after a cooldown."""
+    now = time.time()
+    if now < _health.slow_until:
+        return False
+    failing = _health.consecutive_failures >= _FAILURE_THRESHOLD
+    return not (failing and now - _health.last_failure < _HEALTH_COOLDOWN_SECONDS)
+
+
+def route_pages(profiles: list[PageProfile], tesseract_ok: bool, document_ai_ok: bool) -> dict[str, list[int]]:
+    """
+    Pick an engine per page: the text layer when the PDF has one; Tesseract
+    for clean scans (DPI and contrast high enough), or for any scan while
+    Document AI is unhealthy; Document AI for everything else.
+    """
+    settings = get_settings()
+    plan: dict[str, list[int]] = {}
+    for i, profile in enumerate(profiles):
+        clean_scan = profile.dpi >= settings.tesseract_min_dpi and profile.contrast >= _MIN_CONTRAST
+        if profile.has_text_layer:
+            engine = "text_layer"
+        elif tesseract_ok and profile.dpi and (clean_scan or not document_ai_ok):
+            engine = "tesseract"
+        else:
+            engine = "document_ai"
+        plan.setdefault(engine, []).append(i)
+    return plan
+
+
+async def _run_engine(name: str, pdf_bytes: bytes, indices: list[int], profiles: list[PageProfile]) -> OCRResult:
+    started = time.time()
+    try:
+        result = await ENGINES[name](pdf_bytes, indices, profiles)
+    except Exception:
+        _update_stats(name, failures=1)
+        raise
+    _update_stats(
+        name,
+        documents=1,
+        pages=len(result.pages) or len(indices),
+        latency_ms_total=int((time.time() - started) * 1000),
+        confidence_total=result.confidence,
+    )
+    return result
+
+
+def _merge(parts: list[tuple[list[int], OCRResult]], page_count: int) -> OCRResult:
+    if len(parts) == 1:
+        return parts[0][1]
+    pages = [""] * page_count
+    for indices, result in parts:
+        for i, text in zip(indices, result.pages):
+            pages[i] = text
+    return OCRResult(
+        full_text="\n".join(pages),
+        blocks=[block for _, result in parts for block in result.blocks],
+        tables=[table for _, result in parts for table in result.tables],
+        key_value_pairs=[pair for _, result in parts for pair in result.key_value_pairs],
+        confidence=sum(result.confidence * len(indices) for indices, result in parts) / page_count,
+        pages=pages,
+        engine="+".join(sorted({result.engine for _, result in parts})),
+    )
+
+
+async def recognize_pdf(pdf_bytes: bytes) -> OCRResult:
+    """
+    OCR a PDF with the engine best suited to each page (see route_pages).
+    Pages Tesseract reads with confidence under TESSERACT_MIN_CONFIDENCE, or
+    while Document AI is down, fall back to the other engine. With
+    OCR_ROUTING=document_ai, or when the PDF can't be analyzed, the whole
+    document goes to Document AI.
+    """
+    settings = get_settings()
+    if settings.ocr_routing == "document_ai":
+        return await _run_engine("document_ai", pdf_bytes, [], [])
+
+    try:
+        profiles = await run_cpu_stage(analyze_pages, pdf_bytes, heavy=True)
+    except Exception as e:
+        logger.warning("ocr_routing_failed", error=str(e))
+        return await _run_engine("document_ai", pdf_bytes, [], [])
+    if not profiles:
+        return OCRResult(engine="text_layer")
+
+    tesseract_ok = tesseract_available()
+    plan = route_pages(profiles, tesseract_ok, document_ai_healthy())
+    parts: list[tuple[list[int], OCRResult]] = []
+
+    if "text_layer" in plan:
+        parts.append((plan["text_layer"], await _run_engine("text_layer", pdf_bytes, plan["text_layer"], profiles)))
+
+    remote = plan.get("document_ai", [])
+    if "tesseract" in plan:
+        indices = plan["tesseract"]
+        try:
+            result = await _run_engine("tesseract", pdf_bytes, indices, profiles)
+        except Exception as e:
+            logger.warning("tesseract_failed", error=str(e))
+            result = None
+        if result is not None and (result.confidence >= settings.tesseract_min_confidence or not document_ai_healthy()):
+            parts.append((indices, result))
+        else:
+            if result is not None:
+                logger.info("tesseract_low_confidence", confidence=round(result.confidence, 3), pages=len(indices))
+            remote = sorted(remote + indices)
+
+    if remote:
+        try:
+            parts.append((remote, await _run_engine("document_ai", pdf_bytes, remote, profiles)))
+        except Exception as e:
+            # Document AI is down: read what we can locally rather than fail the invoice
+            if not (tesseract_ok and all(profiles[i].dpi for i in remote)):
+                raise
+            logger.warning("document_ai_failed_using_tesseract", error=str(e))
+            parts.append((remote, await _run_engine("tesseract", pdf_bytes, remote, profiles)))
+
+    logger.info("ocr_routed", plan={name: len(indices) for name, indices in plan.items()})
+    return _merge(sorted(parts, key=lambda part: part[0][0]), len(profiles))
+
+
+def _update_stats(engine: str, **increments):
+    with _stats_lock:
+        stats = _stats.setdefault(engine, OCREngineStats())
+        for name, value in increments.items():
+            setattr(stats, name, getattr(stats, name) + value)
+
+
+def record_validation(engine: str, passed: bool):
+    """Count an extracted invoice's validation outcome against the engine(s) that read it."""
+    for name in engine.split("+"):
+        _update_stats(name, validated=1, validation_passed=int(passed))
+
+
+def get_engine_stats() -> dict:
+    """Per-engine latency, confidence and validation pass rate since startup."""
+    with _stats_lock:
+        engines = {name: stats.model_dump() for name, stats in _stats.items()}
+    return {
+        "engines": engines,
+        "document_ai_healthy": document_ai_healthy(),
+        "tesseract_available": tesseract_available(),
+    }
@@ -1,13 +1,42 @@
 import json
 import csv
+import re
 from io import StringIO
+from typing import Callable, Iterable, Iterator
 from xml.sax.saxutils import escape
+from app.config import get_settings
 from app.models.schemas import InvoiceData
+from app.services.stage_runner import iter_cpu_stage
+from app.utils.cache import TTLCache
 
+# Bump whenever a renderer's output changes, so cached artifacts are not reused
+RENDERER_VERSION = 1
 
-def generate_json_output(data: InvoiceData) -> str:
-    """Generate clean JSON format for API consumption."""
-    output = {
+_artifact_cache: TTLCache | None = None
+
+
+def invoice_data_from_record(record: dict) -> InvoiceData:
+    """Rebuild InvoiceData from a completed invoices row."""
+    return InvoiceData(
+        seller_name=record["seller_name"],
+        seller_gstin=record["seller_gstin"],
+        buyer_gstin=record.get("buyer_gstin"),
+        bill_no=record["bill_no"],
+        bill_date=record["bill_date"],
+        tax_breakup=record.get("tax_breakup") or [],
+        total_taxable_value=record["total_taxable_value"],
+        total_cgst=record["total_cgst"],
+        total_sgst=record["total_sgst"],
+        total_igst=record["total_igst"],
+        total_quantity=record.get("total_quantity") or 0,
+        total_amount=record["total_amount"],
+        validation_passed=record.get("validation_passed") or False,
+        validation_errors=record.get("validation_errors") or [],
+    )
+
+
+def _json_document(data: InvoiceData) -> dict:
+    return {
         "invoice_metadata": {
             "seller_name": data.seller_name,
             "seller_gstin": data.seller_gstin,
@@ -29,38 +58,14 @@ def generate_json_output(data: InvoiceData) -> str:
             "errors": data.validation_errors,
         },
     }
-    return json.dumps(output, indent=2, ensure_ascii=False)
 
 
-def generate_tally_xml(data: InvoiceData) -> str:
-    """Generate Tally-compatible XML for purchase voucher import."""
-    # Format date as YYYYMMDD for Tally
-    tally_date = data.bill_date.replace("-", "")
+def generate_json_output(data: InvoiceData) -> str:
+    """Generate clean JSON format for API consumption."""
+    return json.dumps(_json_document(data), indent=2, ensure_ascii=False)
 
-    # Build tax ledger entries
-    tax_entries = ""
-    for item in data.tax_breakup:
-        if item.cgst_amount > 0:
-            tax_entries += f"""
-                        <ALLLEDGERENTRIES.LIST>
-                            <LEDGERNAME>Input CGST @ {item.rate / 2:.0f}%</LEDGERNAME>
-                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
-                            <AMOUNT>-{item.cgst_amount:.2f}</AMOUNT>
-                        </ALLLEDGERENTRIES.LIST>
-                        <ALLLEDGERENTRIES.LIST>
-                            <LEDGERNAME>Input SGST @ {item.rate / 2:.0f}%</LEDGERNAME>
-                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
-                            <AMOUNT>-{item.sgst_amount:.2f}</AMOUNT>
-                        </ALLLEDGERENTRIES.LIST>"""
-        if item.igst_amount > 0:
-            tax_entries += f"""
-                        <ALLLEDGERENTRIES.LIST>
-                            <LEDGERNAME>Input IGST @ {item.rate:.0f}%</LEDGERNAME>
-                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
-                            <AMOUNT>-{item.igst_amount:.2f}</AMOUNT>
-                        </ALLLEDGERENTRIES.LIST>"""
 
-    xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+TALLY_ENVELOPE_HEAD = """<?xml version="1.0" encoding="UTF-8"?>
 <ENVELOPE>
     <HEADER>
         <TALLYREQUEST>Import Data</TALLYREQUEST>
@@ -71,45 +76,93 @@ def generate_tally_xml(data: InvoiceData) -> str:
                 <REPORTNAME>Vouchers</REPORTNAME>
             </REQUESTDESC>
             <REQUESTDATA>
-                <TALLYMESSAGE xmlns:UDF="TallyUDF">
+                <TALLYMESSAGE xmlns:UDF="TallyUDF">"""
+
+TALLY_ENVELOPE_TAIL = """
+                </TALLYMESSAGE>
+            </REQUESTDATA>
+        </IMPORTDATA>
+    </BODY>
+</ENVELOPE>"""
+
+
+# Characters XML 1.0 cannot carry even when escaped (stray control codes from OCR)
+_XML_ILLEGAL_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def _xml_text(value: str | None) -> str:
+    """Escape a value for use as XML element text."""
+    if not value:
+        return ""
+    if not value.isprintable():
+        value = _XML_ILLEGAL_CHARS.sub("", value)
+    return escape(value)
+
+
+# Templates are f-strings compiled into these functions; each voucher is built
+# from a list of fragments joined once, never by repeated concatenation.
+
+
+def _tally_tax_entry(tax: str, rate: float, amount: float) -> str:
+    return f"""
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>Input {tax} @ {rate:.0f}%</LEDGERNAME>
+                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
+                            <AMOUNT>-{amount:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>"""
+
+
+def _tally_voucher(data: InvoiceData) -> str:
+    """Render one purchase VOUCHER element."""
+    # Format date as YYYYMMDD for Tally
+    tally_date = _xml_text(data.bill_date.replace("-", ""))
+    seller_name = _xml_text(data.seller_name)
+
+    parts = [f"""
                     <VOUCHER VCHTYPE="Purchase" ACTION="Create">
                         <DATE>{tally_date}</DATE>
                         <VOUCHERTYPENAME>Purchase</VOUCHERTYPENAME>
-                        <VOUCHERNUMBER>{escape(data.bill_no)}</VOUCHERNUMBER>
-                        <PARTYLEDGERNAME>{escape(data.seller_name)}</PARTYLEDGERNAME>
-                        <PARTYGSTIN>{escape(data.seller_gstin)}</PARTYGSTIN>
+                        <VOUCHERNUMBER>{_xml_text(data.bill_no)}</VOUCHERNUMBER>
+                        <PARTYLEDGERNAME>{seller_name}</PARTYLEDGERNAME>
+                        <PARTYGSTIN>{_xml_text(data.seller_gstin)}</PARTYGSTIN>
                         <ALLLEDGERENTRIES.LIST>
-                            <LEDGERNAME>{escape(data.seller_name)}</LEDGERNAME>
+                            <LEDGERNAME>{seller_name}</LEDGERNAME>
                             <GSTCLASS/>
                             <ISDEEMEDPOSITIVE>Yes</ISDEEMEDPOSITIVE>
                             <AMOUNT>{data.total_amount:.2f}</AMOUNT>
-                        </ALLLEDGERENTRIES.LIST>{tax_entries}
+                        </ALLLEDGERENTRIES.LIST>"""]
+
+    for item in data.tax_breakup:
+        if item.cgst_amount > 0:
+            parts.append(_tally_tax_entry("CGST", item.rate / 2, item.cgst_amount))
+            parts.append(_tally_tax_entry("SGST", item.rate / 2, item.sgst_amount))
+        if item.igst_amount > 0:
+            parts.append(_tally_tax_entry("IGST", item.rate, item.igst_amount))
+
+    parts.append(f"""
                         <ALLLEDGERENTRIES.LIST>
                             <LEDGERNAME>Purchase</LEDGERNAME>
                             <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
                             <AMOUNT>-{data.total_taxable_value:.2f}</AMOUNT>
                         </ALLLEDGERENTRIES.LIST>
-                    </VOUCHER>
-                </TALLYMESSAGE>
-            </REQUESTDATA>
-        </IMPORTDATA>
-    </BODY>
-</ENVELOPE>"""
-    return xml
+                    </VOUCHER>""")
+    return "".join(parts)
 
 
-def generate_csv_output(data: InvoiceData) -> str:
-    """Generate flat CSV format for spreadsheet import."""
-    output = StringIO()
-    writer = csv.writer(output)
+def generate_tally_xml(data: InvoiceData) -> str:
+    """Generate Tally-compatible XML for purchase voucher import."""
+    return TALLY_ENVELOPE_HEAD + _tally_voucher(data) + TALLY_ENVELOPE_TAIL
 
-    # Main invoice row
-    writer.writerow([
-        "Bill No", "Bill Date", "Seller Name", "Seller GSTIN",
-        "Buyer GSTIN", "Total Taxable Value", "Total CGST",
-        "Total SGST", "Total IGST", "Total Quantity", "Total Amount",
-    ])
-    writer.writerow([
+
+CSV_HEADER = [
+    "Bill No", "Bill Date", "Seller Name", "Seller GSTIN",
+    "Buyer GSTIN", "Total Taxable Value", "Total CGST",
+    "Total SGST", "Total IGST", "Total Quantity", "Total Amount",
+]
+
+
+def _csv_row(data: InvoiceData) -> list:
+    return [
         data.bill_no,
         data.bill_date,
         data.seller_name,
@@ -121,7 +174,17 @@ def generate_csv_output(data: InvoiceData) -> str:
         data.total_igst,
         data.total_quantity,
         data.total_amount,
-    ])
+    ]
+
+
+def generate_csv_output(data: InvoiceData) -> str:
+    """Generate flat CSV format for spreadsheet import."""
+    output = StringIO()
+    writer = csv.writer(output)
+
+    # Main invoice row
+    writer.writerow(CSV_HEADER)
+    writer.writerow(_csv_row(data))
 
     # Tax breakup section
     writer.writerow([])
@@ -151,3 +214,101 @@ def generate_output(data: InvoiceData, format: str = "json") -> str:
     if not formatter:
         raise ValueError(f"Unsupported format: {format}. Use json, xml, or csv.")
     return formatter(data)
+
+
+# ─── Bulk (streaming) export ─────────────────────────────────────────────────
+
+
+# Invoice rows rendered per CPU stage call in bulk exports
+EXPORT_CHUNK_SIZE = 200
+
+
+def render_export_chunk(records: list[dict], format: str) -> str:
+    """
+    Bulk export body for one chunk of invoice rows, without the CSV header or
+    Tally envelope. Rebuilding InvoiceData and rendering both happen here, so
+    a stage worker gets plain dicts and returns a string.
+    """
+    invoices = [invoice_data_from_record(record) for record in records]
+    if format == "csv":
+        buffer = StringIO()
+        csv.writer(buffer).writerows(_csv_row(data) for data in invoices)
+        return buffer.getvalue()
+    if format == "jsonl":
+        return "".join(json.dumps(_json_document(data), ensure_ascii=False) + "\n" for data in invoices)
+    return "".join(_tally_voucher(data) for data in invoices)
+
+
+def _chunked(records: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_record_export(records: Iterable[dict], format: str) -> Iterator[str]:
+    """
+    Stream a bulk export straight from invoice rows: CSV with a header row,
+    JSON Lines, or every invoice as a voucher inside a single Tally envelope.
+    Rows are rendered EXPORT_CHUNK_SIZE at a time in the CPU stage pool,
+    several chunks in flight. Blocking; iterate it from a worker thread.
+    """
+    if format == "csv":
+        buffer = StringIO()
+        csv.writer(buffer).writerow(CSV_HEADER)
+        yield buffer.getvalue()
+    elif format == "xml":
+        yield TALLY_ENVELOPE_HEAD
+    yield from iter_cpu_stage(render_export_chunk, _chunked(records, EXPORT_CHUNK_SIZE), format, heavy=True)
+    if format == "xml":
+        yield TALLY_ENVELOPE_TAIL
+
+
+BULK_EXPORT_FORMATS = {
+    # format: (media type, file extension)
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+    "xml": ("application/xml", "xml"),
+}
+
+
+def _get_artifact_cache() -> TTLCache:
+    global _artifact_cache
+    if _artifact_cache is None:
+        settings = get_settings()
+        _artifact_cache = TTLCache(
+            max_entries=settings.export_cache_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    return _artifact_cache
+
+
+def get_cached_output(
+    invoice_id: str,
+    updated_at: str | None,
+    format: str,
+    build_data: Callable[[], InvoiceData],
+) -> str:
+    """
+    Rendered output for an invoice, cached per (invoice, format, renderer version).
+    An entry is only reused while the record's updated_at is unchanged;
+    build_data is only called on a cache miss.
+    """
+    cache = _get_artifact_cache()
+    key = (invoice_id, format.lower(), RENDERER_VERSION)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == updated_at:
+        return cached[1]
+
+    output = generate_output(build_data(), format)
+    cache.set(key, (updated_at, output))
+    return output
+
+
+def invalidate_cached_outputs(invoice_id: str) -> int:
+    """Drop every cached artifact of an invoice."""
+    return _get_artifact_cache().delete_where(lambda key: key[0] == invoice_id)
@@ -0,0 +1,148 @@
+import io
+import math
+from dataclasses import dataclass
+
+import structlog
+
+from app.config import get_settings
+from app.services.stage_runner import run_cpu_stage
+
+logger = structlog.get_logger()
+
+# Images up to this much above the target DPI are left alone (re-encoding costs quality)
+_DPI_SLACK = 1.2
+_JPEG_QUALITY = 85
+
+# A pixel darker than this (0-255 grayscale) counts as ink
+_INK_LEVEL = 128
+# Blank-page detection looks at a thumbnail, not the full scan
+_INK_SAMPLE_SIZE = (512, 512)
+# A page without text or images but with a content stream this long has vector drawing on it
+_MAX_BLANK_CONTENT_BYTES = 64
+
+
+@dataclass
+class OptimizedPdf:
+    content: bytes
+    original_size: int
+    kept_pages: list[int] | None = None  # 0-based original indices; None when no page was dropped
+    page_count: int = 0
+    images_downsampled: int = 0
+
+    @classmethod
+    def unchanged(cls, pdf_bytes: bytes) -> "OptimizedPdf":
+        return cls(content=pdf_bytes, original_size=len(pdf_bytes))
+
+    @property
+    def optimized_size(self) -> int:
+        return len(self.content)
+
+    @property
+    def dropped_pages(self) -> int:
+        return 0 if self.kept_pages is None else self.page_count - len(self.kept_pages)
+
+
+def _ink_ratio(image) -> float:
+    gray = image.convert("L")
+    gray.thumbnail(_INK_SAMPLE_SIZE)
+    histogram = gray.histogram()
+    return sum(histogram[:_INK_LEVEL]) / max(1, sum(histogram))
+
+
+def _is_blank(page, blank_ink_ratio: float) -> bool:
+    if (page.extract_text() or "").strip():
+        return False
+    images = list(page.images)
+    if not images:
+        contents = page.get_contents()
+        return contents is None or len(contents.get_data()) <= _MAX_BLANK_CONTENT_BYTES
+    return all(_ink_ratio(image.image) <= blank_ink_ratio for image in images)
+
+
+def _downsample(image_file, page_area_sq_in: float, target_dpi: int) -> bool:
+    from PIL import Image
+
+    image = image_file.image
+    # Bilevel and palette scans are already small, and lose text when resampled
+    if image.mode not in ("L", "RGB", "CMYK") or page_area_sq_in <= 0:
+        return False
+    # Scans fill the page; the area ratio is the same whichever way the image is rotated
+    dpi = math.sqrt(image.width * image.height / page_area_sq_in)
+    if dpi <= target_dpi * _DPI_SLACK:
+        return False
+    scale = target_dpi / dpi
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    image_file.replace(image.resize(size, Image.Resampling.LANCZOS), quality=_JPEG_QUALITY)
+    return True
+
+
+def optimize_pdf(pdf_bytes: bytes, target_dpi: int, blank_ink_ratio: float) -> OptimizedPdf:
+    """
+    Shrink a scanned PDF before OCR: drop blank pages, downsample images above
+    target_dpi and write the result without unused or duplicate objects.
+    CPU-bound; runs as a stage in the CPU stage pool (see optimize_for_ocr).
+    Returns the original bytes when nothing would get smaller.
+    """
+    # Imported here: only the stage workers need them loaded
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    page_count = len(reader.pages)
+    kept = [i for i, page in enumerate(reader.pages) if not _is_blank(page, blank_ink_ratio)]
+    if not kept:
+        # An all-blank upload still goes to OCR, so the pipeline reports it as unreadable
+        return OptimizedPdf.unchanged(pdf_bytes)
+
+    writer = PdfWriter()
+    for i in kept:
+        writer.add_page(reader.pages[i])
+
+    downsampled = 0
+    for page in writer.pages:
+        area = float(page.mediabox.width) * float(page.mediabox.height) / (72 * 72)
+        for image_file in page.images:
+            downsampled += _downsample(image_file, area, target_dpi)
+        page.compress_content_streams()
+    writer.compress_identical_objects(remove_identicals=True, remove_orphans=True)
+
+    out = io.BytesIO()
+    writer.write(out)
+    content = out.getvalue()
+
+    dropped = len(kept) < page_count
+    if not dropped and len(content) >= len(pdf_bytes):
+        return OptimizedPdf.unchanged(pdf_bytes)
+    return OptimizedPdf(
+        content=content,
+        original_size=len(pdf_bytes),
+        kept_pages=kept if dropped else None,
+        page_count=page_count,
+        images_downsampled=downsampled,
+    )
+
+
+async def optimize_for_ocr(pdf_bytes: bytes) -> OptimizedPdf:
+    """
+    Run optimize_pdf as a CPU stage, off the event loop. Fails open: if the
+    PDF can't be parsed or a worker dies, the original bytes are sent to OCR.
+    """
+    settings = get_settings()
+    if not settings.pdf_optimize_enabled:
+        return OptimizedPdf.unchanged(pdf_bytes)
+
+    try:
+        result = await run_cpu_stage(
+            optimize_pdf, pdf_bytes, settings.ocr_target_dpi, settings.blank_page_ink_ratio, heavy=True
+        )
+    except Exception as e:
+        logger.warning("pdf_optimize_failed", error=str(e))
+        return OptimizedPdf.unchanged(pdf_bytes)
+
+    logger.info(
+        "pdf_optimized",
+        original_bytes=result.original_size,
+        optimized_bytes=result.optimized_size,
+        dropped_pages=result.dropped_pages,
+        images_downsampled=result.images_downsampled,
+    )
+    return result
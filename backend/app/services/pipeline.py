@@ -1,30 +1,92 @@
+import asyncio
 import time
+from typing import Callable
 import structlog
-from app.models.schemas import OCRResult, ProcessingResult
-from app.services.ocr_service import extract_text_with_document_ai
+from app.config import get_settings
+from app.database.async_crud import find_duplicate_invoice
+from app.models.schemas import InvoiceSegment, OCRResult, ProcessingResult
+from app.services.dedupe_service import scan_dedupe_key
+from app.services.similarity_service import compute_signature, find_near_duplicate
+from app.services.stage_runner import run_cpu_stage
+from app.services.split_service import find_invoice_boundaries, split_detection_applies
+from app.services.ocr_service import recognize_pdf, record_validation
+from app.services.pdf_optimize_service import optimize_for_ocr
 from app.services.extraction_service import extract_invoice_data
 from app.services.validation_service import validate_invoice_data
+from app.utils.spool import SpooledPdf
 
 logger = structlog.get_logger()
 
 
+async def _run_ocr(pdf: bytes | SpooledPdf) -> OCRResult:
+    # A spooled PDF is only read into memory for the Document AI call
+    pdf_bytes = pdf.read_bytes() if isinstance(pdf, SpooledPdf) else pdf
+    optimized = await optimize_for_ocr(pdf_bytes)
+
+    started = time.time()
+    ocr_result = await recognize_pdf(optimized.content)
+    logger.info(
+        "ocr_complete",
+        engine=ocr_result.engine,
+        payload_bytes=optimized.optimized_size,
+        original_bytes=optimized.original_size,
+        latency_ms=int((time.time() - started) * 1000),
+    )
+
+    if optimized.kept_pages is not None:
+        ocr_result.page_numbers = [i + 1 for i in optimized.kept_pages]
+    return ocr_result
+
+
+def start_ocr(pdf: bytes | SpooledPdf) -> asyncio.Task:
+    """
+    Start OCR now, as a task, so it runs while the upload is still being
+    stored. Hand the task to process_invoice(ocr_task=...), or cancel_ocr() it
+    if the upload is abandoned.
+    """
+    return asyncio.create_task(_run_ocr(pdf))
+
+
+def cancel_ocr(task: asyncio.Task):
+    """
+    Drop a speculative OCR task. A Document AI call already in flight finishes
+    in its worker thread, but its result is discarded.
+    """
+    task.cancel()
+    if task.done() and not task.cancelled():
+        task.exception()  # retrieved, so asyncio doesn't log it as never retrieved
+
+
 async def process_invoice(
-    pdf_bytes: bytes,
+    pdf: bytes | SpooledPdf,
     buyer_gstin_hint: str | None = None,
     invoice_id: str | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    user_id: str | None = None,
+    ocr_task: asyncio.Task | None = None,
 ) -> ProcessingResult:
     """
     Full invoice processing pipeline:
     1. OCR via Google Document AI
-    2. LLM extraction via Groq
-    3. Validation
-    4. Return structured result
+    2. Split check (opt-in, see split_min_pages): a PDF holding several invoices
+       returns status "split" with one segment per invoice, each to be processed
+       with process_ocr_result()
+    3. Exact and near-duplicate check on the OCR text (only when user_id is given)
+    4. LLM extraction via Groq
+    5. Validation
+    6. Return structured result
+
+    on_stage, if given, is called with "ocr", "extraction" and "validation"
+    as each step starts. If ocr_task (from start_ocr) is given, step 1 awaits
+    it instead of calling OCR again.
     """
     start_time = time.time()
+    report_stage = on_stage or (lambda stage: None)
 
     try:
         # Step 1: OCR via Google Document AI
-        ocr_result = await extract_text_with_document_ai(pdf_bytes)
+        report_stage("ocr")
+        ocr_result = await (ocr_task or _run_ocr(pdf))
 
         if not ocr_result.full_text.strip():
             return ProcessingResult(
@@ -37,13 +99,104 @@ async def process_invoice(
                 },
             )
 
-        # Step 2: LLM Extraction via Groq
+        # Step 2: One PDF may hold several invoices
+        boundaries = _invoice_boundaries(ocr_result)
+        if len(boundaries) > 1:
+            elapsed_ms = int((time.time() - start_time) * 1000)
+            logger.info(
+                "invoice_pdf_split",
+                invoice_id=invoice_id,
+                pages=len(ocr_result.pages),
+                invoices=len(boundaries),
+                processing_time_ms=elapsed_ms,
+            )
+            return ProcessingResult(
+                invoice_id=invoice_id,
+                status="split",
+                segments=[_segment(ocr_result, first, last) for first, last in boundaries],
+                processing_time_ms=elapsed_ms,
+            )
+    except Exception as e:
+        return _failed(invoice_id, e, start_time)
+
+    return await process_ocr_result(
+        ocr_result, buyer_gstin_hint, invoice_id, on_stage=on_stage, user_id=user_id, start_time=start_time
+    )
+
+
+def _invoice_boundaries(ocr_result: OCRResult) -> list[tuple[int, int]]:
+    if not split_detection_applies(len(ocr_result.pages)):
+        return []
+    return find_invoice_boundaries(ocr_result.pages)
+
+
+def _segment(ocr_result: OCRResult, first: int, last: int) -> InvoiceSegment:
+    pages = ocr_result.pages[first:last + 1]
+    # Child page ranges refer to the uploaded PDF, blank pages included
+    numbers = ocr_result.page_numbers or range(1, len(ocr_result.pages) + 1)
+    return InvoiceSegment(
+        page_start=numbers[first],
+        page_end=numbers[last],
+        ocr_result=OCRResult(
+            full_text="\n".join(pages), pages=pages, confidence=ocr_result.confidence, engine=ocr_result.engine
+        ),
+    )
+
+
+def join_segments(segments: list[InvoiceSegment]) -> OCRResult:
+    """The whole document again from the segments of a split result."""
+    pages = [page for segment in segments for page in segment.ocr_result.pages]
+    first = segments[0].ocr_result
+    return OCRResult(full_text="\n".join(pages), pages=pages, confidence=first.confidence, engine=first.engine)
+
+
+async def process_ocr_result(
+    ocr_result: OCRResult,
+    buyer_gstin_hint: str | None = None,
+    invoice_id: str | None = None,
+    on_stage: Callable[[str], None] | None = None,
+    user_id: str | None = None,
+    start_time: float | None = None,
+) -> ProcessingResult:
+    """
+    Steps 3-6 of process_invoice() for OCR output that is already available,
+    e.g. one segment of a split PDF. start_time defaults to now.
+    """
+    start_time = start_time or time.time()
+    report_stage = on_stage or (lambda stage: None)
+
+    try:
+        # Step 3: Skip the LLM for an invoice the user already has
+        signature = await run_cpu_stage(compute_signature, ocr_result.full_text)
+        if user_id:
+            match = await _find_original(user_id, ocr_result.full_text, buyer_gstin_hint, signature)
+            if match:
+                duplicate_of, similarity = match
+                elapsed_ms = int((time.time() - start_time) * 1000)
+                logger.info(
+                    "invoice_duplicate_skipped",
+                    invoice_id=invoice_id,
+                    duplicate_of=duplicate_of,
+                    similarity=similarity,
+                    processing_time_ms=elapsed_ms,
+                )
+                return ProcessingResult(
+                    invoice_id=invoice_id,
+                    status="duplicate",
+                    duplicate_of=duplicate_of,
+                    processing_time_ms=elapsed_ms,
+                )
+
+        # Step 4: LLM Extraction via Groq
+        report_stage("extraction")
         invoice_data = await extract_invoice_data(ocr_result, buyer_gstin_hint)
 
-        # Step 3: Validation
+        # Step 5: Validation
+        report_stage("validation")
         is_valid, errors = validate_invoice_data(invoice_data)
         invoice_data.validation_passed = is_valid
         invoice_data.validation_errors = errors
+        record_validation(ocr_result.engine, is_valid)
 
         elapsed_ms = int((time.time() - start_time) * 1000)
 
@@ -59,27 +212,57 @@ async def process_invoice(
             invoice_id=invoice_id,
             status="completed",
             invoice_data=invoice_data,
+            minhash_signature=signature,
             processing_time_ms=elapsed_ms,
         )
 
     except Exception as e:
-        elapsed_ms = int((time.time() - start_time) * 1000)
-        logger.error(
-            "invoice_processing_failed",
-            invoice_id=invoice_id,
-            error=str(e),
-            error_type=type(e).__name__,
-        )
-        return ProcessingResult(
-            invoice_id=invoice_id,
-            status="failed",
-            error={
-                "code": "PROCESSING_ERROR",
-                "message": str(e),
-                "details": {"stage": "pipeline", "type": type(e).__name__},
-            },
-            processing_time_ms=elapsed_ms,
-        )
+        return _failed(invoice_id, e, start_time)
+
+
+def _failed(invoice_id: str | None, e: Exception, start_time: float) -> ProcessingResult:
+    elapsed_ms = int((time.time() - start_time) * 1000)
+    logger.error(
+        "invoice_processing_failed",
+        invoice_id=invoice_id,
+        error=str(e),
+        error_type=type(e).__name__,
+    )
+    return ProcessingResult(
+        invoice_id=invoice_id,
+        status="failed",
+        error={
+            "code": "PROCESSING_ERROR",
+            "message": str(e),
+            "details": {"stage": "pipeline", "type": type(e).__name__},
+        },
+        processing_time_ms=elapsed_ms,
+    )
+
+
+async def _find_original(
+    user_id: str, ocr_text: str, buyer_gstin_hint: str | None, signature: list[int] | None
+) -> tuple[str, float] | None:
+    """
+    Look up an earlier invoice this upload repeats: first by the seller GSTIN,
+    bill number and date found by a rule-based scan of the OCR text (only when
+    the scan is unambiguous; otherwise the extracted key is checked on save),
+    then by MinHash similarity of the text (re-scans and re-prints). Returns
+    (original_id, similarity). A failed lookup is not fatal: the invoice is
+    simply processed in full.
+    """
+    try:
+        key = scan_dedupe_key(ocr_text, buyer_gstin_hint)
+        original = await find_duplicate_invoice(user_id, [key]) if key else None
+        if original:
+            return original["id"], 1.0
+        if signature:
+            return await find_near_duplicate(
+                user_id, ocr_text, signature, get_settings().near_duplicate_threshold
+            )
+    except Exception as e:
+        logger.warning("duplicate_check_failed", error=str(e))
+    return None
 
 
 async def process_invoice_from_ocr_text(
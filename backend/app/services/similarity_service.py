@@ -0,0 +1,197 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict
+
+import numpy as np
+import structlog
+
+from app.config import get_settings
+from app.database.async_crud import get_invoices_by_ids, iter_invoice_signatures, save_invoice_signature
+from app.services.dedupe_service import normalize_bill_no
+
+logger = structlog.get_logger()
+
+# Signature layout. Changing any of these invalidates stored signatures.
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 Jaccard almost always collide
+SHINGLE_SIZE = 5  # characters, over whitespace-collapsed lowercase text
+_PRIME = np.uint64(4294967291)  # largest prime below 2**32; a*x + b stays below 2**64
+_rng = np.random.default_rng(20250901)
+_PERM_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+
+# Texts shorter than this (in shingles) are too small to compare meaningfully
+MIN_SHINGLES = 50
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    normalized = _WHITESPACE.sub(" ", text.lower()).strip()
+    shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def compute_signature(text: str) -> list[int] | None:
+    """
+    MinHash signature of the OCR text's character shingles, or None when the
+    text is too short. Deterministic across processes, so it can be stored.
+    """
+    hashes = _shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME
+    return permuted.min(axis=0).tolist()
+
+
+def estimate_similarity(a, b) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.mean(np.asarray(a) == np.asarray(b)))
+
+
+def _band_keys(signature) -> list[bytes]:
+    rows = NUM_PERM // LSH_BANDS
+    values = np.asarray(signature, dtype=np.uint64)
+    return [
+        bytes([band]) + values[band * rows:(band + 1) * rows].tobytes()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class LSHIndex:
+    """
+    Banded MinHash index. A query only touches invoices sharing at least one
+    band with it, instead of comparing against every stored signature.
+    """
+
+    def __init__(self):
+        self._buckets: dict[bytes, set[str]] = {}
+        self._entries: dict[str, np.ndarray] = {}
+        self.loaded_at = time.monotonic()
+
+    def add(self, invoice_id: str, signature):
+        self.remove(invoice_id)
+        self._entries[invoice_id] = np.asarray(signature, dtype=np.uint64)
+        for key in _band_keys(signature):
+            self._buckets.setdefault(key, set()).add(invoice_id)
+
+    def remove(self, invoice_id: str):
+        entry = self._entries.pop(invoice_id, None)
+        if entry is None:
+            return
+        for key in _band_keys(entry):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(invoice_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def query(self, signature, threshold: float) -> list[tuple[str, float]]:
+        """Indexed invoices at or above threshold, most similar first."""
+        candidates = set()
+        for key in _band_keys(signature):
+            candidates |= self._buckets.get(key, set())
+        matches = []
+        for invoice_id in candidates:
+            similarity = estimate_similarity(self._entries[invoice_id], signature)
+            if similarity >= threshold:
+                matches.append((invoice_id, similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Per-user indexes, loaded from the database on first use in this process.
+# Least recently used ones are dropped beyond NEAR_DUPLICATE_INDEX_MAX_USERS.
+_indexes: OrderedDict[str, LSHIndex] = OrderedDict()
+
+
+async def get_user_index(user_id: str) -> LSHIndex:
+    """
+    Return the user's index, building it from stored signatures on first use.
+    An index older than NEAR_DUPLICATE_INDEX_TTL_SECONDS is rebuilt, picking up
+    invoices other workers stored or deleted since. Two concurrent loads both
+    build the same index; the last one is kept.
+    """
+    settings = get_settings()
+    index = _indexes.get(user_id)
+    if index is not None and time.monotonic() - index.loaded_at < settings.near_duplicate_index_ttl_seconds:
+        _indexes.move_to_end(user_id)
+        return index
+
+    stale = index is not None
+    index = LSHIndex()
+    async for row in iter_invoice_signatures(user_id):
+        index.add(row["invoice_id"], row["minhash"])
+    _indexes[user_id] = index
+    _indexes.move_to_end(user_id)
+    while len(_indexes) > max(settings.near_duplicate_index_max_users, 1):
+        _indexes.popitem(last=False)
+    logger.info("lsh_index_loaded", user_id=user_id, invoices=len(index), refreshed=stale)
+    return index
+
+
+def index_invoice(user_id: str, invoice_id: str, signature):
+    """Add a completed invoice to the user's index, if that index is loaded."""
+    index = _indexes.get(user_id)
+    if index is not None:
+        index.add(invoice_id, signature)
+
+
+def unindex_invoice(user_id: str, invoice_id: str):
+    """Drop a deleted invoice from the user's index."""
+    index = _indexes.get(user_id)
+    if index is not None:
+        index.remove(invoice_id)
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", text.upper())
+
+
+async def find_near_duplicate(
+    user_id: str, ocr_text: str, signature, threshold: float
+) -> tuple[str, float] | None:
+    """
+    Find an earlier invoice whose OCR text is a near-copy of this one.
+    Suppliers reuse templates, so high similarity alone is not enough: the
+    candidate's seller GSTIN and bill number must also appear in this text.
+    Returns (invoice_id, similarity) of the best verified match.
+    """
+    matches = (await get_user_index(user_id)).query(signature, threshold)
+    if not matches:
+        return None
+
+    compact = _compact(ocr_text)
+    rows = {row["id"]: row for row in await get_invoices_by_ids([m[0] for m in matches], user_id)}
+    for invoice_id, similarity in matches:
+        row = rows.get(invoice_id)
+        if not row:
+            continue
+        gstin = _compact(row.get("seller_gstin") or "")
+        bill_no = normalize_bill_no(row.get("bill_no"))
+        if gstin and bill_no and gstin in compact and bill_no in compact:
+            return invoice_id, similarity
+    return None
+
+
+async def remember_signature(user_id: str, invoice_id: str, signature: list[int]):
+    """
+    Store a completed invoice's signature and add it to the loaded index.
+    Best-effort: a failure only means this invoice can't be matched later.
+    """
+    try:
+        await save_invoice_signature(invoice_id, user_id, signature)
+    except Exception as e:
+        logger.warning("signature_save_failed", invoice_id=invoice_id, error=str(e))
+        return
+    index_invoice(user_id, invoice_id, signature)
@@ -0,0 +1,90 @@
+import re
+
+from app.config import get_settings
+from app.services.dedupe_service import BILL_NO_IN_TEXT, normalize_bill_no
+
+# "Page 1 of 3", "Page 2/3", "Pg. 1 of 2"
+PAGE_OF = re.compile(r"\b(?:page|pg)\.?\s*(\d{1,3})\s*(?:of|/)\s*(\d{1,3})\b", re.IGNORECASE)
+
+# Wording that closes an invoice (its last page)
+INVOICE_END = re.compile(
+    r"\b(?:grand\s+total|net\s+amount|amount\s+chargeable|amount\s+in\s+words|total\s+invoice\s+value)\b",
+    re.IGNORECASE,
+)
+
+# Lines this short are page furniture ("Original", "1"), not a letterhead
+_MIN_HEADER_CHARS = 6
+
+
+def _page_numbers(text: str) -> tuple[int, int] | None:
+    match = PAGE_OF.search(text)
+    if not match:
+        return None
+    number, total = int(match.group(1)), int(match.group(2))
+    return (number, total) if 1 <= number <= total else None
+
+
+def _bill_numbers(text: str) -> set[str]:
+    return {
+        number
+        for number in map(normalize_bill_no, BILL_NO_IN_TEXT.findall(text))
+        if any(c.isdigit() for c in number)
+    }
+
+
+def _header(text: str) -> str:
+    for line in text.splitlines():
+        compact = re.sub(r"[^A-Z0-9]", "", line.upper())
+        if len(compact) >= _MIN_HEADER_CHARS:
+            return compact
+    return ""
+
+
+def split_detection_applies(page_count: int) -> bool:
+    """Whether a PDF this long is checked for several invoices (SPLIT_MIN_PAGES; 0 = never)."""
+    min_pages = get_settings().split_min_pages
+    return bool(min_pages) and page_count >= min_pages
+
+
+def find_invoice_boundaries(pages: list[str]) -> list[tuple[int, int]]:
+    """
+    Cut a document into logical invoices from its per-page OCR text.
+    Returns (first_page, last_page) index pairs, 0-based and inclusive.
+
+    A page starts a new invoice when, in order of precedence:
+    - it says "Page 1 of N" (any other "Page k of N" continues the current one)
+    - it carries a bill number the current invoice doesn't have
+    - it repeats the first page's header right after a page that closed an
+      invoice (grand total, amount in words, ...)
+    Pages without any of these signals continue the current invoice.
+    """
+    if not pages:
+        return []
+
+    segments: list[tuple[int, int]] = []
+    start = 0
+    bills = _bill_numbers(pages[0])
+    header = _header(pages[0])
+
+    for i in range(1, len(pages)):
+        text = pages[i]
+        page_bills = _bill_numbers(text)
+        numbering = _page_numbers(text)
+
+        if numbering:
+            boundary = numbering[0] == 1
+        elif page_bills:
+            boundary = not (page_bills & bills)
+        else:
+            boundary = bool(header) and _header(text) == header and bool(INVOICE_END.search(pages[i - 1]))
+
+        if boundary:
+            segments.append((start, i - 1))
+            start = i
+            bills = set(page_bills)
+            header = _header(text)
+        else:
+            bills |= page_bills
+
+    segments.append((start, len(pages) - 1))
+    return segments
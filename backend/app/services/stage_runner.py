@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Iterable, Iterator
+
+from app.config import get_settings
+
+# CPU_STAGE_EXECUTOR values
+EXECUTORS = ("process", "thread", "inline")
+
+# Workers are recycled so decode buffers (Pillow, protobuf) don't pile up in long-lived processes
+_TASKS_PER_WORKER = 200
+
+# One pool per mode; light and heavy stages share it when their settings agree
+_executors: dict[str, Executor] = {}
+_executor_lock = threading.Lock()
+
+
+def stage_workers() -> int:
+    """Worker count of each stage pool; CPU_STAGE_WORKERS=0 means one per core."""
+    return get_settings().cpu_stage_workers or os.cpu_count() or 1
+
+
+def _get_executor(heavy: bool = False) -> Executor | None:
+    settings = get_settings()
+    if heavy:
+        mode, setting = settings.heavy_stage_executor, "HEAVY_STAGE_EXECUTOR"
+    else:
+        mode, setting = settings.cpu_stage_executor, "CPU_STAGE_EXECUTOR"
+    if mode not in EXECUTORS:
+        raise ValueError(f"{setting} must be one of {', '.join(EXECUTORS)}, not {mode!r}")
+    if mode == "inline":
+        return None
+    with _executor_lock:
+        if mode not in _executors:
+            if mode == "process":
+                # spawn, not fork: the server process has threads (pools, to_thread workers)
+                _executors[mode] = ProcessPoolExecutor(
+                    max_workers=stage_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    max_tasks_per_child=_TASKS_PER_WORKER,
+                )
+            else:
+                _executors[mode] = ThreadPoolExecutor(max_workers=stage_workers(), thread_name_prefix="cpu-stage")
+        return _executors[mode]
+
+
+def shutdown_stage_pool():
+    """Stop the stage workers. The next stage starts fresh pools (with current settings)."""
+    with _executor_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_cpu_stage(fn: Callable[..., Any], *args, heavy: bool = False) -> Any:
+    """
+    Run fn(*args) in a stage pool and await the result, keeping CPU-bound
+    work off the event loop. Light stages use CPU_STAGE_EXECUTOR (threads by
+    default); heavy=True is for stages that hold the GIL long enough to pay
+    for a process round trip (PDF rasterizing, Tesseract) and uses
+    HEAVY_STAGE_EXECUTOR. In process mode fn must be a module-level function
+    and its arguments and result picklable (bytes, dicts, pydantic models),
+    not live clients or protobuf handles.
+    """
+    executor = _get_executor(heavy)
+    if executor is None:
+        return fn(*args)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    except BrokenProcessPool:
+        shutdown_stage_pool()  # a worker died (OOM, segfault); don't keep failing on a dead pool
+        raise
+
+
+def iter_cpu_stage(
+    fn: Callable[..., Any], items: Iterable, *args, window: int | None = None, heavy: bool = False
+) -> Iterator:
+    """
+    Blocking counterpart of run_cpu_stage for worker threads (exports): yields
+    fn(item, *args) for each item, in order, with up to `window` items in the
+    pool at once (default two per worker) so a long export never queues
+    everything in memory.
+    """
+    executor = _get_executor(heavy)
+    if executor is None:
+        for item in items:
+            yield fn(item, *args)
+        return
+
+    window = window or 2 * stage_workers()
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item, *args))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        shutdown_stage_pool()
+        raise
+    finally:
+        for future in pending:
+            future.cancel()
@@ -23,6 +23,25 @@ def upload_pdf(user_id: str, filename: str, file_bytes: bytes) -> str:
     return storage_path
 
 
+def upload_export(user_id: str, job_id: str, local_path: str, extension: str, content_type: str) -> str:
+    """
+    Upload a finished export file from local disk (streamed, not read into memory).
+    Stores under: invoices/{user_id}/exports/{job_id}.{extension}
+    Returns the storage path.
+    """
+    sb = get_supabase_admin()
+    storage_path = f"{user_id}/exports/{job_id}.{extension}"
+
+    with open(local_path, "rb") as f:
+        sb.storage.from_(BUCKET_NAME).upload(
+            path=storage_path,
+            file=f,
+            file_options={"content-type": content_type},
+        )
+
+    return storage_path
+
+
 def download_pdf(storage_path: str) -> bytes:
     """Download PDF bytes from Supabase Storage."""
     sb = get_supabase_admin()
@@ -36,6 +55,12 @@ def delete_pdf(storage_path: str):
     sb.storage.from_(BUCKET_NAME).remove([storage_path])
 
 
+def delete_export(storage_path: str):
+    """Delete a finished export file from Supabase Storage."""
+    sb = get_supabase_admin()
+    sb.storage.from_(BUCKET_NAME).remove([storage_path])
+
+
 def get_signed_url(storage_path: str, expires_in: int = 3600) -> str:
     """Get a temporary signed URL for PDF download."""
     sb = get_supabase_admin()
@@ -0,0 +1,50 @@
+INVOICE_MEASURES = (
+    "total_taxable_value", "total_cgst", "total_sgst", "total_igst", "total_amount",
+)
+RATE_MEASURES = (
+    "taxable_value", "cgst_amount", "sgst_amount", "igst_amount", "total_with_tax",
+)
+
+
+def _add(target: dict, row: dict, measures: tuple, count_field: str):
+    target[count_field] = target.get(count_field, 0) + (row.get(count_field) or 0)
+    for measure in measures:
+        target[measure] = target.get(measure, 0.0) + float(row.get(measure) or 0)
+
+
+def _rounded(group: dict, measures: tuple) -> dict:
+    return {**group, **{m: round(group.get(m, 0.0), 2) for m in measures}}
+
+
+def summarize_rollups(invoice_rollups: list[dict], rate_rollups: list[dict]) -> dict:
+    """
+    Fold precomputed rollup rows into period totals plus breakdowns
+    by month, seller GSTIN and GST rate. Work is proportional to the number
+    of rollup groups, not the number of invoices.
+    """
+    totals: dict = {}
+    by_month: dict[str, dict] = {}
+    by_seller: dict[str, dict] = {}
+    by_rate: dict[float, dict] = {}
+
+    for row in invoice_rollups:
+        month = str(row["period_month"])[:7]
+        seller = row.get("seller_gstin") or ""
+        _add(totals, row, INVOICE_MEASURES, "invoice_count")
+        _add(by_month.setdefault(month, {"month": month}), row, INVOICE_MEASURES, "invoice_count")
+        _add(by_seller.setdefault(seller, {"seller_gstin": seller}), row, INVOICE_MEASURES, "invoice_count")
+
+    for row in rate_rollups:
+        rate = float(row["rate"])
+        _add(by_rate.setdefault(rate, {"rate": rate}), row, RATE_MEASURES, "line_count")
+
+    return {
+        "totals": _rounded({"invoice_count": 0, **totals}, INVOICE_MEASURES),
+        "by_month": [_rounded(by_month[k], INVOICE_MEASURES) for k in sorted(by_month)],
+        "by_seller": sorted(
+            (_rounded(g, INVOICE_MEASURES) for g in by_seller.values()),
+            key=lambda g: g["total_amount"],
+            reverse=True,
+        ),
+        "by_rate": [_rounded(by_rate[k], RATE_MEASURES) for k in sorted(by_rate)],
+    }
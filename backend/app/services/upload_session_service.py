@@ -0,0 +1,181 @@
+import asyncio
+import os
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator
+
+import structlog
+
+from app.config import get_settings
+from app.models.schemas import UploadSession
+from app.utils.helpers import PdfUploadValidator
+from app.utils.spool import SpooledPdf, get_spool_dir
+
+logger = structlog.get_logger()
+
+# Suggested client chunk size; any size is accepted
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+class UploadOffsetMismatch(Exception):
+    """A chunk did not start where the upload currently ends (or another chunk is in flight)."""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+@dataclass
+class _UploadState:
+    path: str
+    validator: PdfUploadValidator
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+# In-process session registry. The received bytes live in the spool directory;
+# a restart loses the sessions, and clients start those uploads over.
+_sessions: dict[str, UploadSession] = {}
+_state: dict[str, _UploadState] = {}
+_lock = threading.Lock()
+
+
+def _max_upload_size() -> int:
+    return get_settings().max_resumable_upload_mb * 1024 * 1024
+
+
+def _drop(upload_id: str) -> _UploadState | None:
+    with _lock:
+        _sessions.pop(upload_id, None)
+        return _state.pop(upload_id, None)
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _prune_stale_sessions():
+    # Called with _lock held
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=get_settings().upload_session_ttl_hours)
+    for upload_id, session in list(_sessions.items()):
+        if session.updated_at < cutoff:
+            del _sessions[upload_id]
+            state = _state.pop(upload_id, None)
+            if state:
+                _remove_file(state.path)
+
+
+def _session_state(session: UploadSession) -> _UploadState:
+    state = _state.get(session.id)
+    if state is None:
+        # Aborted, completed or expired since the caller looked it up
+        raise ValueError("Upload session is no longer open")
+    return state
+
+
+def create_upload_session(
+    user_id: str, filename: str, size: int, buyer_gstin: str | None = None
+) -> UploadSession:
+    """
+    Start a resumable upload of `size` bytes. Raises ValueError if the file is
+    not a PDF by name, is larger than MAX_RESUMABLE_UPLOAD_MB, or the user
+    already has MAX_UPLOAD_SESSIONS_PER_USER uploads open.
+    """
+    validator = PdfUploadValidator(filename, max_size=_max_upload_size())
+    if validator.error:
+        raise ValueError(validator.error)
+    if size <= 0 or size > validator.max_size:
+        raise ValueError(f"Size must be between 1 byte and {validator.max_size // (1024*1024)}MB")
+
+    session = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        filename=filename,
+        size=size,
+        buyer_gstin=buyer_gstin,
+        chunk_size=CHUNK_SIZE,
+    )
+    limit = get_settings().max_upload_sessions_per_user
+    with _lock:
+        _prune_stale_sessions()
+        if sum(1 for s in _sessions.values() if s.user_id == user_id) >= limit:
+            raise ValueError(f"Too many open uploads (limit {limit}); complete or cancel one first")
+        fd, path = tempfile.mkstemp(suffix=".pdf", prefix="resumable-", dir=get_spool_dir())
+        os.close(fd)
+        _sessions[session.id] = session
+        _state[session.id] = _UploadState(path=path, validator=validator)
+    return session
+
+
+def get_upload_session(upload_id: str, user_id: str) -> UploadSession | None:
+    """Fetch a session (scoped to user)."""
+    session = _sessions.get(upload_id)
+    if session is None or session.user_id != user_id:
+        return None
+    return session
+
+
+async def append_chunk(session: UploadSession, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Append a chunk, streamed from `chunks`, at `offset`. Bytes are validated,
+    hashed and written to disk as they arrive, so an interrupted chunk keeps
+    what got through and the client resumes from the returned offset.
+
+    Raises UploadOffsetMismatch if offset isn't where the upload ends, and
+    ValueError if the session is no longer open, or (after aborting the
+    session) if the content is not a valid PDF or runs past the declared size.
+    """
+    state = _session_state(session)
+    if state.lock.locked() or offset != session.offset:
+        raise UploadOffsetMismatch(session.offset)
+
+    async with state.lock:
+        try:
+            with open(state.path, "ab") as out:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if session.offset + len(chunk) > session.size:
+                        error = "Chunk runs past the declared upload size"
+                    else:
+                        error = state.validator.feed(chunk)
+                    if error:
+                        abort_upload_session(session)
+                        raise ValueError(error)
+                    await asyncio.to_thread(out.write, chunk)
+                    session.offset += len(chunk)
+        finally:
+            session.updated_at = datetime.now(timezone.utc)
+    return session.offset
+
+
+def complete_upload_session(session: UploadSession) -> SpooledPdf:
+    """
+    Finish an upload whose bytes have all arrived and hand the file over as a
+    SpooledPdf (the caller owns it from here). Raises UploadOffsetMismatch if
+    bytes are missing, ValueError if the session is no longer open or (after
+    aborting) if the file is not a PDF.
+    """
+    state = _session_state(session)
+    if state.lock.locked() or session.offset != session.size:
+        raise UploadOffsetMismatch(session.offset)
+    error = state.validator.finish()
+    if error:
+        abort_upload_session(session)
+        raise ValueError(error)
+    if _drop(session.id) is None:
+        raise ValueError("Upload session is no longer open")  # aborted meanwhile, bytes already removed
+    logger.info("resumable_upload_completed", upload_id=session.id, size=session.size)
+    return SpooledPdf(path=state.path, size=session.size, sha256=state.validator.sha256)
+
+
+def abort_upload_session(session: UploadSession):
+    """Discard a session and the bytes received so far."""
+    state = _drop(session.id)
+    if state:
+        _remove_file(state.path)
@@ -0,0 +1,89 @@
+import asyncio
+import os
+import tempfile
+import zipfile
+import zlib
+from typing import AsyncIterator
+
+from fastapi import UploadFile
+
+from app.config import get_settings
+from app.utils.helpers import UPLOAD_CHUNK_SIZE
+from app.utils.spool import SpooledPdf, get_spool_dir, spool_stream
+
+# Raised while reading a damaged, encrypted or unsupported member
+_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+async def spool_zip(upload: UploadFile) -> str:
+    """
+    Copy an uploaded archive to the spool directory in chunks (zipfile needs a
+    seekable file). Returns its path. Raises ValueError above MAX_ZIP_UPLOAD_MB.
+    """
+    limit = get_settings().max_zip_upload_mb * 1024 * 1024
+    fd, path = tempfile.mkstemp(suffix=".zip", prefix="archive-", dir=get_spool_dir())
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise ValueError(f"Archive too large. Maximum size is {limit // (1024*1024)}MB")
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _is_junk(name: str) -> bool:
+    # Directories, macOS resource forks and hidden files
+    return name.endswith("/") or name.startswith("__MACOSX/") or os.path.basename(name).startswith(".")
+
+
+def list_zip_members(path: str) -> list[zipfile.ZipInfo]:
+    """
+    File members of the archive in archive order, read from the central
+    directory only. Raises ValueError for a bad archive or too many members.
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = [info for info in archive.infolist() if not _is_junk(info.filename)]
+    except zipfile.BadZipFile:
+        raise ValueError("Not a valid zip archive")
+    limit = get_settings().max_zip_members
+    if len(members) > limit:
+        raise ValueError(f"Archive has {len(members)} files; the maximum is {limit}")
+    return members
+
+
+def is_pdf_member(info: zipfile.ZipInfo) -> bool:
+    return info.filename.lower().endswith(".pdf")
+
+
+async def iter_zip_pdfs(
+    path: str, members: list[zipfile.ZipInfo]
+) -> AsyncIterator[tuple[str, SpooledPdf | None, str | None]]:
+    """
+    Unpack members one at a time into the spool directory, validating each as
+    it decompresses. Yields (filename, spooled_pdf, None) or (filename, None,
+    error). The caller owns each spooled PDF.
+    """
+    archive = await asyncio.to_thread(zipfile.ZipFile, path)
+    try:
+        for info in members:
+            filename = os.path.basename(info.filename)
+            try:
+                member = await asyncio.to_thread(archive.open, info)
+            except _MEMBER_ERRORS:
+                yield filename, None, "Could not read file from archive"
+                continue
+            try:
+                pdf, error = await spool_stream(filename, lambda n: asyncio.to_thread(member.read, n))
+            except _MEMBER_ERRORS:
+                pdf, error = None, "Could not read file from archive"
+            finally:
+                member.close()
+            yield filename, pdf, error
+    finally:
+        archive.close()
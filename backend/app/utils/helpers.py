@@ -6,6 +6,53 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 PDF_MAGIC = b"%PDF"
 
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class PdfUploadValidator:
+    """
+    Checks an upload chunk by chunk while it streams in: extension, PDF magic
+    number and size, and computes its SHA-256 on the way.
+    Each check fails as soon as the offending bytes arrive.
+    """
+
+    def __init__(self, filename: str, max_size: int | None = None):
+        self.max_size = max_size or MAX_FILE_SIZE
+        self.size = 0
+        self._head = b""
+        self._hash = hashlib.sha256()
+        self.error: str | None = None
+        ext = os.path.splitext(filename or "")[1].lower()
+        if ext not in ALLOWED_EXTENSIONS:
+            self.error = "Only PDF files are allowed"
+
+    def feed(self, chunk: bytes) -> str | None:
+        """Account for the next chunk. Returns the error message once the upload is invalid."""
+        if self.error:
+            return self.error
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            self.error = f"File too large. Maximum size is {self.max_size // (1024*1024)}MB"
+            return self.error
+        if len(self._head) < len(PDF_MAGIC):
+            self._head += chunk[:len(PDF_MAGIC) - len(self._head)]
+            if self._head != PDF_MAGIC[:len(self._head)]:
+                self.error = "Invalid PDF file (bad header)"
+                return self.error
+        self._hash.update(chunk)
+        return None
+
+    def finish(self) -> str | None:
+        """Final check once the upload is complete (catches files shorter than the header)."""
+        if not self.error and self._head != PDF_MAGIC:
+            self.error = "Invalid PDF file (bad header)"
+        return self.error
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
 def validate_pdf_upload(filename: str, file_bytes: bytes) -> tuple[bool, str | None]:
     """
     Validate an uploaded file:
@@ -14,19 +61,28 @@ def validate_pdf_upload(filename: str, file_bytes: bytes) -> tuple[bool, str | N
     - Check PDF magic number header
     Returns (is_valid, error_message).
     """
-    ext = os.path.splitext(filename)[1].lower()
-    if ext not in ALLOWED_EXTENSIONS:
-        return False, "Only PDF files are allowed"
-
-    if len(file_bytes) > MAX_FILE_SIZE:
-        return False, f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
-
-    if not file_bytes[:4] == PDF_MAGIC:
-        return False, "Invalid PDF file (bad header)"
-
-    return True, None
+    validator = PdfUploadValidator(filename)
+    validator.feed(file_bytes)
+    error = validator.finish()
+    return error is None, error
 
 
 def file_hash(file_bytes: bytes) -> str:
     """Generate SHA-256 hash of file content for caching."""
     return hashlib.sha256(file_bytes).hexdigest()
+
+
+def compute_etag(*parts) -> str:
+    """Build a strong ETag from the values that determine a response body."""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
@@ -0,0 +1,84 @@
+import asyncio
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from fastapi import UploadFile
+
+from app.config import get_settings
+from app.utils.helpers import UPLOAD_CHUNK_SIZE, PdfUploadValidator
+
+
+@dataclass
+class SpooledPdf:
+    """
+    A validated upload kept on local disk until processing finishes, so queued
+    invoices don't hold their PDF in memory. Call discard() when done with it.
+    """
+
+    path: str
+    size: int
+    sha256: str
+
+    def open(self):
+        """Binary file handle, for streaming the PDF (e.g. to storage)."""
+        return open(self.path, "rb")
+
+    @contextmanager
+    def mapped(self):
+        """Read-only memory map of the file; pages are loaded only when touched."""
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def read_bytes(self) -> bytes:
+        """Copy the PDF into memory, for APIs that only take bytes (Document AI)."""
+        with self.mapped() as mm:
+            return mm[:]
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def get_spool_dir() -> str | None:
+    """Directory for spooled uploads (UPLOAD_SPOOL_DIR), or None for the system temp dir."""
+    return get_settings().upload_spool_dir or None
+
+
+async def spool_upload(upload: UploadFile) -> tuple[SpooledPdf | None, str | None]:
+    """
+    Stream an upload to a temp file in chunks, validating and hashing as it goes.
+    Stops reading at the first invalid chunk. Returns (spooled_pdf, None) or
+    (None, error_message).
+    """
+    return await spool_stream(upload.filename, upload.read)
+
+
+async def spool_stream(
+    filename: str, read: Callable[[int], Awaitable[bytes]]
+) -> tuple[SpooledPdf | None, str | None]:
+    """spool_upload() for any source: read(n) returns the next chunk, b"" at the end."""
+    validator = PdfUploadValidator(filename)
+    if validator.error:
+        return None, validator.error
+
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="upload-", dir=get_spool_dir())
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await read(UPLOAD_CHUNK_SIZE):
+                if validator.feed(chunk):
+                    break
+                await asyncio.to_thread(out.write, chunk)
+        if validator.finish():
+            os.remove(path)
+            return None, validator.error
+    except BaseException:
+        os.remove(path)
+        raise
+    return SpooledPdf(path=path, size=validator.size, sha256=validator.sha256), None
@@ -0,0 +1,90 @@
+"""
+Benchmark: CPU stage throughput by executor and worker count.
+
+Usage (from backend/):
+    python -m scripts.bench_cpu_stages [--chunks 200] [--chunk-size 200]
+
+Renders --chunks chunks of synthetic invoice rows as a Tally export (rebuild
+InvoiceData from each row, then render) through the stage runner, with the
+thread and process executors at 1, 2, 4 ... workers up to the core count. The
+thread pool stays near the single-worker rate because of the GIL; the process
+pool should scale with cores. Pool start-up is excluded.
+"""
+import argparse
+import os
+import time
+
+from app.config import get_settings
+from app.services.output_service import render_export_chunk
+from app.services.stage_runner import iter_cpu_stage, shutdown_stage_pool
+
+
+def _sample_record(i: int) -> dict:
+    return {
+        "seller_name": f"Supplier {i % 50} & Sons",
+        "seller_gstin": "32AAXFB6381L1ZU",
+        "buyer_gstin": "32BSBPA3464Q1ZQ",
+        "bill_no": f"INV/{i:06d}",
+        "bill_date": "2025-09-01",
+        "tax_breakup": [
+            {"rate": 18, "taxable_value": 1000, "cgst_amount": 90, "sgst_amount": 90, "total_with_tax": 1180},
+            {"rate": 28, "taxable_value": 500, "cgst_amount": 70, "sgst_amount": 70, "total_with_tax": 640},
+        ],
+        "total_taxable_value": 1500,
+        "total_cgst": 160,
+        "total_sgst": 160,
+        "total_igst": 0,
+        "total_quantity": 12,
+        "total_amount": 1820,
+    }
+
+
+def _worker_counts() -> list[int]:
+    cores = os.cpu_count() or 1
+    counts, n = [], 1
+    while n < cores:
+        counts.append(n)
+        n *= 2
+    return counts + [cores]
+
+
+def _run(executor: str, workers: int, chunks: list[list[dict]]) -> float:
+    settings = get_settings()
+    settings.heavy_stage_executor = executor
+    settings.cpu_stage_workers = workers
+    shutdown_stage_pool()
+    # Start every worker before timing
+    list(iter_cpu_stage(render_export_chunk, chunks[:workers], "xml", heavy=True))
+
+    started = time.perf_counter()
+    for _ in iter_cpu_stage(render_export_chunk, chunks, "xml", heavy=True):
+        pass
+    elapsed = time.perf_counter() - started
+    shutdown_stage_pool()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=200, help="Chunks to render")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Invoice rows per chunk")
+    args = parser.parse_args()
+
+    chunk = [_sample_record(i) for i in range(args.chunk_size)]
+    chunks = [chunk] * args.chunks
+    print(f"{args.chunks} chunks x {args.chunk_size} invoices, {os.cpu_count()} cores")
+
+    baseline = None
+    for executor in ("thread", "process"):
+        for workers in _worker_counts():
+            elapsed = _run(executor, workers, chunks)
+            rate = args.chunks / elapsed
+            baseline = baseline or rate
+            print(
+                f"{executor:<8} {workers:>3} workers  {elapsed:7.2f}s  "
+                f"{rate:8.1f} chunks/s  {rate * args.chunk_size:10.0f} invoices/s  x{rate / baseline:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: the streaming Tally export vs. the original single-string builder.
+
+Usage (from backend/):
+    python -m scripts.bench_tally_xml
+
+For 1, 100 and 10,000 vouchers, reports wall time (best of 3) and peak
+Python heap allocated while rendering (tracemalloc). The streaming side is
+the bulk export path (iter_record_export) with stages run inline, so both
+sides are measured in this process.
+"""
+import time
+import tracemalloc
+from xml.sax.saxutils import escape
+
+from app.config import get_settings
+from app.models.schemas import InvoiceData, TaxBreakup
+from app.services.output_service import iter_record_export
+
+SIZES = [1, 100, 10_000]
+REPEATS = 3
+
+
+def _sample_invoice(i: int) -> InvoiceData:
+    return InvoiceData(
+        seller_name=f"Supplier {i % 50} & Sons",
+        seller_gstin="32AAXFB6381L1ZU",
+        buyer_gstin="32BSBPA3464Q1ZQ",
+        bill_no=f"INV/{i:06d}",
+        bill_date="2025-09-01",
+        tax_breakup=[
+            TaxBreakup(rate=18, taxable_value=1000, cgst_amount=90, sgst_amount=90, total_with_tax=1180),
+            TaxBreakup(rate=28, taxable_value=500, cgst_amount=70, sgst_amount=70, total_with_tax=640),
+        ],
+        total_taxable_value=1500,
+        total_cgst=160,
+        total_sgst=160,
+        total_amount=1820,
+    )
+
+
+def legacy_tally_xml(invoices: list[InvoiceData]) -> str:
+    """The original f-string / += builder, extended to N vouchers in one string."""
+    vouchers = ""
+    for data in invoices:
+        tally_date = data.bill_date.replace("-", "")
+        tax_entries = ""
+        for item in data.tax_breakup:
+            if item.cgst_amount > 0:
+                tax_entries += f"""
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>Input CGST @ {item.rate / 2:.0f}%</LEDGERNAME>
+                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
+                            <AMOUNT>-{item.cgst_amount:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>Input SGST @ {item.rate / 2:.0f}%</LEDGERNAME>
+                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
+                            <AMOUNT>-{item.sgst_amount:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>"""
+            if item.igst_amount > 0:
+                tax_entries += f"""
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>Input IGST @ {item.rate:.0f}%</LEDGERNAME>
+                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
+                            <AMOUNT>-{item.igst_amount:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>"""
+        vouchers += f"""
+                    <VOUCHER VCHTYPE="Purchase" ACTION="Create">
+                        <DATE>{tally_date}</DATE>
+                        <VOUCHERTYPENAME>Purchase</VOUCHERTYPENAME>
+                        <VOUCHERNUMBER>{escape(data.bill_no)}</VOUCHERNUMBER>
+                        <PARTYLEDGERNAME>{escape(data.seller_name)}</PARTYLEDGERNAME>
+                        <PARTYGSTIN>{escape(data.seller_gstin)}</PARTYGSTIN>
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>{escape(data.seller_name)}</LEDGERNAME>
+                            <GSTCLASS/>
+                            <ISDEEMEDPOSITIVE>Yes</ISDEEMEDPOSITIVE>
+                            <AMOUNT>{data.total_amount:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>{tax_entries}
+                        <ALLLEDGERENTRIES.LIST>
+                            <LEDGERNAME>Purchase</LEDGERNAME>
+                            <ISDEEMEDPOSITIVE>No</ISDEEMEDPOSITIVE>
+                            <AMOUNT>-{data.total_taxable_value:.2f}</AMOUNT>
+                        </ALLLEDGERENTRIES.LIST>
+                    </VOUCHER>"""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<ENVELOPE>
+    <HEADER>
+        <TALLYREQUEST>Import Data</TALLYREQUEST>
+    </HEADER>
+    <BODY>
+        <IMPORTDATA>
+            <REQUESTDESC>
+                <REPORTNAME>Vouchers</REPORTNAME>
+            </REQUESTDESC>
+            <REQUESTDATA>
+                <TALLYMESSAGE xmlns:UDF="TallyUDF">{vouchers}
+                </TALLYMESSAGE>
+            </REQUESTDATA>
+        </IMPORTDATA>
+    </BODY>
+</ENVELOPE>"""
+
+
+class CountingSink:
+    """Stands in for a socket/file: counts bytes, keeps nothing."""
+
+    def __init__(self):
+        self.chars = 0
+
+    def write(self, text: str):
+        self.chars += len(text)
+
+
+def _measure(fn) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def _stream(records: list[dict], sink):
+    for text in iter_record_export(records, "xml"):
+        sink.write(text)
+
+
+def main():
+    get_settings().heavy_stage_executor = "inline"
+    print(f"{'vouchers':>9} | {'legacy ms':>10} {'legacy peak':>12} | {'stream ms':>10} {'stream peak':>12}")
+    for n in SIZES:
+        invoices = [_sample_invoice(i) for i in range(n)]
+        records = [data.model_dump() for data in invoices]
+        legacy_time, legacy_peak = _measure(lambda: legacy_tally_xml(invoices))
+        writer_time, writer_peak = _measure(lambda: _stream(records, CountingSink()))
+        print(
+            f"{n:>9} | {legacy_time * 1000:>10.2f} {legacy_peak / 1024:>10.0f}KB"
+            f" | {writer_time * 1000:>10.2f} {writer_peak / 1024:>10.0f}KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
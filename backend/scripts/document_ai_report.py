@@ -0,0 +1,66 @@
+"""
+Measure what Document AI request shaping saves.
+
+Sends each PDF twice: once as a bare ProcessRequest (the full Document, as
+before) and once shaped by the DOCUMENT_AI_* settings (field mask, OCR
+options, page selection). Reports response size, flattening time and call
+latency for both. Needs Google credentials in .env:
+    python -m scripts.document_ai_report invoices/*.pdf [--first 2 --last 1]
+
+Usage (from backend/).
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from google.cloud import documentai_v1 as documentai
+
+from app.config import get_settings
+from app.services.ocr_service import build_process_request, count_pdf_pages, flatten_document, select_document_ai_pages
+
+
+def _measure(client, request) -> tuple[int, float, float]:
+    started = time.perf_counter()
+    result = client.process_document(request=request)
+    latency_ms = (time.perf_counter() - started) * 1000
+    document_bytes = documentai.Document.serialize(result.document)
+    started = time.perf_counter()
+    flatten_document(document_bytes)
+    return len(document_bytes), (time.perf_counter() - started) * 1000, latency_ms
+
+
+async def report(paths: list[Path], first: int, last: int):
+    client = documentai.DocumentProcessorServiceClient()
+    saved_total = full_total = 0
+    for path in paths:
+        pdf_bytes = path.read_bytes()
+        pages = select_document_ai_pages(count_pdf_pages(pdf_bytes), first, last)
+        full = await asyncio.to_thread(_measure, client, build_process_request(pdf_bytes, shaped=False))
+        shaped = await asyncio.to_thread(_measure, client, build_process_request(pdf_bytes, pages))
+        full_total += full[0]
+        saved_total += full[0] - shaped[0]
+        print(
+            f"{path.name:<40} {full[0] / 1024:9.0f} KB -> {shaped[0] / 1024:9.0f} KB  "
+            f"parse {full[1]:6.1f} -> {shaped[1]:6.1f} ms  call {full[2]:7.0f} -> {shaped[2]:7.0f} ms"
+        )
+    if paths:
+        print(
+            f"{'saved per call':<40} {saved_total / len(paths) / 1024:9.0f} KB "
+            f"({100 * saved_total / max(1, full_total):.0f}% of the full response)"
+        )
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", type=Path, help="PDF files to send")
+    parser.add_argument("--first", type=int, default=settings.document_ai_first_pages, help="Leading pages to read")
+    parser.add_argument("--last", type=int, default=settings.document_ai_last_pages, help="Trailing pages to read")
+    args = parser.parse_args()
+
+    asyncio.run(report(args.pdfs, args.first, args.last))
+
+
+if __name__ == "__main__":
+    main()
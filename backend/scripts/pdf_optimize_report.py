@@ -0,0 +1,65 @@
+"""
+Report what PDF pre-optimization saves before OCR.
+
+For each PDF: original and optimized size, pages dropped, images downsampled
+and the time optimization took. With --ocr, both versions are also sent to
+Document AI (needs Google credentials in .env) and the OCR latencies compared:
+    python -m scripts.pdf_optimize_report invoices/*.pdf [--ocr] [--dpi 300]
+
+Usage (from backend/).
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+from app.config import get_settings
+from app.services.ocr_service import extract_text_with_document_ai
+from app.services.pdf_optimize_service import optimize_pdf
+
+
+async def _ocr_ms(pdf_bytes: bytes) -> float:
+    started = time.perf_counter()
+    await extract_text_with_document_ai(pdf_bytes)
+    return (time.perf_counter() - started) * 1000
+
+
+async def report(paths: list[Path], target_dpi: int, blank_ink_ratio: float, ocr: bool):
+    total_before = total_after = 0
+    for path in paths:
+        original = path.read_bytes()
+        started = time.perf_counter()
+        result = optimize_pdf(original, target_dpi, blank_ink_ratio)
+        optimize_ms = (time.perf_counter() - started) * 1000
+        total_before += result.original_size
+        total_after += result.optimized_size
+
+        line = (
+            f"{path.name:<40} {result.original_size / 1024:9.0f} KB -> {result.optimized_size / 1024:9.0f} KB  "
+            f"-{result.dropped_pages} pages  {result.images_downsampled} images  {optimize_ms:7.0f} ms"
+        )
+        if ocr:
+            before_ms = await _ocr_ms(original)
+            after_ms = before_ms if result.content is original else await _ocr_ms(result.content)
+            line += f"  OCR {before_ms:7.0f} ms -> {after_ms:7.0f} ms"
+        print(line)
+
+    if paths:
+        saved = 100 * (1 - total_after / max(1, total_before))
+        print(f"{'total':<40} {total_before / 1024:9.0f} KB -> {total_after / 1024:9.0f} KB  ({saved:.0f}% smaller)")
+
+
+def main():
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="+", type=Path, help="PDF files to optimize")
+    parser.add_argument("--ocr", action="store_true", help="Also time Document AI on both versions")
+    parser.add_argument("--dpi", type=int, default=settings.ocr_target_dpi, help="Target image DPI")
+    parser.add_argument("--ink-ratio", type=float, default=settings.blank_page_ink_ratio, help="Blank page threshold")
+    args = parser.parse_args()
+
+    asyncio.run(report(args.pdfs, args.dpi, args.ink_ratio, args.ocr))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+Re-run GST validation over stored invoices after changing TOLERANCE or rules.
+
+Usage (from backend/):
+    python -m scripts.revalidate_invoices [--user-id UUID] [--chunk-size 1000] [--dry-run]
+"""
+import argparse
+
+from app.services.batch_validation import revalidate_invoices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", default=None, help="Only re-check this user's invoices")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Invoices loaded per chunk")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing them")
+    args = parser.parse_args()
+
+    stats = revalidate_invoices(args.user_id, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    print(f"checked={stats['checked']} changed={stats['changed']} failing={stats['failing']}")
+
+
+if __name__ == "__main__":
+    main()
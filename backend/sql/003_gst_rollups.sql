@@ -0,0 +1,211 @@
+-- ============================================================
+-- Creative Invoice - Precomputed GST rollups
+-- Run this in Supabase SQL Editor after 002_subscriptions.sql
+-- ============================================================
+
+-- Invoice-level totals per user, bill month and seller
+CREATE TABLE gst_invoice_rollups (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    period_month DATE NOT NULL,  -- first day of the bill_date month
+    seller_gstin VARCHAR(15) NOT NULL DEFAULT '',
+    invoice_count INTEGER NOT NULL DEFAULT 0,
+    total_taxable_value DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_cgst DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_sgst DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_igst DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, period_month, seller_gstin)
+);
+
+-- Tax breakup totals per user, bill month, seller and GST rate
+CREATE TABLE gst_rate_rollups (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    period_month DATE NOT NULL,
+    seller_gstin VARCHAR(15) NOT NULL DEFAULT '',
+    rate DECIMAL(5, 2) NOT NULL,
+    line_count INTEGER NOT NULL DEFAULT 0,  -- tax breakup lines at this rate
+    taxable_value DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    cgst_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    sgst_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    igst_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    total_with_tax DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, period_month, seller_gstin, rate)
+);
+
+-- ============================================================
+-- Incremental maintenance: adds (p_sign = 1) or removes (p_sign = -1) one
+-- invoice's totals. Called by the invoices trigger below.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION apply_invoice_rollup(
+    p_user_id UUID,
+    p_period_month DATE,
+    p_seller_gstin VARCHAR,
+    p_sign INTEGER,
+    p_taxable NUMERIC,
+    p_cgst NUMERIC,
+    p_sgst NUMERIC,
+    p_igst NUMERIC,
+    p_amount NUMERIC,
+    p_breakup JSONB
+) RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    item JSONB;
+BEGIN
+    INSERT INTO gst_invoice_rollups AS r (
+        user_id, period_month, seller_gstin, invoice_count,
+        total_taxable_value, total_cgst, total_sgst, total_igst, total_amount
+    )
+    VALUES (
+        p_user_id, p_period_month, COALESCE(p_seller_gstin, ''), p_sign,
+        p_sign * p_taxable, p_sign * p_cgst, p_sign * p_sgst, p_sign * p_igst, p_sign * p_amount
+    )
+    ON CONFLICT (user_id, period_month, seller_gstin) DO UPDATE SET
+        invoice_count = r.invoice_count + EXCLUDED.invoice_count,
+        total_taxable_value = r.total_taxable_value + EXCLUDED.total_taxable_value,
+        total_cgst = r.total_cgst + EXCLUDED.total_cgst,
+        total_sgst = r.total_sgst + EXCLUDED.total_sgst,
+        total_igst = r.total_igst + EXCLUDED.total_igst,
+        total_amount = r.total_amount + EXCLUDED.total_amount,
+        updated_at = NOW();
+
+    FOR item IN SELECT * FROM jsonb_array_elements(COALESCE(p_breakup, '[]'::jsonb)) LOOP
+        INSERT INTO gst_rate_rollups AS r (
+            user_id, period_month, seller_gstin, rate, line_count,
+            taxable_value, cgst_amount, sgst_amount, igst_amount, total_with_tax
+        )
+        VALUES (
+            p_user_id, p_period_month, COALESCE(p_seller_gstin, ''), (item->>'rate')::NUMERIC, p_sign,
+            p_sign * COALESCE((item->>'taxable_value')::NUMERIC, 0),
+            p_sign * COALESCE((item->>'cgst_amount')::NUMERIC, 0),
+            p_sign * COALESCE((item->>'sgst_amount')::NUMERIC, 0),
+            p_sign * COALESCE((item->>'igst_amount')::NUMERIC, 0),
+            p_sign * COALESCE((item->>'total_with_tax')::NUMERIC, 0)
+        )
+        ON CONFLICT (user_id, period_month, seller_gstin, rate) DO UPDATE SET
+            line_count = r.line_count + EXCLUDED.line_count,
+            taxable_value = r.taxable_value + EXCLUDED.taxable_value,
+            cgst_amount = r.cgst_amount + EXCLUDED.cgst_amount,
+            sgst_amount = r.sgst_amount + EXCLUDED.sgst_amount,
+            igst_amount = r.igst_amount + EXCLUDED.igst_amount,
+            total_with_tax = r.total_with_tax + EXCLUDED.total_with_tax,
+            updated_at = NOW();
+    END LOOP;
+END;
+$$;
+
+-- ============================================================
+-- Keep rollups in step with invoices: the delta is applied inside the
+-- statement that completes, edits or soft-deletes the invoice, so both
+-- commit (or roll back) together. Hard deletes are not tracked; the app
+-- only soft-deletes, and rebuild_gst_rollups() covers anything else.
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION invoices_gst_rollup_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    old_counted BOOLEAN := TG_OP = 'UPDATE'
+        AND OLD.status = 'completed' AND OLD.deleted_at IS NULL AND OLD.bill_date IS NOT NULL;
+    new_counted BOOLEAN := NEW.status = 'completed' AND NEW.deleted_at IS NULL AND NEW.bill_date IS NOT NULL;
+BEGIN
+    IF old_counted AND new_counted
+        AND (OLD.user_id, OLD.bill_date, OLD.seller_gstin, OLD.total_taxable_value, OLD.total_cgst,
+             OLD.total_sgst, OLD.total_igst, OLD.total_amount, OLD.tax_breakup)
+        IS NOT DISTINCT FROM
+            (NEW.user_id, NEW.bill_date, NEW.seller_gstin, NEW.total_taxable_value, NEW.total_cgst,
+             NEW.total_sgst, NEW.total_igst, NEW.total_amount, NEW.tax_breakup) THEN
+        RETURN NULL;  -- nothing the rollups depend on changed
+    END IF;
+
+    IF old_counted THEN
+        PERFORM apply_invoice_rollup(
+            OLD.user_id, date_trunc('month', OLD.bill_date)::DATE, OLD.seller_gstin, -1,
+            COALESCE(OLD.total_taxable_value, 0), COALESCE(OLD.total_cgst, 0), COALESCE(OLD.total_sgst, 0),
+            COALESCE(OLD.total_igst, 0), COALESCE(OLD.total_amount, 0), OLD.tax_breakup
+        );
+    END IF;
+    IF new_counted THEN
+        PERFORM apply_invoice_rollup(
+            NEW.user_id, date_trunc('month', NEW.bill_date)::DATE, NEW.seller_gstin, 1,
+            COALESCE(NEW.total_taxable_value, 0), COALESCE(NEW.total_cgst, 0), COALESCE(NEW.total_sgst, 0),
+            COALESCE(NEW.total_igst, 0), COALESCE(NEW.total_amount, 0), NEW.tax_breakup
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER invoices_gst_rollup
+    AFTER INSERT OR UPDATE ON invoices
+    FOR EACH ROW EXECUTE FUNCTION invoices_gst_rollup_trigger();
+
+-- ============================================================
+-- Full rebuild from invoices (initial backfill, or repair after drift)
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION rebuild_gst_rollups() RETURNS VOID
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM gst_invoice_rollups;
+    DELETE FROM gst_rate_rollups;
+
+    INSERT INTO gst_invoice_rollups (
+        user_id, period_month, seller_gstin, invoice_count,
+        total_taxable_value, total_cgst, total_sgst, total_igst, total_amount
+    )
+    SELECT
+        user_id, date_trunc('month', bill_date)::DATE, COALESCE(seller_gstin, ''), COUNT(*),
+        COALESCE(SUM(total_taxable_value), 0), COALESCE(SUM(total_cgst), 0),
+        COALESCE(SUM(total_sgst), 0), COALESCE(SUM(total_igst), 0), COALESCE(SUM(total_amount), 0)
+    FROM invoices
+    WHERE status = 'completed' AND deleted_at IS NULL AND bill_date IS NOT NULL
+    GROUP BY 1, 2, 3;
+
+    INSERT INTO gst_rate_rollups (
+        user_id, period_month, seller_gstin, rate, line_count,
+        taxable_value, cgst_amount, sgst_amount, igst_amount, total_with_tax
+    )
+    SELECT
+        i.user_id, date_trunc('month', i.bill_date)::DATE, COALESCE(i.seller_gstin, ''),
+        (item->>'rate')::NUMERIC, COUNT(*),
+        SUM(COALESCE((item->>'taxable_value')::NUMERIC, 0)),
+        SUM(COALESCE((item->>'cgst_amount')::NUMERIC, 0)),
+        SUM(COALESCE((item->>'sgst_amount')::NUMERIC, 0)),
+        SUM(COALESCE((item->>'igst_amount')::NUMERIC, 0)),
+        SUM(COALESCE((item->>'total_with_tax')::NUMERIC, 0))
+    FROM invoices i, jsonb_array_elements(COALESCE(i.tax_breakup, '[]'::jsonb)) AS item
+    WHERE i.status = 'completed' AND i.deleted_at IS NULL AND i.bill_date IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+END;
+$$;
+
+SELECT rebuild_gst_rollups();
+
+-- Rollups change only through the invoices trigger (or a rebuild)
+REVOKE EXECUTE ON FUNCTION apply_invoice_rollup FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION invoices_gst_rollup_trigger FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION rebuild_gst_rollups FROM PUBLIC, anon, authenticated;
+
+-- ============================================================
+-- RLS: users can read their own rollups; writes come from the invoices
+-- trigger
+-- ============================================================
+
+ALTER TABLE gst_invoice_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE gst_rate_rollups ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own invoice rollups"
+    ON gst_invoice_rollups FOR SELECT
+    USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view own rate rollups"
+    ON gst_rate_rollups FOR SELECT
+    USING (auth.uid() = user_id);
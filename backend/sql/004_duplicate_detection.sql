@@ -0,0 +1,43 @@
+-- ============================================================
+-- Creative Invoice - Duplicate invoice detection
+-- Run this in Supabase SQL Editor after 003_gst_rollups.sql
+-- ============================================================
+
+-- Normalized "SELLER_GSTIN|BILLNO|YYYY-MM-DD" of completed invoices, set by the
+-- backend (app/services/dedupe_service.py). Bill numbers are uppercased with
+-- separators removed.
+ALTER TABLE invoices ADD COLUMN dedupe_key VARCHAR(150);
+
+-- For status = 'duplicate': the earlier invoice this upload repeats
+ALTER TABLE invoices ADD COLUMN duplicate_of UUID REFERENCES invoices(id) ON DELETE SET NULL;
+
+-- Backfill existing completed invoices; where duplicates already exist,
+-- only the oldest keeps the key
+UPDATE invoices i
+SET dedupe_key = k.dedupe_key
+FROM (
+    SELECT
+        id,
+        dedupe_key,
+        ROW_NUMBER() OVER (PARTITION BY user_id, dedupe_key ORDER BY created_at) AS rn
+    FROM (
+        SELECT
+            id, user_id, created_at,
+            UPPER(TRIM(seller_gstin)) || '|'
+                || REGEXP_REPLACE(UPPER(bill_no), '[^A-Z0-9]', '', 'g') || '|'
+                || TO_CHAR(bill_date, 'YYYY-MM-DD') AS dedupe_key
+        FROM invoices
+        WHERE status = 'completed'
+          AND deleted_at IS NULL
+          AND TRIM(seller_gstin) <> ''
+          AND REGEXP_REPLACE(UPPER(bill_no), '[^A-Z0-9]', '', 'g') <> ''
+          AND bill_date IS NOT NULL
+    ) keyed
+) k
+WHERE i.id = k.id AND k.rn = 1;
+
+-- One live invoice per (user, seller GSTIN, bill number, bill date).
+-- Also serves the pre-extraction duplicate lookup.
+CREATE UNIQUE INDEX idx_invoices_dedupe_key
+    ON invoices(user_id, dedupe_key)
+    WHERE dedupe_key IS NOT NULL AND deleted_at IS NULL;
@@ -0,0 +1,20 @@
+-- ============================================================
+-- Creative Invoice - Near-duplicate detection (MinHash signatures)
+-- Run this in Supabase SQL Editor after 004_duplicate_detection.sql
+-- ============================================================
+
+-- One MinHash signature (128 values, each below 2^32) of the OCR text per
+-- completed invoice. Kept out of the invoices table so list/detail/export
+-- queries don't carry it. Invoices processed before this migration have no
+-- signature (OCR text is not stored) and are never matched as near-duplicates.
+CREATE TABLE invoice_signatures (
+    invoice_id UUID PRIMARY KEY REFERENCES invoices(id) ON DELETE CASCADE,
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+    minhash BIGINT[] NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_invoice_signatures_user_id ON invoice_signatures(user_id, invoice_id);
+
+-- Backend (service role) only
+ALTER TABLE invoice_signatures ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,15 @@
+-- ============================================================
+-- Creative Invoice - Multi-invoice PDF splitting
+-- Run this in Supabase SQL Editor after 005_invoice_signatures.sql
+-- ============================================================
+
+-- A PDF holding several invoices is kept as one parent row (status = 'split')
+-- plus one child row per invoice found in it. Children share the parent's
+-- file_path and record which pages (1-based, inclusive) they came from.
+ALTER TABLE invoices ADD COLUMN parent_invoice_id UUID REFERENCES invoices(id) ON DELETE CASCADE;
+ALTER TABLE invoices ADD COLUMN page_start INTEGER;
+ALTER TABLE invoices ADD COLUMN page_end INTEGER;
+
+CREATE INDEX idx_invoices_parent_invoice_id
+    ON invoices(parent_invoice_id)
+    WHERE parent_invoice_id IS NOT NULL;
@@ -0,0 +1,29 @@
+-- ============================================================
+-- Creative Invoice - Bulk validation write-back
+-- Run this in Supabase SQL Editor after 006_invoice_splits.sql
+-- ============================================================
+
+-- Writes back validation results for many invoices in one round trip.
+-- p_rows is a JSON array of {id, validation_passed, validation_errors}.
+-- Only existing, non-deleted rows are updated; nothing is ever inserted.
+CREATE OR REPLACE FUNCTION update_invoice_validation(p_rows JSONB) RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    updated INTEGER;
+BEGIN
+    UPDATE invoices i SET
+        validation_passed = v.validation_passed,
+        validation_errors = v.validation_errors,
+        updated_at = NOW()
+    FROM jsonb_to_recordset(p_rows) AS v(id UUID, validation_passed BOOLEAN, validation_errors JSONB)
+    WHERE i.id = v.id AND i.deleted_at IS NULL;
+
+    GET DIAGNOSTICS updated = ROW_COUNT;
+    RETURN updated;
+END;
+$$;
+
+-- Only the backend (service role) may call it
+REVOKE EXECUTE ON FUNCTION update_invoice_validation FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION update_invoice_validation TO service_role;
@@ -0,0 +1,77 @@
+"""Tests for analytics_export - columnar Parquet invoices + tax_breakup tables."""
+import json
+import os
+import zipfile
+
+import pyarrow.parquet as pq
+
+from app.services import analytics_export
+from app.services.analytics_export import write_parquet_tables, write_parquet_archive
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
+ALL_INVOICES = ["bhavani_auto.json", "brothers_battery.json", "spareway_associates.json"]
+
+
+def _rows():
+    for i, name in enumerate(ALL_INVOICES):
+        with open(os.path.join(EXPECTED_DIR, name)) as f:
+            record = json.load(f)
+        yield {**record, "id": f"inv-{i}", "created_at": "2025-09-02T10:15:00.123456+00:00"}
+
+
+def _expected_breakup_rows() -> int:
+    total = 0
+    for name in ALL_INVOICES:
+        with open(os.path.join(EXPECTED_DIR, name)) as f:
+            total += len(json.load(f)["tax_breakup"])
+    return total
+
+
+class TestParquetTables:
+    def test_two_tables_written(self, tmp_path):
+        invoices_path = tmp_path / "invoices.parquet"
+        breakup_path = tmp_path / "tax_breakup.parquet"
+        counts = write_parquet_tables(_rows(), str(invoices_path), str(breakup_path))
+
+        invoices = pq.read_table(invoices_path)
+        breakup = pq.read_table(breakup_path)
+        assert counts == (len(ALL_INVOICES), _expected_breakup_rows())
+        assert invoices.num_rows == len(ALL_INVOICES)
+        assert breakup.num_rows == _expected_breakup_rows()
+
+    def test_typed_columns(self, tmp_path):
+        invoices_path = tmp_path / "invoices.parquet"
+        write_parquet_tables(_rows(), str(invoices_path), str(tmp_path / "b.parquet"))
+        invoices = pq.read_table(invoices_path).to_pylist()
+
+        first = invoices[0]
+        assert first["seller_gstin"] == "32AAXFB6381L1ZU"
+        assert str(first["bill_date"]) == "2025-09-01"
+        assert first["total_amount"] == 5676.00
+        assert first["created_at"].year == 2025
+
+    def test_breakup_exploded_per_rate(self, tmp_path):
+        breakup_path = tmp_path / "tax_breakup.parquet"
+        write_parquet_tables(_rows(), str(tmp_path / "i.parquet"), str(breakup_path))
+        rows = pq.read_table(breakup_path).to_pylist()
+
+        bhavani_rates = sorted(r["rate"] for r in rows if r["invoice_id"] == "inv-0")
+        assert bhavani_rates == [18.0, 28.0]
+
+    def test_written_in_record_batches(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(analytics_export, "BATCH_SIZE", 2)
+        invoices_path = tmp_path / "invoices.parquet"
+        write_parquet_tables(_rows(), str(invoices_path), str(tmp_path / "b.parquet"))
+        assert pq.ParquetFile(invoices_path).metadata.num_rows == len(ALL_INVOICES)
+        assert pq.ParquetFile(invoices_path).metadata.num_row_groups == 2
+
+    def test_empty_input(self, tmp_path):
+        invoices_path = tmp_path / "invoices.parquet"
+        assert write_parquet_tables([], str(invoices_path), str(tmp_path / "b.parquet")) == (0, 0)
+        assert pq.read_table(invoices_path).num_rows == 0
+
+    def test_archive_contains_both_tables(self, tmp_path):
+        archive_path = tmp_path / "export.zip"
+        write_parquet_archive(_rows(), str(archive_path), str(tmp_path))
+        with zipfile.ZipFile(archive_path) as archive:
+            assert sorted(archive.namelist()) == ["invoices.parquet", "tax_breakup.parquet"]
@@ -0,0 +1,102 @@
+"""Parity tests: vectorized batch validation vs. validate_invoice_data."""
+import json
+import os
+import random
+
+import pytest
+
+from app.models.schemas import InvoiceData, TaxBreakup
+from app.services.batch_validation import screen_invoices, validate_invoices_batch
+from app.services.validation_service import TOLERANCE, validate_invoice_data
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
+ALL_INVOICES = ["bhavani_auto.json", "brothers_battery.json", "spareway_associates.json"]
+
+
+def _load(filename: str) -> InvoiceData:
+    with open(os.path.join(EXPECTED_DIR, filename)) as f:
+        return InvoiceData(**json.load(f))
+
+
+def _random_invoice(rng: random.Random) -> InvoiceData:
+    """Mostly-valid invoices with a sprinkling of every kind of defect."""
+    inter_state = rng.random() < 0.3
+    breakup = []
+    for rate in rng.sample([5, 12, 18, 28], rng.randint(0, 3)):
+        taxable = round(rng.uniform(10, 50_000), 2)
+        tax = round(taxable * rate / 100, 2)
+        if inter_state:
+            item = TaxBreakup(rate=rate, taxable_value=taxable, igst_amount=tax, total_with_tax=taxable + tax)
+        else:
+            half = round(tax / 2, 2)
+            item = TaxBreakup(
+                rate=rate, taxable_value=taxable, cgst_amount=half, sgst_amount=half,
+                total_with_tax=taxable + 2 * half,
+            )
+        breakup.append(item)
+
+    taxable = sum(i.taxable_value for i in breakup) if breakup else round(rng.uniform(10, 50_000), 2)
+    cgst = sum(i.cgst_amount for i in breakup)
+    sgst = sum(i.sgst_amount for i in breakup)
+    igst = sum(i.igst_amount for i in breakup)
+    amount = taxable + cgst + sgst + igst
+
+    defect = rng.random()
+    if defect < 0.05:
+        amount += rng.choice([TOLERANCE, TOLERANCE + 0.01, TOLERANCE - 0.01, 5.0])
+    elif defect < 0.08:
+        sgst += 0.5
+    elif defect < 0.10:
+        igst += 10
+    elif defect < 0.12 and breakup:
+        breakup[0].total_with_tax += 1
+    elif defect < 0.14:
+        amount = 0
+    elif defect < 0.16:
+        taxable += rng.choice([TOLERANCE, TOLERANCE + 0.001])
+
+    return InvoiceData(
+        seller_name=rng.choice(["Bhavani Auto", ""]) if defect < 0.18 else "Bhavani Auto",
+        seller_gstin=rng.choice(["32AAXFB6381L1ZU", "32AAXFB6381"]) if defect > 0.97 else "32AAXFB6381L1ZU",
+        buyer_gstin=rng.choice([None, "32BSBPA3464Q1ZQ", "BAD"]) if defect > 0.95 else None,
+        bill_no="B-1",
+        bill_date=rng.choice(["2025-09-01", "01-Sept-2025"]) if defect > 0.96 else "2025-09-01",
+        tax_breakup=breakup,
+        total_taxable_value=taxable,
+        total_cgst=cgst,
+        total_sgst=sgst,
+        total_igst=igst,
+        total_amount=amount,
+    )
+
+
+class TestParity:
+    def test_reference_invoices(self):
+        invoices = [_load(name) for name in ALL_INVOICES]
+        assert validate_invoices_batch(invoices) == [validate_invoice_data(d) for d in invoices]
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_random_invoices(self, seed):
+        rng = random.Random(seed)
+        invoices = [_random_invoice(rng) for _ in range(2000)]
+        batch = validate_invoices_batch(invoices)
+        scalar = [validate_invoice_data(d) for d in invoices]
+        assert batch == scalar
+        # The sample must actually exercise both paths
+        assert any(ok for ok, _ in scalar) and not all(ok for ok, _ in scalar)
+
+    def test_empty_batch(self):
+        assert validate_invoices_batch([]) == []
+
+
+class TestScreen:
+    def test_clean_invoices_skip_scalar_path(self):
+        invoices = [_load(name) for name in ALL_INVOICES]
+        assert screen_invoices(invoices).all()
+
+    def test_screen_never_clears_an_invalid_invoice(self):
+        rng = random.Random(42)
+        invoices = [_random_invoice(rng) for _ in range(2000)]
+        for data, clean in zip(invoices, screen_invoices(invoices)):
+            if clean:
+                assert validate_invoice_data(data) == (True, [])
@@ -0,0 +1,33 @@
+"""Tests for the in-process TTL/LRU cache."""
+from app.utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_set_and_get(self):
+        cache = TTLCache()
+        cache.set("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("missing", "default") == "default"
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert len(cache) == 2
+
+    def test_expired_entries_are_misses(self):
+        cache = TTLCache(ttl_seconds=-1)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+
+    def test_delete_where(self):
+        cache = TTLCache()
+        cache.set(("inv-1", "json"), "x")
+        cache.set(("inv-1", "csv"), "y")
+        cache.set(("inv-2", "json"), "z")
+        assert cache.delete_where(lambda key: key[0] == "inv-1") == 2
+        assert cache.get(("inv-2", "json")) == "z"
@@ -0,0 +1,69 @@
+"""Tests for dedupe_service - normalized duplicate keys from extracted data and raw OCR text."""
+import json
+import os
+
+from app.models.schemas import InvoiceData
+from app.services.dedupe_service import make_dedupe_key, normalize_bill_no, scan_dedupe_key
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
+
+OCR_TEXT = """BHAVANI AUTO DISTRIBUTORS
+GSTIN: 32AAXFB6381L1ZU
+TAX INVOICE
+Bill No. : EBW2526006189          Date: 01/09/2025
+To: SHREE MOTORS
+GSTIN/UIN: 32BSBPA3464Q1ZQ
+"""
+
+
+def _load(filename: str) -> InvoiceData:
+    with open(os.path.join(EXPECTED_DIR, filename)) as f:
+        return InvoiceData(**json.load(f))
+
+
+class TestNormalization:
+    def test_bill_no_ignores_case_and_separators(self):
+        assert normalize_bill_no("ebw/25-26 006189") == normalize_bill_no("EBW2526006189")
+
+    def test_key_layout(self):
+        assert make_dedupe_key("32aaxfb6381l1zu", "EBW-1", "2025-09-01") == "32AAXFB6381L1ZU|EBW1|2025-09-01"
+
+    def test_missing_part_gives_no_key(self):
+        assert make_dedupe_key("32AAXFB6381L1ZU", None, "2025-09-01") is None
+        assert make_dedupe_key("32AAXFB6381L1ZU", "/-", "2025-09-01") is None
+
+
+class TestOCRScan:
+    def test_scan_matches_extracted_key(self):
+        data = _load("bhavani_auto.json")
+        extracted = make_dedupe_key(data.seller_gstin, data.bill_no, data.bill_date)
+        assert scan_dedupe_key(OCR_TEXT, buyer_gstin_hint=data.buyer_gstin) == extracted
+
+    def test_two_gstins_without_hint_are_ambiguous(self):
+        assert scan_dedupe_key(OCR_TEXT) is None
+
+    def test_month_name_dates(self):
+        text = "GSTIN 32AAXFB6381L1ZU\nInvoice No: INV/77\nDated 5-Sep-25"
+        assert scan_dedupe_key(text) == "32AAXFB6381L1ZU|INV77|2025-09-05"
+
+    def test_same_value_printed_twice_is_not_ambiguous(self):
+        text = "GSTIN 32AAXFB6381L1ZU\nInvoice No: INV/77  Date: 05/09/2025\nRef Invoice No INV-77 dated 05-09-2025"
+        assert scan_dedupe_key(text) == "32AAXFB6381L1ZU|INV77|2025-09-05"
+
+    def test_credit_note_quoting_an_invoice_is_not_a_duplicate_key(self):
+        # The referenced invoice's number and date must not make the credit note
+        # look like a repeat of that invoice
+        text = (
+            "BHAVANI AUTO DISTRIBUTORS\nGSTIN: 32AAXFB6381L1ZU\nCREDIT NOTE\n"
+            "Credit Note No: CN/2526/014   Date: 15/09/2025\n"
+            "Against Invoice No EBW2526006189 dt 01/09/2025\n"
+        )
+        assert scan_dedupe_key(text) is None
+
+    def test_due_date_makes_the_date_ambiguous(self):
+        text = "GSTIN 32AAXFB6381L1ZU\nInvoice No: INV/77  Date: 05/09/2025\nDue Date: 05/10/2025"
+        assert scan_dedupe_key(text) is None
+
+    def test_incomplete_text_gives_no_key(self):
+        assert scan_dedupe_key("GSTIN 32AAXFB6381L1ZU\nDate 01/09/2025") is None
+        assert scan_dedupe_key("") is None
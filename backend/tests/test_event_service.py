@@ -0,0 +1,110 @@
+"""Tests for event_service - in-process pub/sub and SSE framing."""
+import asyncio
+import json
+
+from app.services import event_service
+from app.services.event_service import (
+    subscribe,
+    unsubscribe,
+    publish,
+    format_sse,
+    add_waiter,
+    remove_waiter,
+    notify_done,
+    wait_until_done,
+)
+
+
+class TestPubSub:
+    def test_publish_reaches_subscriber(self):
+        queue = subscribe("user-1")
+        try:
+            reached = publish("user-1", {"invoice_id": "inv-1", "status": "completed"})
+            assert reached == 1
+            assert queue.get_nowait() == {"invoice_id": "inv-1", "status": "completed"}
+        finally:
+            unsubscribe("user-1", queue)
+
+    def test_publish_is_scoped_to_user(self):
+        queue = subscribe("user-1")
+        try:
+            assert publish("user-2", {"invoice_id": "inv-2", "status": "failed"}) == 0
+            assert queue.empty()
+        finally:
+            unsubscribe("user-1", queue)
+
+    def test_unsubscribe_cleans_up(self):
+        queue = subscribe("user-3")
+        unsubscribe("user-3", queue)
+        assert "user-3" not in event_service._subscribers
+        assert publish("user-3", {"status": "completed"}) == 0
+
+    def test_full_queue_drops_oldest(self):
+        queue = subscribe("user-4")
+        try:
+            for i in range(event_service.QUEUE_MAXSIZE + 5):
+                publish("user-4", {"seq": i})
+            assert queue.qsize() == event_service.QUEUE_MAXSIZE
+            assert queue.get_nowait() == {"seq": 5}
+        finally:
+            unsubscribe("user-4", queue)
+
+    def test_subscriber_awaits_event(self):
+        async def scenario():
+            queue = subscribe("user-5")
+            try:
+                asyncio.get_running_loop().call_soon(
+                    publish, "user-5", {"invoice_id": "inv-5", "status": "processing"}
+                )
+                return await asyncio.wait_for(queue.get(), timeout=1)
+            finally:
+                unsubscribe("user-5", queue)
+
+        assert asyncio.run(scenario())["status"] == "processing"
+
+
+class TestCompletionWaiters:
+    def test_notify_wakes_waiter(self):
+        async def scenario():
+            waiter = add_waiter("inv-10")
+            try:
+                asyncio.get_running_loop().call_soon(notify_done, "inv-10")
+                return await wait_until_done(waiter, timeout=1)
+            finally:
+                remove_waiter("inv-10", waiter)
+
+        assert asyncio.run(scenario()) is True
+
+    def test_timeout_returns_false(self):
+        async def scenario():
+            waiter = add_waiter("inv-11")
+            try:
+                return await wait_until_done(waiter, timeout=0.01)
+            finally:
+                remove_waiter("inv-11", waiter)
+
+        assert asyncio.run(scenario()) is False
+
+    def test_notify_only_matching_invoice(self):
+        async def scenario():
+            waiter = add_waiter("inv-12")
+            try:
+                notify_done("inv-other")
+                return waiter.is_set()
+            finally:
+                remove_waiter("inv-12", waiter)
+
+        assert asyncio.run(scenario()) is False
+        assert "inv-12" not in event_service._waiters
+
+
+class TestSSEFormat:
+    def test_frame_layout(self):
+        frame = format_sse({"invoice_id": "inv-1", "status": "completed"})
+        assert frame.startswith("event: status\ndata: ")
+        assert frame.endswith("\n\n")
+        payload = frame.split("data: ", 1)[1].strip()
+        assert json.loads(payload) == {"invoice_id": "inv-1", "status": "completed"}
+
+    def test_custom_event_name(self):
+        assert format_sse({}, event_name="ping").startswith("event: ping\n")
@@ -0,0 +1,124 @@
+"""Tests for export_service - background export jobs (storage and DB stubbed)."""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import export_service
+from app.services.export_service import create_export_job, get_export_job, run_export_job
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
+
+
+@pytest.fixture
+def fake_backend(monkeypatch):
+    with open(os.path.join(EXPECTED_DIR, "bhavani_auto.json")) as f:
+        record = json.load(f)
+    uploads = {}
+
+    def fake_iter_invoices(user_id, **filters):
+        for i in range(3):
+            yield dict(record, id=f"inv-{i}")
+
+    def fake_upload(user_id, job_id, local_path, extension, content_type):
+        with open(local_path) as f:
+            uploads[job_id] = f.read()
+        return f"{user_id}/exports/{job_id}.{extension}"
+
+    monkeypatch.setattr(export_service, "iter_invoices", fake_iter_invoices)
+    monkeypatch.setattr(export_service, "count_invoices", lambda user_id, **filters: 3)
+    monkeypatch.setattr(export_service, "upload_export", fake_upload)
+    monkeypatch.setattr(export_service, "get_signed_url", lambda path, expires_in: f"https://signed/{path}")
+    return uploads
+
+
+class TestExportJobs:
+    def test_identical_running_request_is_reused(self):
+        job, created = create_export_job("user-reuse", "csv", "2025-04-01", "2025-06-30")
+        again, created_again = create_export_job("user-reuse", "csv", "2025-04-01", "2025-06-30")
+        assert created is True
+        assert created_again is False
+        assert again.id == job.id
+
+    def test_different_range_gets_new_job(self):
+        job, _ = create_export_job("user-range", "csv", "2025-04-01", "2025-06-30")
+        other, created = create_export_job("user-range", "csv", "2025-07-01", "2025-09-30")
+        assert created is True
+        assert other.id != job.id
+
+    def test_unknown_format_rejected(self):
+        with pytest.raises(ValueError):
+            create_export_job("user-bad", "xlsx")
+
+    def test_job_scoped_to_user(self):
+        job, _ = create_export_job("user-owner", "jsonl")
+        assert get_export_job(job.id, "user-owner") is job
+        assert get_export_job(job.id, "someone-else") is None
+
+    def test_run_uploads_file_and_signs_url(self, fake_backend):
+        job, _ = create_export_job("user-run", "xml")
+        run_export_job(job.id)
+
+        assert job.status == "completed"
+        assert job.processed == 3
+        assert job.progress == 1.0
+        assert job.download_url == f"https://signed/user-run/exports/{job.id}.xml"
+        assert fake_backend[job.id].count("<VOUCHER ") == 3
+
+    def test_parquet_job_uploads_zip(self, fake_backend, monkeypatch):
+        archives = {}
+
+        def fake_upload(user_id, job_id, local_path, extension, content_type):
+            archives[job_id] = (extension, content_type, os.path.getsize(local_path))
+            return f"{user_id}/exports/{job_id}.{extension}"
+
+        monkeypatch.setattr(export_service, "upload_export", fake_upload)
+        job, _ = create_export_job("user-parquet", "parquet")
+        run_export_job(job.id)
+
+        assert job.status == "completed", job.error
+        extension, content_type, size = archives[job.id]
+        assert (extension, content_type) == ("zip", "application/zip")
+        assert size > 0
+
+    def test_finished_job_is_not_reused(self, fake_backend):
+        job, _ = create_export_job("user-rerun", "csv")
+        run_export_job(job.id)
+        _, created = create_export_job("user-rerun", "csv")
+        assert created is True
+
+    def test_failure_is_reported(self, fake_backend, monkeypatch):
+        def broken(*args, **kwargs):
+            raise RuntimeError("storage unavailable")
+
+        monkeypatch.setattr(export_service, "upload_export", broken)
+        job, _ = create_export_job("user-fail", "csv")
+        run_export_job(job.id)
+        assert job.status == "failed"
+        assert "storage unavailable" in job.error
+        assert job.finished_at is not None
+
+    def test_pruning_deletes_expired_export_file(self, fake_backend, monkeypatch):
+        deleted = []
+        monkeypatch.setattr(export_service, "delete_export", deleted.append)
+        job, _ = create_export_job("user-prune", "csv")
+        run_export_job(job.id)
+        job.finished_at = datetime.utcnow() - timedelta(days=30)
+
+        create_export_job("user-prune", "jsonl")
+        assert deleted == [f"user-prune/exports/{job.id}.csv"]
+        assert get_export_job(job.id, "user-prune") is None
+
+    def test_pruning_survives_storage_errors(self, fake_backend, monkeypatch):
+        def broken(storage_path):
+            raise RuntimeError("storage unavailable")
+
+        monkeypatch.setattr(export_service, "delete_export", broken)
+        job, _ = create_export_job("user-prune-fail", "csv")
+        run_export_job(job.id)
+        job.finished_at = datetime.utcnow() - timedelta(days=30)
+
+        _, created = create_export_job("user-prune-fail", "csv")
+        assert created is True
+        assert get_export_job(job.id, "user-prune-fail") is None
@@ -1,7 +1,7 @@
 """Tests for utility helpers - PDF validation, hashing."""
 import os
 import pytest
-from app.utils.helpers import validate_pdf_upload, file_hash
+from app.utils.helpers import validate_pdf_upload, file_hash, compute_etag, etag_matches
 
 FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
 
@@ -50,3 +50,30 @@ class TestFileHash:
         h = file_hash(b"test")
         assert len(h) == 64  # SHA-256 hex
         assert all(c in "0123456789abcdef" for c in h)
+
+
+class TestETag:
+    def test_etag_is_quoted(self):
+        etag = compute_etag("inv-1", "completed", "2025-09-01T10:00:00")
+        assert etag.startswith('"') and etag.endswith('"')
+
+    def test_etag_changes_with_parts(self):
+        assert compute_etag("inv-1", "processing") != compute_etag("inv-1", "completed")
+
+    def test_etag_stable(self):
+        assert compute_etag("inv-1", 1) == compute_etag("inv-1", 1)
+
+    def test_matches_exact(self):
+        etag = compute_etag("x")
+        assert etag_matches(etag, etag) is True
+
+    def test_matches_weak_and_list(self):
+        etag = compute_etag("x")
+        assert etag_matches(f'"other", W/{etag}', etag) is True
+
+    def test_matches_wildcard(self):
+        assert etag_matches("*", compute_etag("x")) is True
+
+    def test_no_header(self):
+        assert etag_matches(None, compute_etag("x")) is False
+        assert etag_matches('"other"', compute_etag("x")) is False
@@ -0,0 +1,157 @@
+"""Tests for ingest_service - pipelined uploads with speculative OCR (OCR, storage and DB stubbed)."""
+import asyncio
+import os
+
+import pytest
+
+from app.config import get_settings
+from app.services import ingest_service
+from app.services.ingest_service import ingest_batch, ingest_file
+from app.utils.spool import SpooledPdf
+
+PDF = b"%PDF-1.4 test"
+
+
+class FakeUpload:
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self._content = content
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk, self._content = self._content, b""
+        return chunk
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_spool_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture
+def backend(monkeypatch, spool_dir):
+    state = {
+        "in_flight": 0,
+        "peak": 0,
+        "inserts": [],
+        "deleted": [],
+        "deleted_records": [],
+        "ocr_tasks": [],
+        "fail_upload": set(),
+        "fail_insert": False,
+    }
+
+    def fake_start_ocr(pdf):
+        task = asyncio.ensure_future(asyncio.sleep(0.05, result="ocr text"))
+        state["ocr_tasks"].append(task)
+        return task
+
+    async def fake_upload(user_id, filename, pdf, storage_path=None):
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        if filename in state["fail_upload"]:
+            raise RuntimeError("storage down")
+        return storage_path or f"{user_id}/{filename}"
+
+    async def fake_insert(user_id, files, buyer_gstin=None):
+        state["inserts"].append(files)
+        if state["fail_insert"]:
+            raise RuntimeError("db down")
+        # PostgREST does not promise to return rows in insert order
+        return [{"id": f"id-{f['original_filename']}", "file_path": f["file_path"]} for f in reversed(files)]
+
+    async def fake_create(user_id, original_filename, file_path, buyer_gstin=None):
+        if state["fail_insert"]:
+            raise RuntimeError("db down")
+        return {"id": f"id-{original_filename}", "file_path": file_path}
+
+    async def fake_delete(path):
+        state["deleted"].append(path)
+
+    async def fake_delete_record(invoice_id):
+        state["deleted_records"].append(invoice_id)
+
+    monkeypatch.setattr(ingest_service, "upload_pdf", fake_upload)
+    monkeypatch.setattr(ingest_service, "create_invoice_records", fake_insert)
+    monkeypatch.setattr(ingest_service, "create_invoice_record", fake_create)
+    monkeypatch.setattr(ingest_service, "delete_pdf", fake_delete)
+    monkeypatch.setattr(ingest_service, "delete_invoice_record", fake_delete_record)
+    monkeypatch.setattr(ingest_service, "start_ocr", fake_start_ocr)
+    return state
+
+
+class TestIngestBatch:
+    def test_uploads_concurrently_and_inserts_once(self, backend):
+        files = [FakeUpload(f"{i}.pdf", PDF) for i in range(6)]
+        results, stored = asyncio.run(ingest_batch("u1", files, None, concurrency=3))
+
+        assert backend["peak"] == 3
+        assert len(backend["inserts"]) == 1 and len(backend["inserts"][0]) == 6
+        assert [r["invoice_id"] for r in results] == [f"id-{i}.pdf" for i in range(6)]
+        assert [entry[0] for entry in stored] == [f"id-{i}.pdf" for i in range(6)]
+        assert all(pdf.read_bytes() == PDF for _, pdf, _ in stored)
+
+    def test_invalid_and_failed_files_are_reported_in_order(self, backend, spool_dir):
+        backend["fail_upload"].add("b.pdf")
+        files = [FakeUpload("a.pdf", PDF), FakeUpload("b.pdf", PDF), FakeUpload("c.txt", PDF)]
+
+        async def scenario():
+            outcome = await ingest_batch("u1", files, None, concurrency=4)
+            return outcome, [t.cancelled() for t in backend["ocr_tasks"]]
+
+        (results, stored), cancelled = asyncio.run(scenario())
+
+        assert [r["success"] for r in results] == [True, False, False]
+        assert results[1]["error"] == "Failed to store file"
+        assert results[2]["error"] == "Only PDF files are allowed"
+        assert [entry[0] for entry in stored] == ["id-a.pdf"]
+        assert sorted(cancelled) == [False, True]  # b.pdf's OCR is dropped with its failed upload
+        assert len(os.listdir(spool_dir)) == 1  # only the stored file waits for processing
+
+    def test_nothing_stored_skips_insert(self, backend):
+        results, stored = asyncio.run(ingest_batch("u1", [FakeUpload("a.txt", PDF)], None, concurrency=2))
+        assert backend["inserts"] == [] and stored == []
+        assert results[0]["invoice_id"] is None
+
+    def test_failed_insert_removes_stored_files(self, backend, spool_dir):
+        backend["fail_insert"] = True
+        files = [FakeUpload("a.pdf", PDF), FakeUpload("b.pdf", PDF)]
+        with pytest.raises(RuntimeError):
+            asyncio.run(ingest_batch("u1", files, None, concurrency=2))
+        assert sorted(backend["deleted"]) == ["u1/a.pdf", "u1/b.pdf"]
+        assert all(t.cancelled() for t in backend["ocr_tasks"])
+        assert os.listdir(spool_dir) == []
+
+
+def _spooled(spool_dir) -> SpooledPdf:
+    path = spool_dir / "upload.pdf"
+    path.write_bytes(PDF)
+    return SpooledPdf(path=str(path), size=len(PDF), sha256="")
+
+
+class TestIngestFile:
+    def test_ocr_runs_alongside_writes(self, backend, spool_dir):
+        async def scenario():
+            invoice_id, ocr_task = await ingest_file("u1", "a.pdf", _spooled(spool_dir), None)
+            # Writes took ~10 ms; the 50 ms OCR started before them and is still running
+            assert not ocr_task.done()
+            return invoice_id, await ocr_task
+
+        assert asyncio.run(scenario()) == ("id-a.pdf", "ocr text")
+
+    def test_failed_upload_cancels_ocr_and_removes_record(self, backend, spool_dir):
+        backend["fail_upload"].add("a.pdf")
+        with pytest.raises(RuntimeError, match="storage down"):
+            asyncio.run(ingest_file("u1", "a.pdf", _spooled(spool_dir), None))
+        assert backend["ocr_tasks"][0].cancelled()
+        assert backend["deleted_records"] == ["id-a.pdf"] and backend["deleted"] == []
+        assert os.listdir(spool_dir) == []
+
+    def test_failed_insert_cancels_ocr_and_removes_upload(self, backend, spool_dir):
+        backend["fail_insert"] = True
+        with pytest.raises(RuntimeError, match="db down"):
+            asyncio.run(ingest_file("u1", "a.pdf", _spooled(spool_dir), None))
+        assert backend["ocr_tasks"][0].cancelled()
+        assert len(backend["deleted"]) == 1 and backend["deleted_records"] == []
@@ -0,0 +1,268 @@
+"""Route tests for invoices - conditional GETs and background processing of split PDFs (DB stubbed)."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.dependencies import get_current_user
+from app.api.routes import invoices
+from app.main import app
+from app.models.schemas import InvoiceData, InvoiceSegment, OCRResult, ProcessingResult
+
+
+@pytest.fixture
+def records(monkeypatch):
+    rows = {
+        "inv-1": {"id": "inv-1", "status": "processing", "updated_at": "2025-09-01T10:00:00"},
+    }
+
+    async def fake_get_invoice(invoice_id, user_id):
+        row = rows.get(invoice_id)
+        return dict(row) if row else None
+
+    async def fake_list_invoices(user_id, page, limit, status, from_date, to_date):
+        return {"invoices": [dict(row) for row in rows.values()], "total": len(rows), "page": page, "limit": limit}
+
+    monkeypatch.setattr(invoices, "db_get_invoice", fake_get_invoice)
+    monkeypatch.setattr(invoices, "db_list_invoices", fake_list_invoices)
+    return rows
+
+
+@pytest.fixture
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1", "email": "u1@example.com"}
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+class TestGetInvoice:
+    def test_sends_etag_and_no_cache_while_processing(self, client, records):
+        response = client.get("/api/invoices/inv-1")
+        assert response.status_code == 200
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_completed_invoice_is_revalidated(self, client, records):
+        # Re-validation and deletes still change completed invoices
+        records["inv-1"]["status"] = "completed"
+        response = client.get("/api/invoices/inv-1")
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_matching_etag_gets_empty_304(self, client, records):
+        etag = client.get("/api/invoices/inv-1").headers["etag"]
+        response = client.get("/api/invoices/inv-1", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    @pytest.mark.parametrize("header", ["W/{etag}", '"other", {etag}', "*"])
+    def test_weak_list_and_wildcard_match(self, client, records, header):
+        etag = client.get("/api/invoices/inv-1").headers["etag"]
+        response = client.get("/api/invoices/inv-1", headers={"If-None-Match": header.format(etag=etag)})
+        assert response.status_code == 304
+
+    def test_stale_etag_gets_body(self, client, records):
+        response = client.get("/api/invoices/inv-1", headers={"If-None-Match": '"stale"'})
+        assert response.status_code == 200
+        assert response.json()["invoice"]["id"] == "inv-1"
+
+    def test_etag_changes_after_status_update(self, client, records):
+        etag = client.get("/api/invoices/inv-1").headers["etag"]
+        records["inv-1"].update(status="completed", updated_at="2025-09-01T10:00:05")
+
+        response = client.get("/api/invoices/inv-1", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["invoice"]["status"] == "completed"
+
+    def test_missing_invoice(self, client, records):
+        assert client.get("/api/invoices/nope").status_code == 404
+
+
+class TestListInvoices:
+    def test_matching_etag_gets_304(self, client, records):
+        first = client.get("/api/invoices?page=1&limit=20")
+        assert first.status_code == 200
+        response = client.get("/api/invoices?page=1&limit=20", headers={"If-None-Match": first.headers["etag"]})
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_etag_depends_on_query(self, client, records):
+        first = client.get("/api/invoices?page=1&limit=20").headers["etag"]
+        assert client.get("/api/invoices?page=1&limit=10").headers["etag"] != first
+
+    def test_etag_changes_after_status_update(self, client, records):
+        etag = client.get("/api/invoices").headers["etag"]
+        records["inv-1"].update(status="failed", updated_at="2025-09-01T10:00:09")
+        response = client.get("/api/invoices", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["invoices"][0]["status"] == "failed"
+
+
+def _split_result(*texts):
+    return ProcessingResult(
+        invoice_id="parent",
+        status="split",
+        segments=[
+            InvoiceSegment(page_start=i + 1, page_end=i + 1, ocr_result=OCRResult(full_text=text, pages=[text]))
+            for i, text in enumerate(texts)
+        ],
+        processing_time_ms=10,
+    )
+
+
+def _extracted(passed: bool) -> ProcessingResult:
+    data = InvoiceData(
+        seller_name="Seller", seller_gstin="27AAAAA0000A1Z5", bill_no="1", bill_date="2025-04-01",
+        total_taxable_value=100.0, total_amount=118.0, validation_passed=passed,
+    )
+    return ProcessingResult(status="completed", invoice_data=data, processing_time_ms=5)
+
+
+@pytest.fixture
+def split_backend(monkeypatch):
+    state = {"used": 1, "limit": 3, "clean": {"A", "B"}, "extracted": [], "saved": {}, "children": []}
+
+    async def fake_quota(user_id):
+        return {"allowed": True, "used": state["used"], "limit": state["limit"], "plan": "free"}
+
+    async def fake_process_ocr_result(ocr_result, buyer_gstin, invoice_id, on_stage=None, user_id=None):
+        state["extracted"].append(ocr_result.full_text)
+        return _extracted(ocr_result.full_text in state["clean"])
+
+    async def fake_create_children(parent_id, user_id, page_ranges):
+        state["children"] = [{"id": f"child-{start}", "page_start": start} for start, end in page_ranges]
+        return state["children"]
+
+    async def fake_mark_split(invoice_id, processing_time_ms):
+        state["saved"][invoice_id] = "split"
+
+    async def fake_save_result(invoice_id, user_id, result):
+        state["saved"][invoice_id] = result
+
+    monkeypatch.setattr(invoices, "check_invoice_quota", fake_quota)
+    monkeypatch.setattr(invoices, "process_ocr_result", fake_process_ocr_result)
+    monkeypatch.setattr(invoices, "create_child_invoices", fake_create_children)
+    monkeypatch.setattr(invoices, "mark_invoice_split", fake_mark_split)
+    monkeypatch.setattr(invoices, "_save_result", fake_save_result)
+    return state
+
+
+class TestProcessSplit:
+    def _run(self, result):
+        asyncio.run(invoices._process_split("parent", "u1", result, None))
+
+    def test_children_get_their_results(self, split_backend):
+        self._run(_split_result("A", "B"))
+        saved = split_backend["saved"]
+        assert saved["parent"] == "split"
+        assert saved["child-1"].invoice_id == "child-1"
+        assert saved["child-2"].status == "completed"
+
+    def test_quota_without_room_fails_parent(self, split_backend):
+        split_backend["used"] = 2  # the parent's own slot plus one more is left
+        self._run(_split_result("A", "B", "C"))
+        failed = split_backend["saved"]["parent"]
+        assert failed.status == "failed"
+        assert failed.error["code"] == "QUOTA_EXCEEDED"
+        assert split_backend["children"] == []
+        assert split_backend["extracted"] == []
+
+    def test_parent_slot_counts_towards_room(self, split_backend):
+        split_backend["used"] = 2
+        self._run(_split_result("A", "B"))
+        assert split_backend["saved"]["parent"] == "split"
+
+    def test_no_clean_segment_extracts_whole_pdf(self, split_backend):
+        split_backend["clean"] = set()
+        self._run(_split_result("A", "B"))
+        assert split_backend["children"] == []
+        assert split_backend["extracted"][-1] == "A\nB"
+        assert split_backend["saved"]["parent"].status == "completed"
+
+    def test_failing_segment_is_stored_as_failed_child(self, split_backend, monkeypatch):
+        async def flaky(ocr_result, buyer_gstin, invoice_id, on_stage=None, user_id=None):
+            if ocr_result.full_text == "B":
+                raise RuntimeError("groq down")
+            return _extracted(True)
+
+        monkeypatch.setattr(invoices, "process_ocr_result", flaky)
+        self._run(_split_result("A", "B"))
+        saved = split_backend["saved"]
+        assert saved["child-1"].status == "completed"
+        assert saved["child-2"].status == "failed"
+        assert "groq down" in saved["child-2"].error["message"]
+
+    def test_child_save_error_fails_only_that_child(self, split_backend, monkeypatch):
+        failed = []
+
+        async def broken_save(invoice_id, user_id, result):
+            if invoice_id == "child-2":
+                raise RuntimeError("db timeout")
+            split_backend["saved"][invoice_id] = result
+
+        async def fake_fail(invoice_id, user_id, error):
+            failed.append((invoice_id, str(error)))
+
+        monkeypatch.setattr(invoices, "_save_result", broken_save)
+        monkeypatch.setattr(invoices, "_fail_invoice", fake_fail)
+        self._run(_split_result("A", "B"))
+        assert failed == [("child-2", "db timeout")]
+        assert split_backend["saved"]["child-1"].status == "completed"
+
+
+class FakePdf:
+    discarded = False
+
+    def discard(self):
+        self.discarded = True
+
+
+@pytest.fixture
+def background(monkeypatch):
+    state = {"statuses": [], "errors": {}, "events": []}
+
+    async def fake_status(invoice_id, status):
+        state["statuses"].append(status)
+
+    async def fake_error(invoice_id, error, processing_time_ms):
+        state["errors"][invoice_id] = error
+
+    monkeypatch.setattr(invoices, "update_invoice_status", fake_status)
+    monkeypatch.setattr(invoices, "save_invoice_error", fake_error)
+    monkeypatch.setattr(invoices, "publish", lambda user_id, event: state["events"].append(event))
+    monkeypatch.setattr(invoices, "notify_done", lambda invoice_id: state["events"].append("done"))
+    return state
+
+
+class TestProcessInBackground:
+    def test_unexpected_error_marks_invoice_failed(self, background, monkeypatch):
+        async def broken(*args, **kwargs):
+            raise RuntimeError("pipeline crashed")
+
+        monkeypatch.setattr(invoices, "process_invoice", broken)
+        pdf = FakePdf()
+        asyncio.run(invoices._process_in_background("inv-1", "u1", pdf, None))
+
+        assert pdf.discarded
+        assert background["errors"]["inv-1"]["message"] == "pipeline crashed"
+        assert background["events"][-2]["status"] == "failed"
+        assert background["events"][-1] == "done"
+
+    def test_cancellation_marks_invoice_failed_and_propagates(self, background, monkeypatch):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        monkeypatch.setattr(invoices, "process_invoice", hang)
+
+        async def run():
+            task = asyncio.create_task(invoices._process_in_background("inv-1", "u1", FakePdf(), None))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        assert background["errors"]["inv-1"]["details"]["type"] == "CancelledError"
+        assert background["events"][-1] == "done"
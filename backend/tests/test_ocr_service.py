@@ -0,0 +1,340 @@
+"""Tests for ocr_service - engine routing and Document AI request shaping."""
+import asyncio
+import io
+import shutil
+import time
+
+import pytest
+from google.cloud import documentai_v1 as documentai
+
+from app.config import get_settings
+from app.models.schemas import OCRResult
+from app.services import ocr_service
+from app.services.ocr_service import (
+    PageProfile,
+    analyze_pages,
+    build_process_request,
+    document_ai_healthy,
+    extract_text_with_document_ai,
+    get_engine_stats,
+    recognize_pdf,
+    record_validation,
+    route_pages,
+    select_document_ai_pages,
+)
+
+TEXT = PageProfile(text="TAX INVOICE Bill No EBW1001 " * 5)
+CLEAN_SCAN = PageProfile(dpi=300, contrast=80)
+POOR_SCAN = PageProfile(dpi=120, contrast=80)
+VECTOR_ONLY = PageProfile()
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(get_settings(), "ocr_routing", "hybrid")
+    monkeypatch.setattr(get_settings(), "cpu_stage_executor", "inline")
+    monkeypatch.setattr(get_settings(), "heavy_stage_executor", "inline")
+    monkeypatch.setattr(ocr_service, "_health", ocr_service._ProviderHealth())
+    monkeypatch.setattr(ocr_service, "_stats", {})
+    monkeypatch.setattr(ocr_service, "tesseract_available", lambda: True)
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    """Fake engines that record which pages they were asked to read."""
+    calls = {}
+    behaviour = {"tesseract_confidence": 0.95, "document_ai_error": None}
+
+    def fake(name):
+        async def engine(pdf_bytes, indices, profiles):
+            calls[name] = list(indices)
+            if name == "document_ai" and behaviour["document_ai_error"]:
+                raise behaviour["document_ai_error"]
+            confidence = behaviour["tesseract_confidence"] if name == "tesseract" else 0.99
+            pages = [f"{name}-{i}" for i in indices] or [f"{name}-all"]
+            return OCRResult(full_text="\n".join(pages), pages=pages, confidence=confidence, engine=name)
+        return engine
+
+    monkeypatch.setattr(ocr_service, "ENGINES", {name: fake(name) for name in ocr_service.ENGINES})
+    return calls, behaviour
+
+
+def _recognize(monkeypatch, profiles) -> OCRResult:
+    monkeypatch.setattr(ocr_service, "analyze_pages", lambda pdf_bytes: profiles)
+    return asyncio.run(recognize_pdf(b"%PDF"))
+
+
+class TestRoutePages:
+    def test_engine_per_page(self):
+        plan = route_pages([TEXT, CLEAN_SCAN, POOR_SCAN, VECTOR_ONLY], tesseract_ok=True, document_ai_ok=True)
+        assert plan == {"text_layer": [0], "tesseract": [1], "document_ai": [2, 3]}
+
+    def test_without_tesseract(self):
+        plan = route_pages([TEXT, CLEAN_SCAN], tesseract_ok=False, document_ai_ok=True)
+        assert plan == {"text_layer": [0], "document_ai": [1]}
+
+    def test_unhealthy_document_ai_sends_any_scan_to_tesseract(self):
+        plan = route_pages([POOR_SCAN, VECTOR_ONLY], tesseract_ok=True, document_ai_ok=False)
+        assert plan == {"tesseract": [0], "document_ai": [1]}
+
+    def test_low_contrast_scan_goes_to_document_ai(self):
+        plan = route_pages([PageProfile(dpi=300, contrast=10)], tesseract_ok=True, document_ai_ok=True)
+        assert plan == {"document_ai": [0]}
+
+
+class TestRecognize:
+    def test_pages_merged_in_document_order(self, monkeypatch, engines):
+        calls, _ = engines
+        result = _recognize(monkeypatch, [CLEAN_SCAN, TEXT, POOR_SCAN])
+        assert calls == {"text_layer": [1], "tesseract": [0], "document_ai": [2]}
+        assert result.pages == ["tesseract-0", "text_layer-1", "document_ai-2"]
+        assert result.full_text == "tesseract-0\ntext_layer-1\ndocument_ai-2"
+        assert result.engine == "document_ai+tesseract+text_layer"
+
+    def test_single_engine_result_is_kept_as_is(self, monkeypatch, engines):
+        result = _recognize(monkeypatch, [TEXT, TEXT])
+        assert result.engine == "text_layer"
+        assert result.pages == ["text_layer-0", "text_layer-1"]
+
+    def test_low_confidence_tesseract_pages_go_to_document_ai(self, monkeypatch, engines):
+        calls, behaviour = engines
+        behaviour["tesseract_confidence"] = 0.4
+        result = _recognize(monkeypatch, [CLEAN_SCAN, POOR_SCAN])
+        assert calls["document_ai"] == [0, 1]
+        assert result.engine == "document_ai"
+
+    def test_document_ai_failure_falls_back_to_tesseract(self, monkeypatch, engines):
+        calls, behaviour = engines
+        behaviour["document_ai_error"] = RuntimeError("429 quota exceeded")
+        result = _recognize(monkeypatch, [POOR_SCAN])
+        assert result.engine == "tesseract"
+        assert get_engine_stats()["engines"]["document_ai"]["failures"] == 1
+
+    def test_document_ai_failure_without_scan_image_raises(self, monkeypatch, engines):
+        _, behaviour = engines
+        behaviour["document_ai_error"] = RuntimeError("429 quota exceeded")
+        with pytest.raises(RuntimeError):
+            _recognize(monkeypatch, [VECTOR_ONLY])
+
+    def test_document_ai_only_mode(self, monkeypatch, engines):
+        calls, _ = engines
+        monkeypatch.setattr(get_settings(), "ocr_routing", "document_ai")
+        monkeypatch.setattr(ocr_service, "analyze_pages", lambda pdf_bytes: pytest.fail("analyzed"))
+        result = asyncio.run(recognize_pdf(b"%PDF"))
+        assert calls == {"document_ai": []}
+        assert result.pages == ["document_ai-all"]
+
+    def test_unreadable_pdf_goes_to_document_ai(self, monkeypatch, engines):
+        calls, _ = engines
+
+        def broken(pdf_bytes):
+            raise ValueError("EOF marker not found")
+
+        monkeypatch.setattr(ocr_service, "analyze_pages", broken)
+        asyncio.run(recognize_pdf(b"%PDF"))
+        assert calls == {"document_ai": []}
+
+
+class TestHealthAndStats:
+    def test_consecutive_failures_then_cooldown(self, monkeypatch):
+        health = ocr_service._health
+        health.consecutive_failures = 3
+        health.last_failure = time.time()
+        assert document_ai_healthy() is False
+        health.last_failure = time.time() - 61
+        assert document_ai_healthy() is True
+
+    def test_slow_median_latency_marks_unhealthy(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "document_ai_slow_ms", 1000)
+        for _ in range(ocr_service._LATENCY_WINDOW):
+            ocr_service._record_latency(5000)
+        assert document_ai_healthy() is False
+
+    def test_validation_counted_per_engine(self, monkeypatch, engines):
+        _recognize(monkeypatch, [TEXT, CLEAN_SCAN])
+        record_validation("tesseract+text_layer", True)
+        record_validation("text_layer", False)
+
+        stats = get_engine_stats()["engines"]
+        assert stats["tesseract"]["pages"] == 1
+        assert stats["tesseract"]["validation_pass_rate"] == 1.0
+        assert stats["text_layer"]["validated"] == 2
+        assert stats["text_layer"]["validation_pass_rate"] == 0.5
+
+
+class TestAnalyzePages:
+    def test_text_layer_and_scan_quality(self):
+        pytest.importorskip("pypdf")
+        Image = pytest.importorskip("PIL.Image")
+        ImageDraw = pytest.importorskip("PIL.ImageDraw")
+
+        scan = Image.new("L", (2480, 3508), 255)  # A4 at 300 dpi
+        ImageDraw.Draw(scan).rectangle((200, 200, 2280, 1800), fill=0)
+        out = io.BytesIO()
+        scan.save(out, "PDF", resolution=300)
+
+        [profile] = analyze_pages(out.getvalue())
+        assert profile.has_text_layer is False
+        assert profile.dpi == pytest.approx(300, rel=0.01)
+        assert profile.contrast > 40
+
+
+class TestTesseractPages:
+    def test_reads_scan_image(self):
+        pytest.importorskip("pypdf")
+        pytest.importorskip("pytesseract")
+        Image = pytest.importorskip("PIL.Image")
+        ImageDraw = pytest.importorskip("PIL.ImageDraw")
+        ImageFont = pytest.importorskip("PIL.ImageFont")
+        if not shutil.which(get_settings().tesseract_cmd or "tesseract"):
+            pytest.skip("tesseract binary not installed")
+
+        scan = Image.new("L", (2480, 3508), 255)  # A4 at 300 dpi
+        draw = ImageDraw.Draw(scan)
+        font = ImageFont.load_default(size=80)
+        draw.text((200, 200), "TAX INVOICE", fill=0, font=font)
+        draw.text((200, 400), "Bill No EBW1001", fill=0, font=font)
+        out = io.BytesIO()
+        scan.save(out, "PDF", resolution=300)
+
+        settings = get_settings()
+        result = ocr_service.tesseract_pages(out.getvalue(), [0], settings.tesseract_cmd, settings.tesseract_lang)
+        assert result.engine == "tesseract"
+        assert len(result.pages) == 1
+        assert "INVOICE" in result.full_text.upper()
+        assert "EBW1001" in result.full_text.replace(" ", "")
+        assert 0 < result.confidence <= 1
+
+
+def _document(page_texts: list[str], page_numbers: list[int] | None = None) -> documentai.Document:
+    text, pages = "", []
+    for page_text, number in zip(page_texts, page_numbers or range(1, len(page_texts) + 1)):
+        anchor = documentai.Document.TextAnchor(
+            text_segments=[documentai.Document.TextAnchor.TextSegment(start_index=len(text), end_index=len(text) + len(page_text))]
+        )
+        layout = documentai.Document.Page.Layout(text_anchor=anchor, confidence=0.9)
+        pages.append(
+            documentai.Document.Page(
+                page_number=number, layout=layout, blocks=[documentai.Document.Page.Block(layout=layout)]
+            )
+        )
+        text += page_text
+    return documentai.Document(text=text, pages=pages)
+
+
+@pytest.fixture
+def fake_document_ai(monkeypatch):
+    """
+    Document AI client that answers with one page per selected page, numbered
+    like the real service, and keeps the requests. Set `order` to have the
+    pages come back in that order instead.
+    """
+
+    class FakeClient:
+        processor_path = staticmethod(documentai.DocumentProcessorServiceClient.processor_path)
+        requests: list = []
+        order: list[int] = []
+
+        def process_document(self, request):
+            self.requests.append(request)
+            selected = self.order or list(request.process_options.individual_page_selector.pages) or [1, 2, 3]
+            return documentai.ProcessResponse(document=_document([f"page {n} " for n in selected], selected))
+
+    monkeypatch.setattr(ocr_service.documentai, "DocumentProcessorServiceClient", FakeClient)
+    return FakeClient
+
+
+class TestRequestShaping:
+    def test_page_selection(self):
+        assert select_document_ai_pages(10, 2, 1) == [1, 2, 10]
+        assert select_document_ai_pages(10, 0, 2) == [9, 10]
+        assert select_document_ai_pages(3, 2, 1) is None  # nothing to skip
+        assert select_document_ai_pages(10, 0, 0) is None
+
+    def test_shaped_request_carries_mask_and_options(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "document_ai_native_pdf_parsing", True)
+        monkeypatch.setattr(get_settings(), "document_ai_language_hints", "en, hi")
+        request = build_process_request(b"%PDF", pages=[1, 2, 10])
+        assert "pages.tables" in request.field_mask.paths
+        assert "pages.tokens" not in request.field_mask.paths
+        assert list(request.process_options.individual_page_selector.pages) == [1, 2, 10]
+        assert request.process_options.ocr_config.enable_native_pdf_parsing is True
+        assert list(request.process_options.ocr_config.hints.language_hints) == ["en", "hi"]
+
+    def test_ocr_options_default_to_off(self):
+        ocr_config = build_process_request(b"%PDF").process_options.ocr_config
+        assert ocr_config.enable_native_pdf_parsing is False
+        assert "hints" not in ocr_config
+
+    def test_unshaped_and_unmasked_requests(self, monkeypatch):
+        bare = build_process_request(b"%PDF", shaped=False)
+        assert not bare.field_mask.paths
+        assert "process_options" not in bare
+
+        monkeypatch.setattr(get_settings(), "document_ai_field_mask", "")
+        assert not build_process_request(b"%PDF").field_mask.paths
+
+    def test_skipped_pages_come_back_empty(self, monkeypatch, fake_document_ai):
+        monkeypatch.setattr(get_settings(), "document_ai_first_pages", 1)
+        monkeypatch.setattr(get_settings(), "document_ai_last_pages", 1)
+        result = asyncio.run(extract_text_with_document_ai(b"%PDF", page_count=4))
+
+        assert list(fake_document_ai.requests[0].process_options.individual_page_selector.pages) == [1, 4]
+        assert result.pages == ["page 1 ", "", "", "page 4 "]
+        assert result.full_text == "page 1 page 4 "
+
+    def test_pages_keyed_on_reported_page_number(self, monkeypatch, fake_document_ai):
+        monkeypatch.setattr(get_settings(), "document_ai_first_pages", 2)
+        monkeypatch.setattr(get_settings(), "document_ai_last_pages", 1)
+        fake_document_ai.order = [5, 2, 1]  # out of order, as the pages were selected [1, 2, 5]
+        result = asyncio.run(extract_text_with_document_ai(b"%PDF", page_count=5))
+
+        assert result.pages == ["page 1 ", "page 2 ", "", "", "page 5 "]
+        assert result.page_numbers == []
+
+    def test_pipeline_reads_every_page_for_split_detection(self, monkeypatch, fake_document_ai):
+        # Selecting only the ends would blank the middle pages split detection looks at
+        monkeypatch.setattr(get_settings(), "document_ai_first_pages", 1)
+        monkeypatch.setattr(get_settings(), "document_ai_last_pages", 1)
+        monkeypatch.setattr(get_settings(), "ocr_routing", "document_ai")
+        monkeypatch.setattr(get_settings(), "split_min_pages", 2)
+        monkeypatch.setattr(ocr_service, "count_pdf_pages", lambda pdf_bytes: 3)
+        result = asyncio.run(recognize_pdf(b"%PDF"))
+
+        assert not fake_document_ai.requests[0].process_options.individual_page_selector.pages
+        assert result.pages == ["page 1 ", "page 2 ", "page 3 "]
+
+    def test_pipeline_selects_pages_without_split_detection(self, monkeypatch, fake_document_ai):
+        monkeypatch.setattr(get_settings(), "document_ai_first_pages", 1)
+        monkeypatch.setattr(get_settings(), "document_ai_last_pages", 1)
+        monkeypatch.setattr(get_settings(), "ocr_routing", "document_ai")
+        monkeypatch.setattr(get_settings(), "split_min_pages", 0)
+        monkeypatch.setattr(ocr_service, "count_pdf_pages", lambda pdf_bytes: 3)
+        asyncio.run(recognize_pdf(b"%PDF"))
+
+        assert list(fake_document_ai.requests[0].process_options.individual_page_selector.pages) == [1, 3]
+
+    def test_routed_pages_are_all_read(self, monkeypatch, fake_document_ai):
+        monkeypatch.setattr(get_settings(), "document_ai_first_pages", 1)
+        monkeypatch.setattr(get_settings(), "document_ai_last_pages", 1)
+        cut = {}
+
+        def fake_select_pages(pdf_bytes, indices):
+            cut["indices"] = list(indices)
+            return b"%PDF-sub"
+
+        monkeypatch.setattr(ocr_service, "select_pages", fake_select_pages)
+        # Pages 0, 2 and 4 of five go to Document AI; 1 and 3 have a text layer
+        profiles = [POOR_SCAN, TEXT, VECTOR_ONLY, TEXT, POOR_SCAN]
+        result = _recognize(monkeypatch, profiles)
+
+        assert cut["indices"] == [0, 2, 4]
+        assert not fake_document_ai.requests[0].process_options.individual_page_selector.pages
+        assert fake_document_ai.requests[0].raw_document.content == b"%PDF-sub"
+        assert result.pages[0] == "page 1 " and result.pages[2] == "page 2 " and result.pages[4] == "page 3 "
+
+    def test_whole_document_without_selection(self, fake_document_ai):
+        result = asyncio.run(extract_text_with_document_ai(b"%PDF"))
+        assert not fake_document_ai.requests[0].process_options.individual_page_selector.pages
+        assert result.pages == ["page 1 ", "page 2 ", "page 3 "]
+        assert result.confidence == pytest.approx(0.9)
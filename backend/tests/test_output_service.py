@@ -6,12 +6,17 @@ from io import StringIO
 import pytest
 from xml.etree import ElementTree
 
+from app.config import get_settings
 from app.models.schemas import InvoiceData
+from app.services import output_service
 from app.services.output_service import (
     generate_json_output,
     generate_tally_xml,
     generate_csv_output,
     generate_output,
+    get_cached_output,
+    invalidate_cached_outputs,
+    iter_record_export,
 )
 
 EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
@@ -183,3 +188,115 @@ class TestGenerateOutput:
         data = _load_invoice("bhavani_auto.json")
         with pytest.raises(ValueError, match="Unsupported format"):
             generate_output(data, "xlsx")
+
+
+# --- Bulk Export Tests ---
+
+
+ALL_INVOICES = ["bhavani_auto.json", "brothers_battery.json", "spareway_associates.json"]
+
+
+class TestBulkExport:
+    @pytest.fixture(autouse=True)
+    def inline_stages(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "heavy_stage_executor", "inline")
+
+    def _records(self):
+        # Rows as they come from the invoices table
+        return [_load_invoice(name).model_dump() for name in ALL_INVOICES]
+
+    def _export(self, format: str, records=None) -> str:
+        return "".join(iter_record_export(self._records() if records is None else records, format))
+
+    def test_csv_one_row_per_invoice(self):
+        rows = list(csv.reader(StringIO(self._export("csv"))))
+        assert rows[0][0] == "Bill No"
+        assert len(rows) == 1 + len(ALL_INVOICES)
+        assert rows[1][0] == "EBW2526006189"
+
+    def test_csv_empty_range_has_header_only(self):
+        rows = list(csv.reader(StringIO(self._export("csv", []))))
+        assert len(rows) == 1
+
+    def test_jsonl_lines(self):
+        lines = self._export("jsonl").splitlines()
+        assert len(lines) == len(ALL_INVOICES)
+        assert json.loads(lines[0])["invoice_metadata"]["bill_no"] == "EBW2526006189"
+
+    def test_tally_single_envelope(self):
+        root = ElementTree.fromstring(self._export("xml").encode())
+        messages = root.findall(".//TALLYMESSAGE")
+        assert len(messages) == 1
+        assert len(messages[0].findall("VOUCHER")) == len(ALL_INVOICES)
+
+    def test_empty_tally_export_is_valid_xml(self):
+        root = ElementTree.fromstring(self._export("xml", []).encode())
+        assert root.findall(".//VOUCHER") == []
+
+    def test_tally_matches_single_invoice_output(self):
+        data = _load_invoice("bhavani_auto.json")
+        assert self._export("xml", [data.model_dump()]) == generate_tally_xml(data)
+
+    def test_streams_lazily(self):
+        read = []
+
+        def rows():
+            for record in self._records():
+                read.append(record)
+                yield record
+
+        stream = iter_record_export(rows(), "xml")
+        assert next(stream).startswith("<?xml")
+        assert read == []
+
+    @pytest.mark.parametrize("format", ["csv", "jsonl", "xml"])
+    def test_output_does_not_depend_on_chunk_size(self, format, monkeypatch):
+        whole = self._export(format)
+        # Chunks of 2 split the 3 invoices unevenly
+        monkeypatch.setattr(output_service, "EXPORT_CHUNK_SIZE", 2)
+        assert self._export(format) == whole
+
+    def test_control_characters_are_stripped(self):
+        data = _load_invoice("bhavani_auto.json")
+        data.seller_name = "Bhavani\x0b Auto & Co\x00"
+        root = ElementTree.fromstring(generate_tally_xml(data).encode())
+        assert root.find(".//PARTYLEDGERNAME").text == "Bhavani Auto & Co"
+
+
+# --- Cached Artifact Tests ---
+
+
+class TestCachedOutput:
+    def _builder(self, calls: list):
+        def build():
+            calls.append(1)
+            return _load_invoice("bhavani_auto.json")
+        return build
+
+    def test_repeat_download_is_cache_hit(self):
+        calls = []
+        first = get_cached_output("inv-cache-1", "t0", "xml", self._builder(calls))
+        second = get_cached_output("inv-cache-1", "t0", "xml", self._builder(calls))
+        assert first == second
+        assert len(calls) == 1
+
+    def test_formats_cached_separately(self):
+        calls = []
+        get_cached_output("inv-cache-2", "t0", "json", self._builder(calls))
+        csv_output = get_cached_output("inv-cache-2", "t0", "csv", self._builder(calls))
+        assert "Bill No" in csv_output
+        assert len(calls) == 2
+
+    def test_updated_record_rerenders(self):
+        calls = []
+        get_cached_output("inv-cache-3", "t0", "json", self._builder(calls))
+        get_cached_output("inv-cache-3", "t1", "json", self._builder(calls))
+        assert len(calls) == 2
+
+    def test_invalidate(self):
+        calls = []
+        get_cached_output("inv-cache-4", "t0", "json", self._builder(calls))
+        get_cached_output("inv-cache-4", "t0", "csv", self._builder(calls))
+        assert invalidate_cached_outputs("inv-cache-4") == 2
+        get_cached_output("inv-cache-4", "t0", "json", self._builder(calls))
+        assert len(calls) == 3
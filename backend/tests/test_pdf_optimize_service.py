@@ -0,0 +1,109 @@
+"""Tests for pdf_optimize_service - shrinking scanned PDFs before OCR."""
+import asyncio
+import io
+
+import pytest
+
+from app.config import get_settings
+from app.models.schemas import OCRResult
+from app.services import pdf_optimize_service
+from app.services.pdf_optimize_service import OptimizedPdf, optimize_for_ocr, optimize_pdf
+from app.services.pipeline import _segment
+from app.services.stage_runner import shutdown_stage_pool
+
+PDF = b"%PDF-1.4 " + b"invoice " * 100
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    # Monkeypatched stages only exist in this process, so run them on threads
+    monkeypatch.setattr(get_settings(), "heavy_stage_executor", "thread")
+    yield
+    shutdown_stage_pool()
+
+
+def _scan(dpi: int, blank_pages: tuple[int, ...] = (), pages: int = 2) -> bytes:
+    """A Pillow-built scan: A4 pages at the given DPI, with "ink" on non-blank ones."""
+    Image = pytest.importorskip("PIL.Image")
+    ImageDraw = pytest.importorskip("PIL.ImageDraw")
+    size = (int(8.27 * dpi), int(11.69 * dpi))
+    images = []
+    for i in range(pages):
+        image = Image.new("L", size, 255)
+        if i not in blank_pages:
+            draw = ImageDraw.Draw(image)
+            for row in range(20):
+                top = size[1] // 10 + row * size[1] // 30
+                draw.rectangle((size[0] // 10, top, size[0] * 9 // 10, top + size[1] // 100), fill=0)
+        images.append(image)
+    out = io.BytesIO()
+    images[0].save(out, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return out.getvalue()
+
+
+class TestOptimizePdf:
+    def test_drops_blank_pages_and_downsamples(self):
+        pytest.importorskip("pypdf")
+        original = _scan(600, blank_pages=(1,), pages=3)
+        result = optimize_pdf(original, target_dpi=300, blank_ink_ratio=0.005)
+
+        assert result.kept_pages == [0, 2]
+        assert result.dropped_pages == 1
+        assert result.images_downsampled == 2
+        assert result.optimized_size < result.original_size
+
+    def test_leaves_already_small_scan_alone(self):
+        pytest.importorskip("pypdf")
+        original = _scan(150)
+        result = optimize_pdf(original, target_dpi=300, blank_ink_ratio=0.005)
+        assert result.kept_pages is None
+        assert result.images_downsampled == 0
+
+    def test_all_blank_upload_is_sent_as_is(self):
+        pytest.importorskip("pypdf")
+        original = _scan(150, blank_pages=(0, 1))
+        assert optimize_pdf(original, target_dpi=300, blank_ink_ratio=0.005).content == original
+
+
+class TestOptimizeForOcr:
+    def test_fails_open(self, thread_pool, monkeypatch):
+        def broken(*args):
+            raise ValueError("not a PDF")
+
+        monkeypatch.setattr(pdf_optimize_service, "optimize_pdf", broken)
+        result = asyncio.run(optimize_for_ocr(PDF))
+        assert result.content == PDF
+        assert result.kept_pages is None
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "pdf_optimize_enabled", False)
+        monkeypatch.setattr(pdf_optimize_service, "optimize_pdf", lambda *args: pytest.fail("optimized"))
+        assert asyncio.run(optimize_for_ocr(PDF)).content == PDF
+
+    def test_runs_in_pool_with_settings(self, thread_pool, monkeypatch):
+        calls = []
+
+        def fake_optimize(pdf_bytes, target_dpi, blank_ink_ratio):
+            calls.append((target_dpi, blank_ink_ratio))
+            return OptimizedPdf(b"%PDF-small", len(pdf_bytes), kept_pages=[0, 2], page_count=3)
+
+        monkeypatch.setattr(pdf_optimize_service, "optimize_pdf", fake_optimize)
+        monkeypatch.setattr(get_settings(), "ocr_target_dpi", 200)
+        result = asyncio.run(optimize_for_ocr(PDF))
+        assert calls == [(200, get_settings().blank_page_ink_ratio)]
+        assert result.optimized_size == len(b"%PDF-small")
+        assert result.dropped_pages == 1
+
+
+class TestPageNumbers:
+    def test_segments_report_original_pages(self):
+        # Page 2 of the upload was blank and dropped before OCR
+        ocr = OCRResult(full_text="a\nb\nc", pages=["a", "b", "c"], page_numbers=[1, 3, 4])
+        segment = _segment(ocr, 1, 2)
+        assert (segment.page_start, segment.page_end) == (3, 4)
+        assert segment.ocr_result.pages == ["b", "c"]
+
+    def test_segments_without_dropped_pages(self):
+        ocr = OCRResult(full_text="a\nb", pages=["a", "b"])
+        segment = _segment(ocr, 1, 1)
+        assert (segment.page_start, segment.page_end) == (2, 2)
@@ -0,0 +1,141 @@
+"""Tests for similarity_service - MinHash signatures and the per-user LSH index (DB stubbed)."""
+import asyncio
+import random
+from collections import OrderedDict
+
+import pytest
+
+from app.config import get_settings
+from app.services import similarity_service
+from app.services.similarity_service import (
+    LSHIndex,
+    compute_signature,
+    estimate_similarity,
+    find_near_duplicate,
+    index_invoice,
+)
+
+ORIGINAL = """BHAVANI AUTO DISTRIBUTORS
+GSTIN: 32AAXFB6381L1ZU   Ph: 0484 2345678
+TAX INVOICE   Bill No. : EBW2526006189   Date: 01/09/2025
+1  BRAKE SHOE ASSY FRONT     8708   4 NOS   612.50   2450.00
+2  CLUTCH PLATE              8708   2 NOS   568.52   1137.04
+Taxable 3587.04  CGST 9% 322.83  SGST 9% 322.83  Net Amount 4232.70
+"""
+
+# Same invoice re-scanned: OCR noise in a few characters and different spacing
+RESCAN = ORIGINAL.replace("BRAKE SHOE", "BRAKE SH0E").replace("Ph:", "Ph :").replace("   ", "  ")
+
+# Same supplier template, different bill
+OTHER_BILL = """BHAVANI AUTO DISTRIBUTORS
+GSTIN: 32AAXFB6381L1ZU   Ph: 0484 2345678
+TAX INVOICE   Bill No. : EBW2526007311   Date: 14/09/2025
+1  HEADLAMP ASSEMBLY LH      8512   1 NOS  1840.00   1840.00
+2  SPARK PLUG IRIDIUM        8511  10 NOS   310.00   3100.00
+Taxable 4940.00  CGST 14% 691.60  SGST 14% 691.60  Net Amount 6323.20
+"""
+
+
+def _random_text(seed: int) -> str:
+    rng = random.Random(seed)
+    return " ".join("".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789", k=6)) for _ in range(80))
+
+
+class TestSignatures:
+    def test_deterministic(self):
+        assert compute_signature(ORIGINAL) == compute_signature(ORIGINAL)
+        assert len(compute_signature(ORIGINAL)) == similarity_service.NUM_PERM
+
+    def test_rescan_is_similar(self):
+        assert estimate_similarity(compute_signature(ORIGINAL), compute_signature(RESCAN)) > 0.85
+
+    def test_unrelated_text_is_not(self):
+        assert estimate_similarity(compute_signature(ORIGINAL), compute_signature(_random_text(1))) < 0.1
+
+    def test_short_text_has_no_signature(self):
+        assert compute_signature("GSTIN 32AAXFB6381L1ZU") is None
+
+
+class TestLSHIndex:
+    def test_query_finds_near_copy_only(self):
+        index = LSHIndex()
+        index.add("inv-1", compute_signature(ORIGINAL))
+        for i in range(50):
+            index.add(f"noise-{i}", compute_signature(_random_text(i)))
+
+        matches = index.query(compute_signature(RESCAN), threshold=0.85)
+        assert [m[0] for m in matches] == ["inv-1"]
+
+    def test_remove(self):
+        index = LSHIndex()
+        index.add("inv-1", compute_signature(ORIGINAL))
+        index.remove("inv-1")
+        assert len(index) == 0
+        assert index.query(compute_signature(ORIGINAL), threshold=0.5) == []
+        assert index._buckets == {}
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    rows = {
+        "inv-orig": {"id": "inv-orig", "seller_gstin": "32AAXFB6381L1ZU", "bill_no": "EBW2526006189"},
+        "inv-other": {"id": "inv-other", "seller_gstin": "32AAXFB6381L1ZU", "bill_no": "EBW2526007311"},
+    }
+
+    loads = []
+
+    async def fake_iter_signatures(user_id):
+        loads.append(user_id)
+        yield {"invoice_id": "inv-orig", "minhash": compute_signature(ORIGINAL)}
+
+    async def fake_get_by_ids(ids, user_id):
+        return [rows[i] for i in ids if i in rows]
+
+    monkeypatch.setattr(similarity_service, "_indexes", OrderedDict())
+    monkeypatch.setattr(similarity_service, "iter_invoice_signatures", fake_iter_signatures)
+    monkeypatch.setattr(similarity_service, "get_invoices_by_ids", fake_get_by_ids)
+    return loads
+
+
+class TestFindNearDuplicate:
+    def test_rescan_matches_original(self, fake_db):
+        match = asyncio.run(find_near_duplicate("user-1", RESCAN, compute_signature(RESCAN), 0.85))
+        assert match is not None
+        assert match[0] == "inv-orig"
+
+    def test_similar_template_needs_matching_bill_no(self, fake_db):
+        # Low threshold so the template alone would qualify
+        assert asyncio.run(
+            find_near_duplicate("user-1", OTHER_BILL, compute_signature(OTHER_BILL), 0.1)
+        ) is None
+
+    def test_new_invoice_is_indexed_after_load(self, fake_db):
+        async def scenario():
+            await similarity_service.get_user_index("user-1")
+            index_invoice("user-1", "inv-other", compute_signature(OTHER_BILL))
+            return await find_near_duplicate("user-1", OTHER_BILL, compute_signature(OTHER_BILL), 0.85)
+
+        assert asyncio.run(scenario()) == ("inv-other", 1.0)
+
+
+class TestIndexCache:
+    def test_least_recently_used_index_is_dropped(self, fake_db, monkeypatch):
+        monkeypatch.setattr(get_settings(), "near_duplicate_index_max_users", 2)
+
+        async def scenario():
+            for user_id in ("user-1", "user-2", "user-1", "user-3"):
+                await similarity_service.get_user_index(user_id)
+
+        asyncio.run(scenario())
+        assert list(similarity_service._indexes) == ["user-1", "user-3"]
+        assert fake_db == ["user-1", "user-2", "user-3"]
+
+    def test_stale_index_is_rebuilt(self, fake_db, monkeypatch):
+        async def scenario():
+            first = await similarity_service.get_user_index("user-1")
+            first.loaded_at -= get_settings().near_duplicate_index_ttl_seconds
+            return first, await similarity_service.get_user_index("user-1")
+
+        first, second = asyncio.run(scenario())
+        assert second is not first
+        assert fake_db == ["user-1", "user-1"]
@@ -0,0 +1,69 @@
+"""Tests for split_service - finding invoice boundaries in multi-invoice PDFs from page text."""
+from app.config import get_settings
+from app.models.schemas import OCRResult
+from app.services.pipeline import _invoice_boundaries
+from app.services.split_service import find_invoice_boundaries
+
+
+def _page(bill_no: str | None = None, page: str | None = None, total: bool = False, body: str = "") -> str:
+    lines = ["BHAVANI AUTO DISTRIBUTORS", "GSTIN: 32AAXFB6381L1ZU", "TAX INVOICE"]
+    if bill_no:
+        lines.append(f"Bill No. : {bill_no}   Date: 01/09/2025")
+    if page:
+        lines.append(page)
+    lines.append(body or "1  BRAKE SHOE ASSY FRONT  8708  4 NOS  612.50  2450.00")
+    if total:
+        lines.append("Grand Total 4232.70  Amount in words: Four thousand ...")
+    return "\n".join(lines)
+
+
+class TestBoundaries:
+    def test_single_page(self):
+        assert find_invoice_boundaries([_page("EBW2526006189", total=True)]) == [(0, 0)]
+
+    def test_empty(self):
+        assert find_invoice_boundaries([]) == []
+
+    def test_new_bill_number_starts_invoice(self):
+        pages = [_page("EBW1001", total=True), _page("EBW1002", total=True), _page("EBW1003", total=True)]
+        assert find_invoice_boundaries(pages) == [(0, 0), (1, 1), (2, 2)]
+
+    def test_same_bill_number_continues_invoice(self):
+        pages = [_page("EBW1001"), _page("EBW1001", total=True), _page("EBW1002", total=True)]
+        assert find_invoice_boundaries(pages) == [(0, 1), (2, 2)]
+
+    def test_page_numbering_wins_over_bill_numbers(self):
+        # Page 2 repeats a different reference number in its body, but says "Page 2 of 2"
+        pages = [
+            _page("EBW1001", page="Page 1 of 2"),
+            _page("EBW9999", page="Page 2 of 2", total=True),
+            _page("EBW1002", page="Page 1 of 1", total=True),
+        ]
+        assert find_invoice_boundaries(pages) == [(0, 1), (2, 2)]
+
+    def test_repeated_header_after_closing_page(self):
+        # No bill numbers or page numbers were OCR'd: fall back to the letterhead
+        pages = [_page(), _page(total=True), _page(), _page(total=True)]
+        assert find_invoice_boundaries(pages) == [(0, 1), (2, 3)]
+
+    def test_repeated_header_mid_invoice_continues(self):
+        pages = [_page(), _page(), _page(total=True)]
+        assert find_invoice_boundaries(pages) == [(0, 2)]
+
+    def test_bill_numbers_need_a_digit(self):
+        pages = [_page("EBW1001"), _page(body="Invoice No: ORIGINAL copy"), _page("EBW1002")]
+        assert find_invoice_boundaries(pages) == [(0, 1), (2, 2)]
+
+
+class TestSplitSetting:
+    PAGES = ["Page 1 of 1\nACME", "Page 1 of 1\nACME"]
+
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "split_min_pages", 0)
+        assert _invoice_boundaries(OCRResult(pages=self.PAGES)) == []
+
+    def test_page_threshold(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "split_min_pages", 3)
+        assert _invoice_boundaries(OCRResult(pages=self.PAGES)) == []
+        monkeypatch.setattr(get_settings(), "split_min_pages", 2)
+        assert _invoice_boundaries(OCRResult(pages=self.PAGES)) == [(0, 0), (1, 1)]
@@ -0,0 +1,76 @@
+"""Tests for spool - streaming uploads to disk with on-the-fly validation and hashing."""
+import asyncio
+import os
+
+import pytest
+
+from app.config import get_settings
+from app.utils import helpers
+from app.utils.helpers import PdfUploadValidator, file_hash
+from app.utils.spool import spool_upload
+
+
+class ChunkedUpload:
+    """Stands in for UploadFile: hands out the content a chunk at a time and counts reads."""
+
+    def __init__(self, filename: str, content: bytes):
+        self.filename = filename
+        self._content = content
+        self.reads = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        self.reads += 1
+        chunk, self._content = self._content[:size], self._content[size:]
+        return chunk
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_spool_dir", str(tmp_path))
+    monkeypatch.setattr("app.utils.spool.UPLOAD_CHUNK_SIZE", 4)
+    return tmp_path
+
+
+class TestPdfUploadValidator:
+    def test_header_split_across_chunks(self):
+        validator = PdfUploadValidator("a.pdf")
+        for chunk in (b"%P", b"DF-1.4", b" body"):
+            assert validator.feed(chunk) is None
+        assert validator.finish() is None
+        assert validator.sha256 == file_hash(b"%PDF-1.4 body")
+
+    def test_bad_header_fails_on_first_chunk(self):
+        assert "header" in PdfUploadValidator("a.pdf").feed(b"NOPE").lower()
+
+
+class TestSpoolUpload:
+    def test_spools_valid_pdf(self, spool_dir):
+        content = b"%PDF-1.4 " + b"x" * 30
+        pdf, error = asyncio.run(spool_upload(ChunkedUpload("a.pdf", content)))
+        assert error is None
+        assert pdf.size == len(content) and pdf.sha256 == file_hash(content)
+        assert pdf.read_bytes() == content
+        with pdf.mapped() as mm:
+            assert mm[:4] == b"%PDF"
+        pdf.discard()
+        assert os.listdir(spool_dir) == []
+
+    def test_stops_reading_invalid_upload(self, spool_dir):
+        upload = ChunkedUpload("a.pdf", b"JUNK" * 100)
+        pdf, error = asyncio.run(spool_upload(upload))
+        assert pdf is None and "header" in error.lower()
+        assert upload.reads == 1
+        assert os.listdir(spool_dir) == []
+
+    def test_stops_reading_oversized_upload(self, spool_dir, monkeypatch):
+        monkeypatch.setattr(helpers, "MAX_FILE_SIZE", 10)
+        upload = ChunkedUpload("a.pdf", b"%PDF" + b"x" * 100)
+        pdf, error = asyncio.run(spool_upload(upload))
+        assert pdf is None and "large" in error.lower()
+        assert upload.reads == 3
+        assert os.listdir(spool_dir) == []
+
+    def test_rejects_extension_without_reading(self):
+        upload = ChunkedUpload("a.docx", b"%PDF")
+        assert asyncio.run(spool_upload(upload)) == (None, "Only PDF files are allowed")
+        assert upload.reads == 0
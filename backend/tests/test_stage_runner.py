@@ -0,0 +1,110 @@
+"""Tests for stage_runner - running CPU-heavy pipeline stages off the event loop."""
+import asyncio
+import threading
+
+import pytest
+
+from app.config import get_settings
+from app.models.schemas import InvoiceData
+from app.services.stage_runner import iter_cpu_stage, run_cpu_stage, shutdown_stage_pool
+from app.services.validation_service import validate_invoice_data
+
+
+def _thread_name(*args) -> str:
+    return threading.current_thread().name
+
+
+def _square(n: int) -> int:
+    return n * n
+
+
+@pytest.fixture
+def executor(request, monkeypatch):
+    monkeypatch.setattr(get_settings(), "cpu_stage_executor", request.param)
+    monkeypatch.setattr(get_settings(), "cpu_stage_workers", 2)
+    yield request.param
+    shutdown_stage_pool()
+
+
+def _invoice() -> InvoiceData:
+    return InvoiceData(
+        seller_name="Bhavani Auto",
+        seller_gstin="32AAXFB6381L1ZU",
+        bill_no="EBW1001",
+        bill_date="2025-09-01",
+        total_taxable_value=1000,
+        total_cgst=90,
+        total_sgst=90,
+        total_amount=1180,
+    )
+
+
+class TestModes:
+    @pytest.mark.parametrize("executor", ["inline", "thread", "process"], indirect=True)
+    def test_same_result_in_every_mode(self, executor):
+        # Pydantic models cross the process boundary by pickling
+        assert asyncio.run(run_cpu_stage(validate_invoice_data, _invoice())) == validate_invoice_data(_invoice())
+
+    @pytest.mark.parametrize("executor", ["inline", "thread"], indirect=True)
+    def test_thread_mode_leaves_event_loop_thread(self, executor):
+        async def scenario():
+            return threading.current_thread().name, await run_cpu_stage(_thread_name)
+
+        loop_thread, stage_thread = asyncio.run(scenario())
+        assert (stage_thread == loop_thread) == (executor == "inline")
+
+    def test_unknown_mode(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "cpu_stage_executor", "gpu")
+        with pytest.raises(ValueError, match="CPU_STAGE_EXECUTOR"):
+            asyncio.run(run_cpu_stage(_square, 3))
+
+
+class TestHeavyStages:
+    def test_heavy_stages_use_their_own_executor(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "cpu_stage_executor", "inline")
+        monkeypatch.setattr(get_settings(), "heavy_stage_executor", "thread")
+
+        async def scenario():
+            loop_thread = threading.current_thread().name
+            light = await run_cpu_stage(_thread_name)
+            heavy = await run_cpu_stage(_thread_name, heavy=True)
+            return loop_thread, light, heavy
+
+        try:
+            loop_thread, light, heavy = asyncio.run(scenario())
+        finally:
+            shutdown_stage_pool()
+        assert light == loop_thread
+        assert heavy.startswith("cpu-stage")
+
+    @pytest.mark.parametrize("executor", ["thread"], indirect=True)
+    def test_iter_heavy_stage(self, executor, monkeypatch):
+        monkeypatch.setattr(get_settings(), "heavy_stage_executor", "process")
+        assert list(iter_cpu_stage(_square, range(5), heavy=True)) == [n * n for n in range(5)]
+
+    def test_unknown_heavy_mode(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "cpu_stage_executor", "inline")
+        monkeypatch.setattr(get_settings(), "heavy_stage_executor", "gpu")
+        assert asyncio.run(run_cpu_stage(_square, 3)) == 9
+        with pytest.raises(ValueError, match="HEAVY_STAGE_EXECUTOR"):
+            asyncio.run(run_cpu_stage(_square, 3, heavy=True))
+
+
+class TestIterStage:
+    @pytest.mark.parametrize("executor", ["inline", "thread", "process"], indirect=True)
+    def test_results_in_order(self, executor):
+        assert list(iter_cpu_stage(_square, range(10), window=3)) == [n * n for n in range(10)]
+
+    @pytest.mark.parametrize("executor", ["thread"], indirect=True)
+    def test_window_bounds_items_read_ahead(self, executor):
+        taken = []
+
+        def items():
+            for n in range(100):
+                taken.append(n)
+                yield n
+
+        stream = iter_cpu_stage(_square, items(), window=4)
+        assert next(stream) == 0
+        assert len(taken) == 4
+        stream.close()
@@ -0,0 +1,86 @@
+"""Tests for summary_service - folding GST rollup rows into period summaries."""
+import json
+import os
+
+from app.models.schemas import InvoiceData
+from app.services.summary_service import summarize_rollups
+
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), "expected_outputs")
+ALL_INVOICES = ["bhavani_auto.json", "brothers_battery.json", "spareway_associates.json"]
+
+
+def _load(filename: str) -> InvoiceData:
+    with open(os.path.join(EXPECTED_DIR, filename)) as f:
+        return InvoiceData(**json.load(f))
+
+
+def _rollups(invoices: list[InvoiceData]) -> tuple[list[dict], list[dict]]:
+    """Mirror what apply_invoice_rollup() accumulates in the database."""
+    invoice_rows: dict = {}
+    rate_rows: dict = {}
+    for d in invoices:
+        month = d.bill_date[:7] + "-01"
+        row = invoice_rows.setdefault((month, d.seller_gstin), {
+            "period_month": month, "seller_gstin": d.seller_gstin, "invoice_count": 0,
+            "total_taxable_value": 0.0, "total_cgst": 0.0, "total_sgst": 0.0,
+            "total_igst": 0.0, "total_amount": 0.0,
+        })
+        row["invoice_count"] += 1
+        row["total_taxable_value"] += d.total_taxable_value
+        row["total_cgst"] += d.total_cgst
+        row["total_sgst"] += d.total_sgst
+        row["total_igst"] += d.total_igst
+        row["total_amount"] += d.total_amount
+        for item in d.tax_breakup:
+            rate = rate_rows.setdefault((month, d.seller_gstin, item.rate), {
+                "period_month": month, "seller_gstin": d.seller_gstin, "rate": item.rate,
+                "line_count": 0, "taxable_value": 0.0, "cgst_amount": 0.0,
+                "sgst_amount": 0.0, "igst_amount": 0.0, "total_with_tax": 0.0,
+            })
+            rate["line_count"] += 1
+            for field in ("taxable_value", "cgst_amount", "sgst_amount", "igst_amount", "total_with_tax"):
+                rate[field] += getattr(item, field)
+    return list(invoice_rows.values()), list(rate_rows.values())
+
+
+class TestSummarizeRollups:
+    def test_totals_match_invoices(self):
+        invoices = [_load(f) for f in ALL_INVOICES]
+        summary = summarize_rollups(*_rollups(invoices))
+
+        totals = summary["totals"]
+        assert totals["invoice_count"] == len(invoices)
+        assert totals["total_amount"] == round(sum(d.total_amount for d in invoices), 2)
+        assert totals["total_igst"] == round(sum(d.total_igst for d in invoices), 2)
+
+    def test_groupings(self):
+        invoices = [_load(f) for f in ALL_INVOICES]
+        summary = summarize_rollups(*_rollups(invoices))
+
+        months = [g["month"] for g in summary["by_month"]]
+        assert months == sorted({d.bill_date[:7] for d in invoices})
+        assert sum(g["invoice_count"] for g in summary["by_seller"]) == len(invoices)
+        amounts = [g["total_amount"] for g in summary["by_seller"]]
+        assert amounts == sorted(amounts, reverse=True)
+
+        rates = [g["rate"] for g in summary["by_rate"]]
+        assert rates == sorted({item.rate for d in invoices for item in d.tax_breakup})
+        breakup_taxable = sum(item.taxable_value for d in invoices for item in d.tax_breakup)
+        assert round(sum(g["taxable_value"] for g in summary["by_rate"]), 2) == round(breakup_taxable, 2)
+
+    def test_empty_period(self):
+        summary = summarize_rollups([], [])
+        assert summary["totals"]["invoice_count"] == 0
+        assert summary["totals"]["total_amount"] == 0.0
+        assert summary["by_month"] == summary["by_seller"] == summary["by_rate"] == []
+
+    def test_deleted_invoice_cancels_out(self):
+        invoice = _load("bhavani_auto.json")
+        added, _ = _rollups([invoice])
+        removed = [
+            {k: (-v if isinstance(v, (int, float)) else v) for k, v in row.items()}
+            for row in added
+        ]
+        summary = summarize_rollups(added + removed, [])
+        assert summary["totals"]["invoice_count"] == 0
+        assert summary["totals"]["total_amount"] == 0.0
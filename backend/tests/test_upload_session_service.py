@@ -0,0 +1,143 @@
+"""Tests for upload_session_service - resumable chunked uploads on local disk."""
+import asyncio
+import os
+from datetime import timedelta
+
+import pytest
+
+from app.config import get_settings
+from app.services import upload_session_service
+from app.services.upload_session_service import (
+    UploadOffsetMismatch,
+    abort_upload_session,
+    append_chunk,
+    complete_upload_session,
+    create_upload_session,
+    get_upload_session,
+)
+from app.utils.helpers import file_hash
+
+CONTENT = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+
+async def _stream(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _interrupted(chunk: bytes):
+    yield chunk
+    raise ConnectionError("client went away")
+
+
+def _append(session, offset, *chunks) -> int:
+    return asyncio.run(append_chunk(session, offset, _stream(*chunks)))
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "upload_spool_dir", str(tmp_path))
+    monkeypatch.setattr(upload_session_service, "_sessions", {})
+    monkeypatch.setattr(upload_session_service, "_state", {})
+    return tmp_path
+
+
+class TestCreate:
+    def test_rejects_non_pdf_name_and_bad_size(self):
+        with pytest.raises(ValueError):
+            create_upload_session("u1", "scan.docx", 100)
+        with pytest.raises(ValueError):
+            create_upload_session("u1", "scan.pdf", get_settings().max_resumable_upload_mb * 1024 * 1024 + 1)
+
+    def test_allows_files_above_single_upload_limit(self):
+        session = create_upload_session("u1", "scan.pdf", 15 * 1024 * 1024)
+        assert session.offset == 0
+        assert get_upload_session(session.id, "u1") is session
+        assert get_upload_session(session.id, "someone-else") is None
+
+
+class TestChunks:
+    def test_chunks_assemble_on_disk(self):
+        session = create_upload_session("u1", "scan.pdf", len(CONTENT))
+        assert _append(session, 0, CONTENT[:300]) == 300
+        assert _append(session, 300, CONTENT[300:700], CONTENT[700:]) == len(CONTENT)
+
+        pdf = complete_upload_session(session)
+        assert pdf.read_bytes() == CONTENT
+        assert pdf.sha256 == file_hash(CONTENT)
+        assert get_upload_session(session.id, "u1") is None
+
+    def test_wrong_offset_reports_current_one(self):
+        session = create_upload_session("u1", "scan.pdf", len(CONTENT))
+        _append(session, 0, CONTENT[:100])
+        with pytest.raises(UploadOffsetMismatch) as e:
+            _append(session, 0, CONTENT[:100])
+        assert e.value.offset == 100
+
+    def test_interrupted_chunk_resumes_from_received_bytes(self):
+        session = create_upload_session("u1", "scan.pdf", len(CONTENT))
+        with pytest.raises(ConnectionError):
+            asyncio.run(append_chunk(session, 0, _interrupted(CONTENT[:200])))
+        assert session.offset == 200
+
+        _append(session, 200, CONTENT[200:])
+        assert complete_upload_session(session).read_bytes() == CONTENT
+
+    def test_complete_with_missing_bytes(self):
+        session = create_upload_session("u1", "scan.pdf", len(CONTENT))
+        _append(session, 0, CONTENT[:10])
+        with pytest.raises(UploadOffsetMismatch):
+            complete_upload_session(session)
+
+
+class TestInvalidUploads:
+    def test_bad_header_aborts_session(self, spool_dir):
+        session = create_upload_session("u1", "scan.pdf", 100)
+        with pytest.raises(ValueError, match="header"):
+            _append(session, 0, b"NOT A PDF")
+        assert get_upload_session(session.id, "u1") is None
+        assert os.listdir(spool_dir) == []
+
+    def test_overflowing_declared_size_aborts_session(self, spool_dir):
+        session = create_upload_session("u1", "scan.pdf", 10)
+        with pytest.raises(ValueError, match="declared"):
+            _append(session, 0, CONTENT[:20])
+        assert os.listdir(spool_dir) == []
+
+    def test_abort_removes_bytes(self, spool_dir):
+        session = create_upload_session("u1", "scan.pdf", len(CONTENT))
+        _append(session, 0, CONTENT[:50])
+        abort_upload_session(session)
+        assert os.listdir(spool_dir) == []
+
+
+class TestSessionLifecycle:
+    def test_chunk_after_abort_is_value_error(self):
+        session = create_upload_session("u1", "scan.pdf", 10)
+        abort_upload_session(session)
+        with pytest.raises(ValueError):
+            _append(session, 0, b"%PDF-")
+
+    def test_complete_after_abort_is_value_error(self):
+        session = create_upload_session("u1", "scan.pdf", 5)
+        _append(session, 0, b"%PDF-")
+        abort_upload_session(session)
+        with pytest.raises(ValueError):
+            complete_upload_session(session)
+
+    def test_open_sessions_capped_per_user(self, monkeypatch):
+        monkeypatch.setattr(get_settings(), "max_upload_sessions_per_user", 2)
+        create_upload_session("u1", "a.pdf", 10)
+        first = create_upload_session("u1", "b.pdf", 10)
+        with pytest.raises(ValueError, match="Too many open uploads"):
+            create_upload_session("u1", "c.pdf", 10)
+        create_upload_session("u2", "a.pdf", 10)
+
+        abort_upload_session(first)
+        create_upload_session("u1", "c.pdf", 10)
+
+    def test_stale_sessions_are_pruned(self):
+        stale = create_upload_session("u1", "old.pdf", 10)
+        stale.updated_at -= timedelta(hours=get_settings().upload_session_ttl_hours + 1)
+        create_upload_session("u1", "new.pdf", 10)
+        assert get_upload_session(stale.id, "u1") is None
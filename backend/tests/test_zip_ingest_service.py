@@ -0,0 +1,123 @@
+"""Tests for zip_ingest_service - archive listing and member-by-member unpacking."""
+import asyncio
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.config import get_settings
+from app.services import ingest_service
+from app.services.ingest_service import ingest_archive
+from app.services.zip_ingest_service import is_pdf_member, iter_zip_pdfs, list_zip_members, spool_zip
+from app.utils import helpers
+
+PDF = b"%PDF-1.4 " + b"invoice " * 100
+
+
+class FakeUpload:
+    def __init__(self, content: bytes):
+        self._stream = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self._stream.read(size)
+
+
+def _zip(tmp_path, members: dict[str, bytes]) -> str:
+    path = tmp_path / "batch.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return str(path)
+
+
+def _collect(path, members):
+    async def scenario():
+        return [item async for item in iter_zip_pdfs(path, members)]
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    monkeypatch.setattr(get_settings(), "upload_spool_dir", str(spool))
+    return spool
+
+
+class TestListing:
+    def test_skips_directories_and_junk(self, tmp_path):
+        path = _zip(tmp_path, {
+            "march/a.pdf": PDF,
+            "march/": b"",
+            "__MACOSX/march/._a.pdf": b"junk",
+            ".DS_Store": b"junk",
+            "notes.txt": b"hello",
+        })
+        members = list_zip_members(path)
+        assert [m.filename for m in members] == ["march/a.pdf", "notes.txt"]
+        assert [is_pdf_member(m) for m in members] == [True, False]
+
+    def test_rejects_bad_archive(self, tmp_path):
+        path = tmp_path / "bad.zip"
+        path.write_bytes(b"not a zip")
+        with pytest.raises(ValueError, match="zip"):
+            list_zip_members(str(path))
+
+    def test_rejects_too_many_members(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(get_settings(), "max_zip_members", 2)
+        path = _zip(tmp_path, {f"{i}.pdf": PDF for i in range(3)})
+        with pytest.raises(ValueError, match="maximum is 2"):
+            list_zip_members(path)
+
+    def test_spool_zip_enforces_size(self, monkeypatch, spool_dir):
+        monkeypatch.setattr(get_settings(), "max_zip_upload_mb", 0)
+        with pytest.raises(ValueError, match="too large"):
+            asyncio.run(spool_zip(FakeUpload(b"PK" + b"x" * 10)))
+        assert os.listdir(spool_dir) == []
+
+
+class TestUnpacking:
+    def test_members_are_validated_one_at_a_time(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(helpers, "MAX_FILE_SIZE", 2000)
+        path = _zip(tmp_path, {
+            "a.pdf": PDF,
+            "notes.txt": b"hello",
+            "fake.pdf": b"NOT A PDF",
+            "huge.pdf": b"%PDF" + b"\0" * 5000,
+        })
+        results = _collect(path, list_zip_members(path))
+
+        assert [name for name, _, _ in results] == ["a.pdf", "notes.txt", "fake.pdf", "huge.pdf"]
+        pdf = results[0][1]
+        assert pdf.read_bytes() == PDF and results[0][2] is None
+        assert "PDF" in results[1][2]
+        assert "header" in results[2][2].lower()
+        assert "large" in results[3][2].lower()
+
+    def test_archive_ingestion_queues_each_stored_member(self, tmp_path, monkeypatch, spool_dir):
+        stored = []
+
+        async def fake_ingest(user_id, filename, pdf, buyer_gstin, speculative_ocr=True):
+            assert speculative_ocr is False
+            if filename == "broken.pdf":
+                pdf.discard()
+                raise RuntimeError("storage down")
+            return f"id-{filename}", None
+
+        monkeypatch.setattr(ingest_service, "ingest_file", fake_ingest)
+        path = _zip(tmp_path, {"a.pdf": PDF, "broken.pdf": PDF, "b.txt": b"x"})
+
+        async def scenario():
+            on_stored = lambda invoice_id, pdf: stored.append(invoice_id)
+            return [r async for r in ingest_archive("u1", path, list_zip_members(path), None, on_stored)]
+
+        results = asyncio.run(scenario())
+        assert [(r["filename"], r["success"], r["invoice_id"]) for r in results] == [
+            ("a.pdf", True, "id-a.pdf"),
+            ("broken.pdf", False, None),
+            ("b.txt", False, None),
+        ]
+        assert results[1]["error"] == "Failed to store file"
+        assert stored == ["id-a.pdf"]